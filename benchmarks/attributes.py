@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Times writing reports whose classname, file and url attributes repeat across test cases, with and without caching
+their decoded and escaped values.
+
+    python -m benchmarks.attributes --cases 100000
+    python -m benchmarks.attributes --cases 100000 --distribution zipf unique -o attributes.json
+
+The distributions are:
+
+    zipf     classes of a few to a few hundred test cases, in modules of a few classes, as a real test suite has them
+    uniform  every class has the same number of test cases
+    unique   every test case has a class of its own, where caching cannot help
+    one      all test cases share one class
+
+Every value is a string of its own, as the test runner creating them per test case would have them, and every
+class has a path and a url that need escaping. Writing is timed with to_xml_report_string(), pretty printed and
+compact, and with JUnitXMLWriter into a binary file.
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import random
+import tempfile
+import time
+
+import junit_xml
+from junit_xml import JUnitXMLWriter, TestCase, TestSuite, to_xml_report_string
+
+DISTRIBUTIONS = ("zipf", "uniform", "unique", "one")
+
+
+def class_sizes(cases, distribution, rng):
+    """
+    Returns the number of test cases of every class.
+    """
+    if distribution == "unique":
+        return [1] * cases
+    if distribution == "one":
+        return [cases]
+    if distribution == "uniform":
+        return [20] * (cases // 20) + ([cases % 20] if cases % 20 else [])
+    sizes = []
+    while sum(sizes) < cases:
+        # a Pareto tail: most classes are small, a few have hundreds of test cases
+        sizes.append(min(int(rng.paretovariate(1.2) * 3), 500))
+    sizes[-1] -= sum(sizes) - cases
+    return sizes
+
+
+def make_test_suites(cases, distribution, seed=1):
+    rng = random.Random(seed)
+    test_cases = []
+    for index, size in enumerate(class_sizes(cases, distribution, rng)):
+        module = index // 4
+        for c in range(size):
+            test_cases.append(
+                TestCase(
+                    "test_%d" % c,
+                    "".join(["tests.package_%d.test_module_%d.TestClass%d" % (module // 20, module, index)]),
+                    0.001 * c,
+                    file="".join(["tests/package_%d/test_module_%d.py" % (module // 20, module)]),
+                    url="".join(["https://ci.example.com/tests?module=%d&class=%d" % (module, index)]),
+                )
+            )
+    # a hundred suites, as many reports merge them
+    per_suite = max(1, len(test_cases) // 100)
+    return [
+        TestSuite("suite %d" % s, test_cases[start:start + per_suite], hostname="worker-1", package="tests")
+        for s, start in enumerate(range(0, len(test_cases), per_suite))
+    ]
+
+
+def writers():
+    def report_string_pretty(test_suites):
+        to_xml_report_string(test_suites)
+
+    def report_string_compact(test_suites):
+        to_xml_report_string(test_suites, prettyprint=False)
+
+    def writer(test_suites):
+        with tempfile.TemporaryFile() as f, JUnitXMLWriter(f) as w:
+            for test_suite in test_suites:
+                w.write_test_suite(test_suite)
+
+    return [
+        ("report_string", report_string_pretty),
+        ("report_string_compact", report_string_compact),
+        ("writer", writer),
+    ]
+
+
+def time_write(function, test_suites, cache_size, repeat):
+    saved = junit_xml._VALUE_CACHE_SIZE
+    junit_xml._VALUE_CACHE_SIZE = cache_size
+    try:
+        best = None
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            function(test_suites)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+    finally:
+        junit_xml._VALUE_CACHE_SIZE = saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", type=int, default=100000, help="test cases per report")
+    parser.add_argument("--distribution", nargs="+", choices=DISTRIBUTIONS, default=list(DISTRIBUTIONS))
+    parser.add_argument("--cache-size", type=int, default=junit_xml._VALUE_CACHE_SIZE, help="values cached")
+    parser.add_argument("--repeat", type=int, default=3, help="times each write is timed, the best time counts")
+    parser.add_argument("-o", "--json", help="file to write the results to")
+    args = parser.parse_args()
+
+    results = []
+    print("%-8s %-22s %10s %10s %8s" % ("classes", "write", "uncached", "cached", "saving"))
+    for distribution in args.distribution:
+        test_suites = make_test_suites(args.cases, distribution)
+        for name, function in writers():
+            uncached = time_write(function, test_suites, 0, args.repeat)
+            cached = time_write(function, test_suites, args.cache_size, args.repeat)
+            results.append(
+                {"distribution": distribution, "write": name, "uncached_seconds": uncached, "cached_seconds": cached}
+            )
+            print(
+                "%-8s %-22s %9.3fs %9.3fs %7.1f%%"
+                % (distribution, name, uncached, cached, 100.0 * (uncached - cached) / uncached)
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"cases": args.cases, "cache_size": args.cache_size, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+Times importing junit_xml with python -X importtime, in fresh interpreters, and fails above a budget.
+
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --max-ms 5 -o importtime.json
+
+Importing junit_xml should not import the modules only writing a report needs, like ElementTree, re or
+tempfile. The slowest modules imported along with it are listed, to find the one that crept back in.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+def import_times(module):
+    """
+    Returns {module or a module it imported: (self microseconds, cumulative microseconds)} of one import of module
+    in a fresh interpreter.
+    """
+    env = dict(os.environ)
+    # the first run writes the bytecode the others load, as an installed package has it
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    output = subprocess.check_output(
+        [sys.executable, "-X", "importtime", "-c", "import %s" % module], stderr=subprocess.STDOUT, env=env
+    )
+    # a module is listed after the modules it imports, which are indented deeper
+    nested = {}
+    for line in output.decode().splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        nested[name.strip()] = (int(self_us), int(cumulative_us))
+        if name.startswith("  "):
+            continue
+        if name.strip() == module:
+            return nested
+        nested = {}
+    raise ValueError("%s was not imported, was it imported at startup?" % module)
+
+
+def run(module, repeat):
+    import_times(module)
+    runs = [import_times(module) for _ in range(repeat)]
+    return min(runs, key=lambda times: times[module][1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="junit_xml", help="module to import")
+    parser.add_argument("--repeat", type=int, default=10, help="times the module is imported, the best time counts")
+    parser.add_argument("--max-ms", type=float, help="fail if importing takes longer")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest modules to list")
+    parser.add_argument("-o", "--json", help="file to write the results to")
+    args = parser.parse_args()
+
+    times = run(args.module, args.repeat)
+    milliseconds = times[args.module][1] / 1000.0
+    print("import %s: %.2f ms" % (args.module, milliseconds))
+    for name, (self_us, cumulative_us) in sorted(times.items(), key=lambda item: -item[1][0])[: args.top]:
+        print("%9.2f ms %9.2f ms  %s" % (self_us / 1000.0, cumulative_us / 1000.0, name.rstrip()))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            results = {"python": sys.version.split()[0], "module": args.module, "milliseconds": milliseconds}
+            results["imports"] = times
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.max_ms is not None and milliseconds > args.max_ms:
+        print("import %s takes longer than %.2f ms" % (args.module, args.max_ms))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Measures the heap used per TestCase, compared to the dict based representation TestCase used to have.
+
+    python -m benchmarks.memory --cases 100000
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import sys
+import tracemalloc
+
+from junit_xml import TestCase
+
+
+class DictTestCase(object):
+    """The former TestCase layout: a per-instance __dict__ and eagerly allocated lists of dicts."""
+
+    def __init__(self, name, classname=None, elapsed_sec=None):
+        self.name = name
+        self.assertions = None
+        self.elapsed_sec = elapsed_sec
+        self.timestamp = None
+        self.classname = classname
+        self.status = None
+        self.category = None
+        self.file = None
+        self.line = None
+        self.log = None
+        self.url = None
+        self.stdout = None
+        self.stderr = None
+        self.is_enabled = True
+        self.errors = []
+        self.failures = []
+        self.skipped = []
+        self.allow_multiple_subalements = False
+
+    def add_failure_info(self, message=None, output=None, failure_type=None):
+        self.failures.append({"message": message, "output": output, "type": failure_type})
+
+
+def measure(case_class, cases, failure_every):
+    classnames = ["pkg.module%d.TestClass" % i for i in range(100)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    test_cases = []
+    for i in range(cases):
+        case = case_class("test_%d" % i, classnames[i % len(classnames)], 0.001)
+        if failure_every and i % failure_every == 0:
+            case.add_failure_info("failure message", "output")
+        test_cases.append(case)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # the names are the same for both layouts, only count the test case objects themselves
+    names = sum(sys.getsizeof(case.name) for case in test_cases)
+    return (used - names) / float(cases)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", type=int, default=100000)
+    parser.add_argument("--failure-every", type=int, default=10, help="every n-th test case fails, 0 for none")
+    args = parser.parse_args()
+
+    dict_size = measure(DictTestCase, args.cases, args.failure_every)
+    slots_size = measure(TestCase, args.cases, args.failure_every)
+    print("dict based TestCase:  %8.1f bytes per case" % dict_size)
+    print("slotted TestCase:     %8.1f bytes per case" % slots_size)
+    saving = dict_size - slots_size
+    print("saving:               %8.1f bytes per case (%.0f%%)" % (saving, 100 * saving / dict_size))
+
+
+if __name__ == "__main__":
+    main()
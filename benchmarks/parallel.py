@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Measures how to_xml_report_string(workers=N) scales with the number of worker processes.
+
+    python -m benchmarks.parallel --suites 2000 --cases 100 --workers 1 2 4 8
+"""
+from __future__ import print_function
+
+import argparse
+import time
+
+from junit_xml import TestCase, TestSuite, to_xml_report_string
+
+
+def make_test_suites(suites, cases):
+    test_suites = []
+    for s in range(suites):
+        test_cases = []
+        for c in range(cases):
+            case = TestCase("test_%d" % c, "pkg.module%d.TestClass" % s, 0.001 * c, stdout="output of test %d" % c)
+            if c % 10 == 0:
+                case.add_failure_info("failure message", "Traceback (most recent call last):\n  ...")
+            test_cases.append(case)
+        test_suites.append(TestSuite("suite%d" % s, test_cases, hostname="localhost"))
+    return test_suites
+
+
+def measure(test_suites, workers, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        to_xml_report_string(test_suites, workers=workers)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--suites", type=int, default=2000)
+    parser.add_argument("--cases", type=int, default=100, help="test cases per suite")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    test_suites = make_test_suites(args.suites, args.cases)
+    serial = measure(test_suites, None, args.repeat)
+    print("%-8s %10s %8s" % ("workers", "seconds", "speedup"))
+    print("%-8s %10.3f %8.2f" % ("serial", serial, 1.0))
+    for workers in args.workers:
+        elapsed = measure(test_suites, workers, args.repeat)
+        print("%-8d %10.3f %8.2f" % (workers, elapsed, serial / elapsed))
+
+
+if __name__ == "__main__":
+    main()
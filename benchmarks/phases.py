@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+"""
+Times every phase of writing a report, for synthetic test suites of several sizes, and writes the results as JSON.
+
+    python -m benchmarks.phases --cases 1000 100000 1000000 -o results.json
+    python -m benchmarks.phases --cases 1000 100000 -o new.json --compare results.json
+
+Each size is run with small and large captured output, and with ASCII, non-ASCII and illegal characters in it.
+The phases are:
+
+    build               TestSuite.build_xml_doc()
+    clean               _clean_illegal_xml_chars() on every text field
+    serialize           the native serializer writing the built element, pretty printed
+    report_string       to_xml_report_string(), end to end
+    write_file          to_xml_report_file() to a binary file, end to end
+    writer              JUnitXMLWriter writing the test cases one at a time to a binary file
+    legacy_tostring     ET.tostring() of the built element, as reports used to be serialized (--legacy)
+    legacy_prettyprint  minidom's toprettyxml() of that, as reports used to be pretty printed (--legacy)
+
+Every phase is timed on its own, then run again under tracemalloc for its peak memory (unless --no-memory).
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+
+from junit_xml import JUnitXMLWriter, TestCase, TestSuite, _clean_illegal_xml_chars, _write_element
+from junit_xml import to_xml_report_file, to_xml_report_string
+
+TEXTS = {
+    "ascii": "output line of the test\n",
+    "unicode": u"äöü € 日本語 output line of the test\n",
+    "illegal": u"output \x07line\x1b[0m of the ￾ test\n",
+}
+OUTPUT_LINES = {"small": 1, "large": 40}
+
+
+def make_test_suite(cases, output, text):
+    """
+    Returns a test suite of cases test cases, a tenth of them failed and with a longer output.
+    """
+    line = TEXTS[text]
+    lines = OUTPUT_LINES[output]
+    test_cases = []
+    for c in range(cases):
+        case = TestCase("test_%d" % c, "pkg.module%d.TestClass" % (c // 100), 0.001 * (c % 1000), stdout=line * lines)
+        if c % 10 == 0:
+            case.add_failure_info("failure message", "Traceback (most recent call last):\n" + line * lines * 10)
+        test_cases.append(case)
+    return TestSuite("generated", test_cases, hostname="localhost")
+
+
+def text_fields(test_suite):
+    for case in test_suite.test_cases:
+        yield case.name
+        yield case.classname
+        yield case.stdout
+        for failure in case._failures or ():
+            yield failure["message"]
+            yield failure["output"]
+
+
+def phases(test_suite, legacy):
+    """
+    Returns (name, function, prepare) for every phase. prepare, if any, is called before the phase is timed, for
+    what the phase works on, like the built element, not to be part of it.
+    """
+    prepared = {}
+
+    def built():
+        if "element" not in prepared:
+            prepared["element"] = test_suite.build_xml_doc()
+        return prepared["element"]
+
+    def legacy_xml():
+        if "legacy" not in prepared:
+            prepared["legacy"] = ET.tostring(built())
+        return prepared["legacy"]
+
+    def build():
+        test_suite.build_xml_doc()
+
+    def clean():
+        for field in text_fields(test_suite):
+            _clean_illegal_xml_chars(field)
+
+    def serialize():
+        pieces = []
+        _write_element(pieces.append, built(), True, level=1)
+
+    def report_string():
+        to_xml_report_string([test_suite])
+
+    def write_file():
+        with tempfile.TemporaryFile() as f:
+            to_xml_report_file(f, [test_suite])
+
+    def writer():
+        with tempfile.TemporaryFile() as f, JUnitXMLWriter(f) as w:
+            w.write_test_suite(test_suite)
+
+    def legacy_tostring():
+        ET.tostring(built())
+
+    def legacy_prettyprint():
+        minidom.parseString(legacy_xml()).toprettyxml()
+
+    result = [
+        ("build", build, None),
+        ("clean", clean, None),
+        ("serialize", serialize, built),
+        ("report_string", report_string, None),
+        ("write_file", write_file, None),
+        ("writer", writer, None),
+    ]
+    if legacy:
+        result.append(("legacy_tostring", legacy_tostring, built))
+        result.append(("legacy_prettyprint", legacy_prettyprint, legacy_xml))
+    return result
+
+
+def time_phase(function, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_memory(function):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(cases, output, text, repeat, memory, legacy):
+    test_suite = make_test_suite(cases, output, text)
+    result = {"cases": cases, "output": output, "text": text, "phases": {}}
+    with tempfile.TemporaryFile() as f:
+        to_xml_report_file(f, [test_suite])
+        result["report_bytes"] = f.tell()
+    for name, function, prepare in phases(test_suite, legacy):
+        if prepare is not None:
+            prepare()
+        phase = {"seconds": time_phase(function, repeat)}
+        if memory:
+            phase["peak_bytes"] = peak_memory(function)
+        result["phases"][name] = phase
+        print(
+            "%9d %-6s %-8s %-19s %9.3f s %s"
+            % (
+                cases,
+                output,
+                text,
+                name,
+                phase["seconds"],
+                "%9.1f MB" % (phase["peak_bytes"] / 1e6) if memory else "",
+            )
+        )
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.STDOUT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """
+    Prints how much slower (> 1) or faster (< 1) every phase is than in the baseline results.
+    """
+
+    def key(result):
+        return (result["cases"], result["output"], result["text"])
+
+    baseline = dict((key(r), r) for r in baseline["results"])
+    print("\n%9s %-6s %-8s %-19s %9s %9s" % ("cases", "output", "text", "phase", "time", "memory"))
+    for result in results["results"]:
+        before = baseline.get(key(result))
+        if before is None:
+            continue
+        for name, phase in sorted(result["phases"].items()):
+            old = before["phases"].get(name)
+            if old is None:
+                continue
+            memory = ""
+            if "peak_bytes" in phase and old.get("peak_bytes"):
+                memory = "%8.2fx" % (phase["peak_bytes"] / float(old["peak_bytes"]))
+            print(
+                "%9d %-6s %-8s %-19s %8.2fx %9s"
+                % (result["cases"], result["output"], result["text"], name, phase["seconds"] / old["seconds"], memory)
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", type=int, nargs="+", default=[1000, 100000], help="test cases per suite")
+    parser.add_argument("--output", nargs="+", choices=sorted(OUTPUT_LINES), default=sorted(OUTPUT_LINES))
+    parser.add_argument("--text", nargs="+", choices=sorted(TEXTS), default=sorted(TEXTS))
+    parser.add_argument("--repeat", type=int, default=3, help="times each phase is timed, the best time counts")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="do not measure peak memory")
+    parser.add_argument("--legacy", action="store_true", help="also time ET.tostring() and minidom")
+    parser.add_argument("-o", "--json", help="file to write the results to")
+    parser.add_argument("--compare", help="results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": [],
+    }
+    for cases in args.cases:
+        for output in args.output:
+            for text in args.text:
+                results["results"].append(run(cases, output, text, args.repeat, args.memory, args.legacy))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
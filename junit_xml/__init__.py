@@ -1,20 +1,66 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
-import warnings
-from collections import defaultdict
+import codecs
+import io
+import itertools
+import os
 import sys
-import re
-import xml.etree.ElementTree as ET
-import xml.dom.minidom
+import time
 
-from six import u, iteritems, PY2
+# The modules a report needs, ElementTree, re and the rest, are imported when they are first used, so that
+# importing junit_xml stays cheap for test runners that may never write a report.
 
-try:
-    # Python 2
-    unichr
-except NameError:  # pragma: nocover
-    # Python 3
-    unichr = chr
+from collections.abc import MutableMapping
+
+
+def _iteritems(d, **kwargs):
+    return iter(d.items(**kwargs))
+
+
+def _u(s):
+    return s
+
+
+# the names six used to provide here, which could be imported from junit_xml, with what replaces them
+_SIX_NAMES = {
+    "iteritems": (_iteritems, "dict.items()"),
+    "u": (_u, "str literals"),
+    "PY2": (False, "nothing, junit_xml requires Python 3"),
+    "unichr": (chr, "chr()"),
+}
+
+
+def __getattr__(name):
+    if name in _SIX_NAMES:
+        import warnings
+
+        value, replacement = _SIX_NAMES[name]
+        warnings.warn(
+            "junit_xml.%s is deprecated. It will be removed in version 2.0.0. Use %s" % (name, replacement),
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return value
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+class _LazyModule(object):
+    """
+    A module imported when one of its attributes is first used. Its attributes are then copied over, so later
+    lookups cost what they cost on the module itself.
+    """
+
+    def __init__(self, name):
+        self._lazy_name = name
+
+    def __getattr__(self, attr):
+        __import__(self._lazy_name)
+        module = sys.modules[self._lazy_name]
+        self.__dict__.update(vars(module))
+        return getattr(module, attr)
+
+
+ET = _LazyModule("xml.etree.ElementTree")
 
 """
 Based on the understanding of what Jenkins can parse for JUnit XML files.
@@ -59,19 +105,7 @@ def decode(var, encoding):
     """
     If not already unicode, decode it.
     """
-    if PY2:
-        if isinstance(var, unicode):  # noqa: F821
-            ret = var
-        elif isinstance(var, str):
-            if encoding:
-                ret = var.decode(encoding)
-            else:
-                ret = unicode(var)  # noqa: F821
-        else:
-            ret = unicode(var)  # noqa: F821
-    else:
-        ret = str(var)
-    return ret
+    return str(var)
 
 
 class TestSuite(object):
@@ -96,8 +130,8 @@ class TestSuite(object):
         stderr=None,
     ):
         self.name = name
-        if not test_cases:
-            test_cases = []
+        if test_cases is None:
+            test_cases = _TestCaseList()
         try:
             iter(test_cases)
         except TypeError:
@@ -114,137 +148,198 @@ class TestSuite(object):
         self.stderr = stderr
         self.properties = properties
 
-    def build_xml_doc(self, encoding=None):
+    # the running totals of test cases given as a plain list, None for other test cases
+    _list_totals = None
+
+    @property
+    def test_cases(self):
+        """
+        The test cases of the suite. A plain list is kept as it is given, so test cases can still be appended to it,
+        and is counted as they are. Other iterables are copied into a list that counts any change of it.
+        """
+        return self._test_cases
+
+    @test_cases.setter
+    def test_cases(self, test_cases):
+        if type(test_cases) is list:
+            self._list_totals = _ListTotals(test_cases)
+        else:
+            if not isinstance(test_cases, _TestCaseList):
+                test_cases = _TestCaseList(test_cases)
+            self._list_totals = None
+        self._test_cases = test_cases
+
+    def recount(self):
+        """
+        Counts the totals of the test cases again. The totals follow test cases added to or removed from the suite,
+        and results changed through the methods and properties of the test cases. Call this after any other change:
+        test cases inserted into or replaced in a plain list given as test_cases, or results edited in place, e.g.
+        case.failures.append(...) or case.failures[0]["message"] = None.
+        """
+        if self._list_totals is not None:
+            self._list_totals = self._list_totals.recounted()
+        else:
+            self._test_cases.recount()
+
+    def _totals(self):
+        """the running totals of the test cases, which a report of the suite is written with"""
+        if self._list_totals is None:
+            return self._test_cases.totals
+        if not self._list_totals.follows():
+            self._list_totals = self._list_totals.recounted()
+        return self._list_totals.count_appended()
+
+    def _live_totals(self):
+        """the totals the properties below read, which subclasses may keep apart from those of reports"""
+        return self._totals()
+
+    @property
+    def tests(self):
+        """the number of test cases"""
+        return self._live_totals().tests
+
+    @property
+    def failures(self):
+        """the number of failed test cases"""
+        return self._live_totals().failures
+
+    @property
+    def errors(self):
+        """the number of test cases with errors"""
+        return self._live_totals().errors
+
+    @property
+    def skipped(self):
+        """the number of skipped test cases"""
+        return self._live_totals().skipped
+
+    @property
+    def disabled(self):
+        """the number of disabled test cases"""
+        return self._live_totals().disabled
+
+    @property
+    def assertions(self):
+        """the number of assertions of all test cases, None if no test case counted assertions"""
+        return self._live_totals().assertions
+
+    @property
+    def time(self):
+        """the total elapsed time of all test cases"""
+        return self._live_totals().time
+
+    def build_xml_doc(self, encoding=None, policy=None):
         """
         Builds the XML document for the JUnit test suite.
         Produces clean unicode strings and decodes non-unicode with the help of encoding.
         @param encoding: Used to decode encoded strings.
+        @param policy: An OutputPolicy limiting the captured output of the test suite.
         @return: XML document with unicode string elements
         """
+        limiter = _OutputLimiter(policy) if policy else None
+        values = _value_cache(prettyprint=False)
 
         # build the test suite element
+        xml_element = ET.Element("testsuite", self._build_attributes(self._totals(), encoding, values))
+
+        # test cases, and test suite stdout and stderr, are built before the properties that record what the
+        # policy left out of them
+        case_elements = [
+            case._build_xml_doc(encoding, lazy=False, limiter=limiter, values=values) for case in self.test_cases
+        ]
+        output_elements = self._build_output_elements(encoding, lazy=False, limiter=limiter)
+
+        # add any properties, test suite stdout and stderr
+        properties_element = self._build_properties_element(encoding, limiter)
+        if properties_element is not None:
+            xml_element.append(properties_element)
+        xml_element.extend(output_elements)
+
+        # test cases
+        xml_element.extend(case_elements)
+
+        return xml_element
+
+    def _build_attributes(self, totals, encoding, values=None):
+        """
+        Returns the attributes of the testsuite element for the given totals.
+        @param values: The _ValueCache of the report being written, if any.
+        """
+        xml_text = _xml_text if values is None else values.xml_text
         test_suite_attributes = dict()
-        if any(c.assertions for c in self.test_cases):
-            test_suite_attributes["assertions"] = str(sum([int(c.assertions) for c in self.test_cases if c.assertions]))
-        test_suite_attributes["disabled"] = str(len([c for c in self.test_cases if not c.is_enabled]))
-        test_suite_attributes["errors"] = str(len([c for c in self.test_cases if c.is_error()]))
-        test_suite_attributes["failures"] = str(len([c for c in self.test_cases if c.is_failure()]))
-        test_suite_attributes["name"] = decode(self.name, encoding)
-        test_suite_attributes["skipped"] = str(len([c for c in self.test_cases if c.is_skipped()]))
-        test_suite_attributes["tests"] = str(len(self.test_cases))
-        test_suite_attributes["time"] = str(sum(c.elapsed_sec for c in self.test_cases if c.elapsed_sec))
+        if totals.assertions is not None:
+            test_suite_attributes["assertions"] = str(totals.assertions)
+        test_suite_attributes["disabled"] = str(totals.disabled)
+        test_suite_attributes["errors"] = str(totals.errors)
+        test_suite_attributes["failures"] = str(totals.failures)
+        test_suite_attributes["name"] = _xml_text(self.name, encoding)
+        test_suite_attributes["skipped"] = str(totals.skipped)
+        test_suite_attributes["tests"] = str(totals.tests)
+        test_suite_attributes["time"] = str(totals.time)
 
         if self.hostname:
-            test_suite_attributes["hostname"] = decode(self.hostname, encoding)
+            test_suite_attributes["hostname"] = xml_text(self.hostname, encoding)
         if self.id:
-            test_suite_attributes["id"] = decode(self.id, encoding)
+            test_suite_attributes["id"] = _xml_text(self.id, encoding)
         if self.package:
-            test_suite_attributes["package"] = decode(self.package, encoding)
+            test_suite_attributes["package"] = xml_text(self.package, encoding)
         if self.timestamp:
-            test_suite_attributes["timestamp"] = decode(self.timestamp, encoding)
+            test_suite_attributes["timestamp"] = _xml_text(self.timestamp, encoding)
         if self.file:
-            test_suite_attributes["file"] = decode(self.file, encoding)
+            test_suite_attributes["file"] = xml_text(self.file, encoding)
         if self.log:
-            test_suite_attributes["log"] = decode(self.log, encoding)
+            test_suite_attributes["log"] = xml_text(self.log, encoding)
         if self.url:
-            test_suite_attributes["url"] = decode(self.url, encoding)
+            test_suite_attributes["url"] = xml_text(self.url, encoding)
+        return test_suite_attributes
+
+    def _build_header_elements(self, encoding, lazy):
+        """
+        Returns the properties, system-out and system-err elements that precede the test cases.
+        @param lazy: Leaves stdout and stderr given as paths, files or callables to be read while serializing.
+        """
+        elements = self._build_output_elements(encoding, lazy)
+        properties_element = self._build_properties_element(encoding)
+        if properties_element is not None:
+            elements.insert(0, properties_element)
+        return elements
 
-        xml_element = ET.Element("testsuite", test_suite_attributes)
+    def _build_properties_element(self, encoding, limiter=None):
+        """
+        Returns the properties element, with what an output policy truncated or dropped, if any.
+        """
+        properties = self.properties
+        if limiter is not None and limiter.properties():
+            properties = dict(properties or {})
+            properties.update(limiter.properties())
+        if not properties:
+            return None
 
-        # add any properties
-        if self.properties:
-            props_element = ET.SubElement(xml_element, "properties")
-            for k, v in self.properties.items():
-                attrs = {"name": decode(k, encoding), "value": decode(v, encoding)}
-                ET.SubElement(props_element, "property", attrs)
+        props_element = ET.Element("properties")
+        for k, v in properties.items():
+            attrs = {"name": _xml_text(k, encoding), "value": _xml_text(v, encoding)}
+            ET.SubElement(props_element, "property", attrs)
+        return props_element
+
+    def _build_output_elements(self, encoding, lazy, limiter=None):
+        """
+        Returns the system-out and system-err elements of the test suite.
+        """
+        elements = []
 
         # add test suite stdout
         if self.stdout:
-            stdout_element = ET.SubElement(xml_element, "system-out")
-            stdout_element.text = decode(self.stdout, encoding)
+            stdout_element = ET.Element("system-out")
+            stdout_element.text = _xml_content(self.stdout, encoding, lazy, limiter)
+            elements.append(stdout_element)
 
         # add test suite stderr
         if self.stderr:
-            stderr_element = ET.SubElement(xml_element, "system-err")
-            stderr_element.text = decode(self.stderr, encoding)
+            stderr_element = ET.Element("system-err")
+            stderr_element.text = _xml_content(self.stderr, encoding, lazy, limiter)
+            elements.append(stderr_element)
 
-        # test cases
-        for case in self.test_cases:
-            test_case_attributes = dict()
-            test_case_attributes["name"] = decode(case.name, encoding)
-            if case.assertions:
-                # Number of assertions in the test case
-                test_case_attributes["assertions"] = "%d" % case.assertions
-            if case.elapsed_sec:
-                test_case_attributes["time"] = "%f" % case.elapsed_sec
-            if case.timestamp:
-                test_case_attributes["timestamp"] = decode(case.timestamp, encoding)
-            if case.classname:
-                test_case_attributes["classname"] = decode(case.classname, encoding)
-            if case.status:
-                test_case_attributes["status"] = decode(case.status, encoding)
-            if case.category:
-                test_case_attributes["class"] = decode(case.category, encoding)
-            if case.file:
-                test_case_attributes["file"] = decode(case.file, encoding)
-            if case.line:
-                test_case_attributes["line"] = decode(case.line, encoding)
-            if case.log:
-                test_case_attributes["log"] = decode(case.log, encoding)
-            if case.url:
-                test_case_attributes["url"] = decode(case.url, encoding)
-
-            test_case_element = ET.SubElement(xml_element, "testcase", test_case_attributes)
-
-            # failures
-            for failure in case.failures:
-                if failure["output"] or failure["message"]:
-                    attrs = {"type": "failure"}
-                    if failure["message"]:
-                        attrs["message"] = decode(failure["message"], encoding)
-                    if failure["type"]:
-                        attrs["type"] = decode(failure["type"], encoding)
-                    failure_element = ET.Element("failure", attrs)
-                    if failure["output"]:
-                        failure_element.text = decode(failure["output"], encoding)
-                    test_case_element.append(failure_element)
-
-            # errors
-            for error in case.errors:
-                if error["message"] or error["output"]:
-                    attrs = {"type": "error"}
-                    if error["message"]:
-                        attrs["message"] = decode(error["message"], encoding)
-                    if error["type"]:
-                        attrs["type"] = decode(error["type"], encoding)
-                    error_element = ET.Element("error", attrs)
-                    if error["output"]:
-                        error_element.text = decode(error["output"], encoding)
-                    test_case_element.append(error_element)
-
-            # skippeds
-            for skipped in case.skipped:
-                attrs = {"type": "skipped"}
-                if skipped["message"]:
-                    attrs["message"] = decode(skipped["message"], encoding)
-                skipped_element = ET.Element("skipped", attrs)
-                if skipped["output"]:
-                    skipped_element.text = decode(skipped["output"], encoding)
-                test_case_element.append(skipped_element)
-
-            # test stdout
-            if case.stdout:
-                stdout_element = ET.Element("system-out")
-                stdout_element.text = decode(case.stdout, encoding)
-                test_case_element.append(stdout_element)
-
-            # test stderr
-            if case.stderr:
-                stderr_element = ET.Element("system-err")
-                stderr_element.text = decode(case.stderr, encoding)
-                test_case_element.append(stderr_element)
-
-        return xml_element
+        return elements
 
     @staticmethod
     def to_xml_string(test_suites, prettyprint=True, encoding=None):
@@ -253,6 +348,8 @@ class TestSuite(object):
         @param encoding: The encoding of the input.
         @return: unicode string
         """
+        import warnings
+
         warnings.warn(
             "Testsuite.to_xml_string is deprecated. It will be removed in version 2.0.0. "
             "Use function to_xml_report_string",
@@ -265,6 +362,8 @@ class TestSuite(object):
         """
         Writes the JUnit XML document to a file.
         """
+        import warnings
+
         warnings.warn(
             "Testsuite.to_file is deprecated. It will be removed in version 2.0.0. Use function to_xml_report_file",
             DeprecationWarning,
@@ -272,98 +371,1398 @@ class TestSuite(object):
         to_xml_report_file(file_descriptor, test_suites, prettyprint, encoding)
 
 
-def to_xml_report_string(test_suites, prettyprint=True, encoding=None):
+def to_xml_report_string(test_suites, prettyprint=True, encoding=None, workers=None, policy=None, stats=None):
     """
     Returns the string representation of the JUnit XML document.
+    Pretty output is indented while serializing and matches what minidom's toprettyxml() produced for the
+    document, without reparsing it.
     @param encoding: The encoding of the input.
+    @param workers: Serializes the test suites in a pool of this many processes, started the platform's default
+                    way. Off by default. The test suites must be picklable, and are sent to the processes;
+                    that often costs more than serializing them does, see benchmarks/parallel.py.
+    @param policy: An OutputPolicy limiting the captured output in the report. Cannot be used with workers.
+    @param stats: A ReportStats collecting the time spent in every phase.
     @return: unicode string
     """
+    if policy:
+        f = io.StringIO()
+        _write_report_with_policy(f, test_suites, prettyprint, encoding, workers, policy, stats)
+        return f.getvalue()
+
+    pieces = []
+    _write_report(pieces.append, test_suites, prettyprint, encoding, workers, stats)
+    start = _clock() if stats is not None else None
+    xml_string = "".join(pieces)
+
+    charref_encoding = _charref_encoding(prettyprint, encoding)
+    if charref_encoding:
+        # characters the encoding cannot represent become character references
+        xml_string = xml_string.encode(charref_encoding, "xmlcharrefreplace").decode(charref_encoding)
+    if stats is not None:
+        stats.add_phase("encode", _clock() - start, len(xml_string))
+    # is unicode now
+    return xml_string
+
+
+def to_xml_report_file(
+    file_descriptor,
+    test_suites,
+    prettyprint=True,
+    encoding=None,
+    workers=None,
+    policy=None,
+    compression=None,
+    compresslevel=None,
+    stats=None,
+):
+    """
+    Writes the JUnit XML document to a file, in chunks as it is serialized.
+    A file opened in binary mode is written the document encoded in encoding, or UTF-8 if none is given,
+    with characters the encoding cannot represent written as character references.
+    @param policy: An OutputPolicy limiting the captured output in the report. Cannot be used with workers.
+    @param compression: "gzip", "bz2" or "xz" to compress the document as it is written, to a binary file.
+    @param compresslevel: The compression level, see junit_xml.compression.CompressedFile.
+    @param stats: A ReportStats collecting the time spent in every phase.
+    """
+    output = _compressed_output(file_descriptor, compression, compresslevel)
+    if policy:
+        _write_report_with_policy(output, test_suites, prettyprint, encoding, workers, policy, stats)
+    else:
+        sink = _ReportSink(output, prettyprint, encoding, stats=stats)
+        _write_report(sink.write, test_suites, prettyprint, encoding, workers, stats)
+        sink.flush()
+    if compression:
+        start = _clock() if stats is not None else None
+        output.finish()
+        if stats is not None:
+            stats.add_phase("write", _clock() - start)
+
+
+def _compressed_output(file_descriptor, compression, compresslevel):
+    """
+    Returns the file to write a report to, compressing it into file_descriptor if compression is given.
+    """
+    if not compression:
+        return file_descriptor
+    if not _is_binary_file(file_descriptor):
+        raise ValueError("compressed reports must be written to a file opened in binary mode")
+    from junit_xml.compression import CompressedFile
+
+    return CompressedFile(file_descriptor, compression, compresslevel)
+
 
+def _write_report_with_policy(file_descriptor, test_suites, prettyprint, encoding, workers, policy, stats):
+    """
+    Writes the JUnit XML document with a JUnitXMLWriter, which spools the output of a test suite before writing
+    the properties that record what the policy left out of it.
+    """
+    if workers:
+        raise ValueError("an output policy cannot be used with workers")
     try:
         iter(test_suites)
     except TypeError:
         raise TypeError("test_suites must be a list of test suites")
+    with JUnitXMLWriter(
+        file_descriptor, prettyprint=prettyprint, encoding=encoding, policy=policy, stats=stats
+    ) as writer:
+        for ts in test_suites:
+            writer.write_test_suite(ts)
 
-    xml_element = ET.Element("testsuites")
-    attributes = defaultdict(int)
+
+def _write_report(write, test_suites, prettyprint, encoding, workers, stats=None):
+    """
+    Serializes the JUnit XML document piece by piece, one test case at a time unless workers are used.
+    """
+    try:
+        iter(test_suites)
+    except TypeError:
+        raise TypeError("test_suites must be a list of test suites")
+    test_suites = list(test_suites)
+
+    start = _clock() if stats is not None else None
+    totals = _ReportTotals()
     for ts in test_suites:
-        ts_xml = ts.build_xml_doc(encoding=encoding)
-        for key in ["disabled", "errors", "failures", "tests"]:
-            attributes[key] += int(ts_xml.get(key, 0))
-        for key in ["time"]:
-            attributes[key] += float(ts_xml.get(key, 0))
-        xml_element.append(ts_xml)
-    for key, value in iteritems(attributes):
-        xml_element.set(key, str(value))
-
-    xml_string = ET.tostring(xml_element, encoding=encoding)
-    # is encoded now
-    xml_string = _clean_illegal_xml_chars(xml_string.decode(encoding or "utf-8"))
-    # is unicode now
+        totals.add(ts._totals())
+    if stats is not None:
+        stats.add_phase("totals", _clock() - start, cases=totals.tests)
+
+    write(_xml_declaration(prettyprint, encoding))
+    write(_start_tag("testsuites", totals.attributes(), prettyprint))
+    write(_end_start_tag(not test_suites, prettyprint))
+    values = _value_cache(prettyprint)
+    if workers:
+        start = _clock() if stats is not None else None
+        xml_strings = _serialize_test_suites(test_suites, prettyprint, encoding, workers)
+        if stats is not None:
+            # the pool builds and serializes the test suites, only their sizes are known
+            stats.add_phase("serialize", _clock() - start, sum(len(x) for x in xml_strings), totals.tests)
+            for ts, xml_string in zip(test_suites, xml_strings):
+                stats.add_suite(ts.name, ts.tests, None, len(xml_string))
+        for xml_string in xml_strings:
+            write(xml_string)
+    elif stats is not None:
+        for ts in test_suites:
+            _write_test_suite_with_stats(write, ts, prettyprint, encoding, stats, values)
+    else:
+        for ts in test_suites:
+            _write_test_suite(write, ts, prettyprint, encoding, values)
+    if test_suites:
+        write("</testsuites>\n" if prettyprint else "</testsuites>")
 
+
+def _write_test_suite(write, test_suite, prettyprint, encoding, values=None):
+    """
+    Serializes the testsuite element of a test suite as a child of testsuites, without building the element
+    for all of its test cases at once. Writes the same markup as serializing test_suite.build_xml_doc().
+    @param values: The _ValueCache of the report being written, one for this test suite if None.
+    """
+    if values is None:
+        values = _value_cache(prettyprint)
+    indent = "\t" if prettyprint else ""
+    attributes = test_suite._build_attributes(test_suite._totals(), encoding, values)
+    header = test_suite._build_header_elements(encoding, lazy=True)
+    empty = not header and not len(test_suite.test_cases)
+    write(indent + _start_tag("testsuite", attributes, prettyprint, values) + _end_start_tag(empty, prettyprint))
+    if empty:
+        return
+    for element in header:
+        _write_element(write, element, prettyprint, level=2)
+    for case in test_suite.test_cases:
+        _write_element(write, case._build_xml_doc(encoding, lazy=True, values=values), prettyprint, 2, values)
+    write(indent + "</testsuite>" + ("\n" if prettyprint else ""))
+
+
+def _write_test_suite_with_stats(write, test_suite, prettyprint, encoding, stats, values):
+    """
+    Serializes a test suite like _write_test_suite(), timing the building and serializing of every element.
+    The time spent writing to the file while serializing is left to the write phase.
+    """
+    size = [0]
+
+    def counting_write(text):
+        size[0] += len(text)
+        write(text)
+
+    def serialize(element, level):
+        start = _clock()
+        written = stats.seconds("write")
+        _write_element(counting_write, element, prettyprint, level, values)
+        return _clock() - start - (stats.seconds("write") - written)
+
+    start = _clock()
+    indent = "\t" if prettyprint else ""
+    attributes = test_suite._build_attributes(test_suite._totals(), encoding, values)
+    header = test_suite._build_header_elements(encoding, lazy=True)
+    empty = not header and not len(test_suite.test_cases)
+    build_seconds = _clock() - start
+    serialize_seconds = 0.0
+    start_tag = _start_tag("testsuite", attributes, prettyprint, values)
+    counting_write(indent + start_tag + _end_start_tag(empty, prettyprint))
+    cases = 0
+    if not empty:
+        for element in header:
+            serialize_seconds += serialize(element, 2)
+        for case in test_suite.test_cases:
+            start = _clock()
+            element = case._build_xml_doc(encoding, lazy=True, values=values)
+            build_seconds += _clock() - start
+            serialize_seconds += serialize(element, 2)
+            cases += 1
+        counting_write(indent + "</testsuite>" + ("\n" if prettyprint else ""))
+    stats.add_phase("build", build_seconds, cases=cases)
+    stats.add_phase("serialize", serialize_seconds, size[0], cases)
+    stats.add_suite(test_suite.name, cases, build_seconds + serialize_seconds, size[0])
+
+
+def _serialize_test_suite(test_suite, prettyprint, encoding):
+    """
+    Returns the testsuite element of a test suite as a string, indented to be a child of testsuites.
+    """
+    pieces = []
+    _write_test_suite(pieces.append, test_suite, prettyprint, encoding)
+    return "".join(pieces)
+
+
+def _serialize_test_suites(test_suites, prettyprint, encoding, workers):
+    """
+    Returns the serialized test suites in order, serialized in a process pool if workers is given.
+    The pool uses the platform's default start method, and the test suites are pickled to it.
+    """
+    if not workers or len(test_suites) < 2:
+        return [_serialize_test_suite(ts, prettyprint, encoding) for ts in test_suites]
+
+    import functools
+    import multiprocessing
+
+    serialize = functools.partial(_serialize_test_suite, prettyprint=prettyprint, encoding=encoding)
+    chunksize = max(1, len(test_suites) // (workers * 4))
+    pool = multiprocessing.Pool(workers)
+    try:
+        return pool.map(serialize, test_suites, chunksize=chunksize)
+    finally:
+        pool.close()
+        pool.join()
+
+
+# Unicode characters identified as "illegal or discouraged" in XML
+# @see: http://stackoverflow.com/questions/1707890/fast-way-to-filter-illegal-xml-unicode-chars-in-python
+_illegal_unichrs = [
+    (0x00, 0x08),
+    (0x0B, 0x1F),
+    (0x7F, 0x84),
+    (0x86, 0x9F),
+    (0xD800, 0xDFFF),
+    (0xFDD0, 0xFDDF),
+    (0xFFFE, 0xFFFF),
+    (0x1FFFE, 0x1FFFF),
+    (0x2FFFE, 0x2FFFF),
+    (0x3FFFE, 0x3FFFF),
+    (0x4FFFE, 0x4FFFF),
+    (0x5FFFE, 0x5FFFF),
+    (0x6FFFE, 0x6FFFF),
+    (0x7FFFE, 0x7FFFF),
+    (0x8FFFE, 0x8FFFF),
+    (0x9FFFE, 0x9FFFF),
+    (0xAFFFE, 0xAFFFF),
+    (0xBFFFE, 0xBFFFF),
+    (0xCFFFE, 0xCFFFF),
+    (0xDFFFE, 0xDFFFF),
+    (0xEFFFE, 0xEFFFF),
+    (0xFFFFE, 0xFFFFF),
+    (0x10FFFE, 0x10FFFF),
+]
+
+# the compiled (all illegal characters, illegal ASCII characters) expressions, for text and for attribute values,
+# compiled on first use
+_sanitizer_res = None
+
+
+def _sanitizer():
+    global _sanitizer_res
+    if _sanitizer_res is None:
+        import re
+
+        def compile_ranges(ranges):
+            return re.compile(
+                "[%s]" % "".join(["%s-%s" % (chr(low), chr(high)) for (low, high) in ranges if low < sys.maxunicode])
+            )
+
+        # a carriage return in an attribute value is written as a character reference, which keeps it
+        attribute_unichrs = [(0x0B, 0x0C), (0x0E, 0x1F)] + [r for r in _illegal_unichrs if r != (0x0B, 0x1F)]
+        _sanitizer_res = (
+            # the illegal characters a pure ASCII string can contain come second
+            (compile_ranges(_illegal_unichrs), compile_ranges([(0x00, 0x08), (0x0B, 0x1F), (0x7F, 0x7F)])),
+            (
+                compile_ranges(attribute_unichrs),
+                compile_ranges([(0x00, 0x08), (0x0B, 0x0C), (0x0E, 0x1F), (0x7F, 0x7F)]),
+            ),
+        )
+    return _sanitizer_res
+
+
+def _clean_illegal_xml_chars(string_to_clean, attribute=False):
+    """
+    Removes any illegal unicode characters from the given XML string.
+    @param attribute: Keeps carriage returns, which an attribute value can hold as a character reference.
+    """
+    illegal_re, illegal_ascii_re = _sanitizer()[attribute]
+    if string_to_clean.isascii():
+        # printable ASCII, the bulk of any report, cannot contain illegal characters
+        if string_to_clean.isprintable():
+            return string_to_clean
+        if not illegal_ascii_re.search(string_to_clean):
+            return string_to_clean
+        return illegal_ascii_re.sub("", string_to_clean)
+    return illegal_re.sub("", string_to_clean)
+
+
+def _clean_attribute_value(string_to_clean):
+    return _clean_illegal_xml_chars(string_to_clean, attribute=True)
+
+
+def _xml_text(var, encoding):
+    """
+    Decodes a user supplied attribute value and removes any characters illegal in XML from it.
+    """
+    return _clean_attribute_value(decode(var, encoding))
+
+
+# the attributes whose values repeat across the test cases of a report, e.g. every test case of a class has its
+# classname, and the number of distinct values of them a report write keeps decoded and escaped
+_REPEATED_ATTRIBUTES = frozenset(("classname", "file", "url", "log", "hostname", "package"))
+_VALUE_CACHE_SIZE = 1024
+
+
+class _ValueCache(object):
+    """
+    The decoded and escaped forms of the repeated attribute values of one report write, in bounded LRU caches.
+    Equal values decode to one string object, and every attribute is escaped once while it stays cached.
+    A report whose values turn out not to repeat is written uncached from then on, a cache miss costing more than
+    decoding and escaping a value does.
+    """
+
+    def __init__(self, prettyprint, maxsize):
+        import functools
+
+        self._maxsize = maxsize
+        self._lookups = 0
+        # a string decodes to itself whatever the encoding, it is the whole key
+        self._decoded = functools.lru_cache(maxsize)(_clean_attribute_value)
+        # the attributes as they are written into a start tag, e.g. ' classname="a.b"', by attribute name
+        self.attributes = dict(
+            (key, functools.lru_cache(maxsize)(functools.partial(_attribute, key, prettyprint=prettyprint)))
+            for key in _REPEATED_ATTRIBUTES
+        )
+        self.xml_text = self._cached_xml_text
+
+    def _cached_xml_text(self, var, encoding):
+        # only strings are cached, equal numbers of different types decode differently
+        if type(var) is not str:
+            return _xml_text(var, encoding)
+        self._lookups += 1
+        if self._lookups == self._maxsize:
+            self._lookups = 0
+            hits, misses, _, _ = self._decoded.cache_info()
+            if hits < misses:
+                self.xml_text = _xml_text
+                self.attributes = {}
+        return self._decoded(var)
+
+
+def _value_cache(prettyprint):
+    """
+    Returns the _ValueCache for a report write, or None if it is turned off by a _VALUE_CACHE_SIZE of 0.
+    """
+    if not _VALUE_CACHE_SIZE:
+        return None
+    return _ValueCache(prettyprint, _VALUE_CACHE_SIZE)
+
+
+# size of the chunks read from files given as stdout, stderr or output
+_SOURCE_CHUNK_SIZE = 64 * 1024
+
+
+def _is_lazy_source(var):
+    """
+    Returns whether a stdout, stderr or output value is read while serializing: a path (other than a plain
+    string, which is the text itself), an open file or a callable.
+    """
+    return isinstance(var, os.PathLike) or hasattr(var, "read") or callable(var)
+
+
+def _iter_source_chunks(source):
+    """
+    Yields the content of a lazy source as text or bytes chunks.
+    A path is opened and read, an open file is read from its start if it can seek, and a callable is called and
+    what it returns read the same way; it can also return an iterable of chunks.
+    """
+    if source is None:
+        return
+    if isinstance(source, (str, bytes)):
+        yield source
+    elif isinstance(source, os.PathLike):
+        with open(source, "rb") as f:
+            for chunk in _iter_source_chunks(f):
+                yield chunk
+    elif hasattr(source, "read"):
+        if getattr(source, "seekable", lambda: False)():
+            source.seek(0)
+        while True:
+            chunk = source.read(_SOURCE_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+    elif callable(source):
+        for chunk in _iter_source_chunks(source()):
+            yield chunk
+    else:
+        for chunk in source:
+            yield chunk
+
+
+def _iter_source_text(source, encoding):
+    """
+    Yields the content of a lazy source in decoded chunks with the characters illegal in XML removed.
+    Bytes are decoded with encoding, or UTF-8, replacing what cannot be decoded.
+    """
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")("replace")
+    held_back = ""
+    for chunk in _iter_source_chunks(source):
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        text = held_back + decode(chunk, encoding)
+        # a line end split across chunks is kept together, so that "\r\n" is escaped as one
+        held_back = ""
+        if text.endswith("\r"):
+            text, held_back = text[:-1], text[-1:]
+        text = _clean_illegal_xml_chars(text)
+        if text:
+            yield text
+    text = _clean_illegal_xml_chars(held_back + decoder.decode(b"", True))
+    if text:
+        yield text
+
+
+class _LazyText(object):
+    """The text of an element, read from a lazy source while the element is serialized."""
+
+    __slots__ = ("source", "encoding", "limiter")
+
+    def __init__(self, source, encoding, limiter=None):
+        self.source = source
+        self.encoding = encoding
+        self.limiter = limiter
+
+    def __iter__(self):
+        chunks = _iter_source_text(self.source, self.encoding)
+        if self.limiter is not None:
+            chunks = self.limiter.limit(chunks)
+        return iter(chunks)
+
+
+def _xml_content(var, encoding, lazy, limiter=None):
+    """
+    Returns the text of an element holding stdout, stderr or output, which can be a lazy source.
+    Lazy sources are read now, or when the element is serialized if lazy is set. An output limiter applies its
+    policy to the text, as it is read.
+    """
+    if limiter is not None and limiter.limits_size:
+        if lazy:
+            return _LazyText(var, encoding, limiter)
+        if _is_lazy_source(var):
+            return "".join(limiter.limit(_iter_source_text(var, encoding)))
+        return "".join(limiter.limit([_clean_illegal_xml_chars(decode(var, encoding))]))
+    if not _is_lazy_source(var):
+        return _clean_illegal_xml_chars(decode(var, encoding))
+    if lazy:
+        return _LazyText(var, encoding)
+    return "".join(_iter_source_text(var, encoding))
+
+
+class OutputPolicy(object):
+    """
+    Limits the captured output of a report: stdout and stderr, and the output of failures, errors and skips.
+    What was truncated or dropped is recorded in the properties of each test suite.
+
+    @param max_field_size: Maximum size in bytes (as UTF-8) of each output. Of longer output, the head and the tail
+                           are kept with truncated_marker in between.
+    @param max_report_size: Maximum size in bytes of all output in the report. Output beyond it is replaced by
+                            dropped_marker.
+    @param drop_passed: Leaves out stdout and stderr of test cases that passed.
+    @param drop_skipped: Leaves out stdout, stderr and the skip output of test cases that were skipped.
+    """
+
+    truncated_marker = "\n[... %d bytes truncated ...]\n"
+    dropped_marker = "[... output dropped, report output limit reached ...]"
+
+    def __init__(self, max_field_size=None, max_report_size=None, drop_passed=False, drop_skipped=False):
+        self.max_field_size = max_field_size
+        self.max_report_size = max_report_size
+        self.drop_passed = drop_passed
+        self.drop_skipped = drop_skipped
+
+
+class _OutputLimiter(object):
+    """
+    Applies an OutputPolicy to the output of one report, and counts per test suite what it left out.
+    """
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.limits_size = policy.max_field_size is not None or policy.max_report_size is not None
+        self.report_size_left = policy.max_report_size
+        self.begin_suite()
+
+    def begin_suite(self):
+        self.truncated_fields = 0
+        self.truncated_bytes = 0
+        self.dropped_fields = 0
+
+    def properties(self):
+        """
+        Returns the properties recording what was left out of the output of the current test suite.
+        """
+        properties = {}
+        if self.truncated_fields:
+            properties["output-truncated-fields"] = str(self.truncated_fields)
+            properties["output-truncated-bytes"] = str(self.truncated_bytes)
+        if self.dropped_fields:
+            properties["output-dropped-fields"] = str(self.dropped_fields)
+        return properties
+
+    def keeps_output(self, test_case):
+        """
+        Returns whether stdout and stderr of a test case are written.
+        """
+        if test_case.is_failure() or test_case.is_error():
+            return True
+        if test_case.is_skipped():
+            return not self.policy.drop_skipped
+        return not self.policy.drop_passed
+
+    def drop(self, *outputs):
+        self.dropped_fields += sum(1 for output in outputs if output)
+
+    def limit(self, chunks):
+        """
+        Yields the text chunks of one output within the size limits, keeping its head and tail.
+        Holds at most the size of the tail, plus a chunk, in memory.
+        """
+        limit = self.policy.max_field_size
+        if self.report_size_left is not None and (limit is None or self.report_size_left < limit):
+            limit = self.report_size_left
+        if limit is None:
+            for chunk in chunks:
+                yield chunk
+            return
+        if limit <= 0:
+            # the source is not read at all
+            self.dropped_fields += 1
+            yield self.policy.dropped_marker
+            return
+
+        head_left = limit // 2
+        tail_size = limit - head_left
+        tail = bytearray()
+        written = truncated = 0
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            if head_left:
+                cut = min(head_left, len(data))
+                # the head ends before a character split by the cut
+                while 0 < cut < len(data) and ord(data[cut:cut + 1]) & 0xC0 == 0x80:
+                    cut -= 1
+                head_left = head_left - cut if cut == len(data) else 0
+                if cut:
+                    written += cut
+                    yield data[:cut].decode("utf-8")
+                data = data[cut:]
+            tail += data
+            if len(tail) > 2 * tail_size:
+                truncated += len(tail) - tail_size
+                del tail[: len(tail) - tail_size]
+        if len(tail) > tail_size:
+            truncated += len(tail) - tail_size
+            del tail[: len(tail) - tail_size]
+        if truncated:
+            # the tail starts after a character split by the truncation
+            start = 0
+            while start < len(tail) and tail[start] & 0xC0 == 0x80:
+                start += 1
+            truncated += start
+            del tail[:start]
+            self.truncated_fields += 1
+            self.truncated_bytes += truncated
+            yield self.policy.truncated_marker % truncated
+        written += len(tail)
+        if tail:
+            yield bytes(tail).decode("utf-8")
+        if self.report_size_left is not None:
+            self.report_size_left -= written
+
+
+# the clock phases are timed with
+_clock = time.perf_counter
+
+
+class ReportStats(object):
+    """
+    Collects where the time goes while a report is written, when given as stats to to_xml_report_string(),
+    to_xml_report_file() or JUnitXMLWriter. Nothing is measured without it.
+
+    phases maps each phase to its wall time in seconds, the bytes (characters, for text) it produced and the test
+    cases it handled:
+        totals     summing up the totals of the test suites
+        build      building the elements of test suites and test cases, decoding and cleaning their text
+        serialize  serializing the elements: escaping, and reading output given as paths, files or callables
+        spool      writing serialized test cases to the temporary file of a JUnitXMLWriter
+        write      encoding the document and writing it to the file, compressed if asked to
+        encode     joining the string of to_xml_report_string() and replacing characters with references
+    suites lists the name, test cases, seconds (building and serializing) and bytes of every test suite.
+
+    Subclasses can override add_phase() and add_suite(), to pass the numbers on as they are measured.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.suites = []
+
+    def add_phase(self, phase, seconds, bytes=0, cases=0):
+        stats = self.phases.get(phase)
+        if stats is None:
+            stats = self.phases[phase] = {"seconds": 0.0, "bytes": 0, "cases": 0}
+        stats["seconds"] += seconds
+        stats["bytes"] += bytes
+        stats["cases"] += cases
+
+    def add_suite(self, name, cases, seconds, bytes):
+        self.suites.append({"name": name, "cases": cases, "seconds": seconds, "bytes": bytes})
+
+    def seconds(self, phase):
+        return self.phases[phase]["seconds"] if phase in self.phases else 0.0
+
+    def __str__(self):
+        lines = ["%-10s %10s %12s %10s" % ("phase", "seconds", "bytes", "cases")]
+        for phase, stats in sorted(self.phases.items()):
+            lines.append("%-10s %10.4f %12d %10d" % (phase, stats["seconds"], stats["bytes"], stats["cases"]))
+        return "\n".join(lines)
+
+
+class _SuiteTotals(object):
+    """
+    Running totals of the test cases of one test suite.
+    When tracking a list of test cases, the total time is summed in the same order sum() would, and is summed
+    again only after the list or the time of a test case other than the last one changed.
+    """
+
+    @classmethod
+    def of(cls, test_cases):
+        """
+        Returns the totals of test cases as they are now.
+        """
+        totals = cls()
+        apply = totals._apply
+        for case in test_cases:
+            apply(case._result(), 1)
+        return totals
+
+    # replaced by new totals, and no longer updated by the test cases that still refer to it
+    _abandoned = False
+
+    def __init__(self, test_cases=None):
+        self.tests = 0
+        self.failures = 0
+        self.errors = 0
+        self.skipped = 0
+        self.disabled = 0
+        self._assertions = 0
+        self._assertion_cases = 0
+        self._time = 0
+        self._exact_time = True
+        self._test_cases = test_cases
+
+    @property
+    def assertions(self):
+        """The number of assertions, None if no test case counted any"""
+        return self._assertions if self._assertion_cases else None
+
+    @property
+    def time(self):
+        if not self._exact_time:
+            self._time = sum(c.elapsed_sec for c in self._test_cases if c.elapsed_sec)
+            self._exact_time = True
+        return self._time
+
+    def add(self, case, last=True):
+        self._apply(case._result(), 1, last)
+
+    def remove(self, case):
+        self._apply(case._result(), -1)
+
+    def update(self, case, before):
+        """
+        Replaces what a test case counted before its result changed with what it counts now.
+        """
+        after = case._result()
+        if before == after:
+            return
+        self._apply(before[:5] + (None,), -1)
+        self._apply(after[:5] + (None,), 1)
+        if before[5] != after[5]:
+            if not before[5] and self._test_cases and self._test_cases[-1] is case:
+                self._apply_time(after[5], 1, True)
+            else:
+                self._exact_time = False
+
+    def _apply(self, result, sign, last=True):
+        failure, error, skipped, disabled, assertions, elapsed_sec = result
+        self.tests += sign
+        self.failures += sign * failure
+        self.errors += sign * error
+        self.skipped += sign * skipped
+        self.disabled += sign * disabled
+        if assertions:
+            self._assertion_cases += sign
+            self._assertions += sign * int(assertions)
+        self._apply_time(elapsed_sec, sign, last)
+
+    def _apply_time(self, elapsed_sec, sign, last):
+        if elapsed_sec:
+            if sign > 0 and last and self._exact_time:
+                self._time += elapsed_sec
+            else:
+                self._exact_time = False
+
+
+class _ListTotals(_SuiteTotals):
+    """
+    Running totals of a plain list of test cases, which does not report what is added to it. Test cases appended
+    to the list are counted when the totals are next read. A list that got shorter, or whose last counted test
+    case was replaced, is counted again by new totals.
+    """
+
+    def __init__(self, test_cases):
+        _SuiteTotals.__init__(self, test_cases)
+        self._counted = 0
+        self._last = None
+
+    def __reduce__(self):
+        # the test cases of an unpickled list are counted again
+        return (_ListTotals, (self._test_cases,))
+
+    def follows(self):
+        """Returns whether the list only had test cases appended since it was last counted."""
+        counted = self._counted
+        test_cases = self._test_cases
+        return len(test_cases) >= counted and (not counted or test_cases[counted - 1] is self._last)
+
+    def count_appended(self):
+        """Counts the test cases appended to the list since it was last counted, and returns these totals."""
+        test_cases = self._test_cases
+        if len(test_cases) > self._counted:
+            for case in itertools.islice(test_cases, self._counted, None):
+                self.add(case)
+                if case._suite_totals:
+                    case._suite_totals = [totals for totals in case._suite_totals if not totals._abandoned]
+                    case._suite_totals.append(self)
+                else:
+                    case._suite_totals = [self]
+            self._counted = len(test_cases)
+            self._last = test_cases[-1]
+        return self
+
+    def recounted(self):
+        """Returns new totals of the list, counted from its test cases as they are now."""
+        self._abandoned = True
+        return _ListTotals(self._test_cases).count_appended()
+
+
+class _TestCaseList(list):
+    """
+    A list of test cases that keeps running totals of them as test cases are added or removed, and as the test
+    cases report changes of their results through their methods and properties. Results changed by editing the
+    entries of failures, errors or skipped in place are counted by recount().
+    """
+
+    def __init__(self, iterable=()):
+        list.__init__(self, iterable)
+        self.totals = _SuiteTotals(self)
+        for case in self:
+            self._attach(case)
+
+    def __reduce__(self):
+        return (_TestCaseList, (list(self),))
+
+    def _attach(self, case, last=True):
+        self.totals.add(case, last)
+        if case._suite_totals is None:
+            case._suite_totals = []
+        case._suite_totals.append(self.totals)
+
+    def _detach(self, case):
+        self.totals.remove(case)
+        case._suite_totals.remove(self.totals)
+
+    def recount(self):
+        """Counts the test cases again, with new totals."""
+        totals = self.totals
+        totals._abandoned = True
+        self.totals = type(totals)(self)
+        for case in self:
+            case._suite_totals.remove(totals)
+            self._attach(case)
+
+    def _recount(self, mutate, *args):
+        for case in self:
+            self._detach(case)
+        result = mutate(self, *args)
+        for case in self:
+            self._attach(case, last=False)
+        return result
+
+    def append(self, case):
+        list.append(self, case)
+        self._attach(case)
+
+    def extend(self, cases):
+        for case in cases:
+            self.append(case)
+
+    def __iadd__(self, cases):
+        self.extend(cases)
+        return self
+
+    def insert(self, index, case):
+        list.insert(self, index, case)
+        self._attach(case, last=False)
+
+    def remove(self, case):
+        list.remove(self, case)
+        self._detach(case)
+
+    def pop(self, index=-1):
+        case = list.pop(self, index)
+        self._detach(case)
+        return case
+
+    def clear(self):
+        self._recount(list.__delitem__, slice(None))
+
+    def __setitem__(self, index, value):
+        self._recount(list.__setitem__, index, value)
+
+    def __delitem__(self, index):
+        self._recount(list.__delitem__, index)
+
+    def __imul__(self, n):
+        return self._recount(list.__imul__, n)
+
+    def sort(self, *args, **kwargs):
+        list.sort(self, *args, **kwargs)
+        self.totals._exact_time = False
+
+    def reverse(self):
+        list.reverse(self)
+        self.totals._exact_time = False
+
+
+class _ReportTotals(object):
+    """Running totals of the test suites of one report."""
+
+    def __init__(self):
+        self.suites = 0
+        self.tests = 0
+        self.failures = 0
+        self.errors = 0
+        self.disabled = 0
+        self.time = 0
+
+    def add(self, suite_totals):
+        self.suites += 1
+        self.disabled += suite_totals.disabled
+        self.errors += suite_totals.errors
+        self.failures += suite_totals.failures
+        self.tests += suite_totals.tests
+        self.time += float(suite_totals.time)
+
+    def attributes(self):
+        """
+        Returns the attributes of the testsuites element, none for a report without suites.
+        """
+        if not self.suites:
+            return {}
+        return {
+            "disabled": str(self.disabled),
+            "errors": str(self.errors),
+            "failures": str(self.failures),
+            "tests": str(self.tests),
+            "time": str(self.time),
+        }
+
+
+def _xml_declaration(prettyprint, encoding):
+    """
+    Returns the XML declaration written by ElementTree (compact) or minidom (pretty), if any.
+    """
     if prettyprint:
-        # minidom.parseString() works just on correctly encoded binary strings
-        xml_string = xml_string.encode(encoding or "utf-8")
-        xml_string = xml.dom.minidom.parseString(xml_string)
-        # toprettyxml() produces unicode if no encoding is being passed or binary string with an encoding
-        xml_string = xml_string.toprettyxml(encoding=encoding)
         if encoding:
-            xml_string = xml_string.decode(encoding)
-        # is unicode now
-    return xml_string
+            return '<?xml version="1.0" encoding="%s"?>\n' % encoding
+        return '<?xml version="1.0" ?>\n'
+    if encoding and encoding.lower() not in ("utf-8", "us-ascii"):
+        return "<?xml version='1.0' encoding='%s'?>\n" % encoding
+    return ""
 
 
-def to_xml_report_file(file_descriptor, test_suites, prettyprint=True, encoding=None):
+def _charref_encoding(prettyprint, encoding):
     """
-    Writes the JUnit XML document to a file.
+    Returns the encoding whose unrepresentable characters become character references, as ElementTree (compact)
+    and minidom (pretty) replaced them, if any.
     """
-    xml_string = to_xml_report_string(test_suites, prettyprint=prettyprint, encoding=encoding)
-    # has problems with encoded str with non-ASCII (non-default-encoding) characters!
-    file_descriptor.write(xml_string)
+    if encoding:
+        return encoding
+    if not prettyprint:
+        return "us-ascii"
+    return None
 
 
-def _clean_illegal_xml_chars(string_to_clean):
+def _escape_cdata(text, prettyprint):
     """
-    Removes any illegal unicode characters from the given XML string.
+    Escapes character data the way ElementTree (compact) or minidom (pretty) writes it.
+    """
+    text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    if prettyprint:
+        text = text.replace('"', "&quot;")
+        # minidom only ever sees the text after an XML parser normalized its line ends
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def _escape_attrib(text, prettyprint):
+    """
+    Escapes an attribute value the way ElementTree (compact) or minidom (pretty) writes it.
+    """
+    text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+    if not prettyprint:
+        text = text.replace("\r", "&#13;").replace("\n", "&#10;").replace("\t", "&#09;")
+    return text
+
+
+def _start_tag(tag, attrib, prettyprint, values=None):
+    """
+    Returns the unterminated start tag of an element, e.g. '<testcase name="Test1"'.
+    @param values: The _ValueCache of the report being written, which escapes the values that repeat, if any.
+    """
+    parts = ["<", tag]
+    cached = values.attributes if values is not None else {}
+    for key, value in attrib.items():
+        attribute = cached.get(key)
+        parts.append(_attribute(key, value, prettyprint) if attribute is None else attribute(value))
+    return "".join(parts)
+
+
+def _attribute(key, value, prettyprint):
+    """
+    Returns an attribute as it is written into a start tag, e.g. ' name="Test1"'.
+    """
+    return ' %s="%s"' % (key, _escape_attrib(value, prettyprint))
+
+
+def _end_start_tag(empty, prettyprint):
+    """
+    Returns what terminates a start tag, for elements with or without content.
+    """
+    if not empty:
+        return ">\n" if prettyprint else ">"
+    return "/>\n" if prettyprint else " />"
+
+
+def _write_element(write, element, prettyprint, level=0, values=None):
+    """
+    Serializes an ElementTree element without building the document string first.
+    Pretty output is indented with tabs like minidom's toprettyxml(), compact output matches ET.tostring().
+    The text of an element can be a _LazyText, which is read and escaped one chunk at a time.
+    """
+    indent = "\t" * level if prettyprint else ""
+    write(indent + _start_tag(element.tag, element.attrib, prettyprint, values))
+    if len(element):
+        write(_end_start_tag(False, prettyprint))
+        for child in element:
+            _write_element(write, child, prettyprint, level + 1, values)
+        write(indent + "</%s>%s" % (element.tag, "\n" if prettyprint else ""))
+    elif isinstance(element.text, _LazyText):
+        chunks = iter(element.text)
+        first = next(chunks, None)
+        if first is None:
+            # written like an element whose text is empty
+            write(_end_start_tag(True, prettyprint))
+            return
+        write(">" + _escape_cdata(first, prettyprint))
+        for chunk in chunks:
+            write(_escape_cdata(chunk, prettyprint))
+        write("</%s>%s" % (element.tag, "\n" if prettyprint else ""))
+    elif element.text:
+        write(">" + _escape_cdata(element.text, prettyprint))
+        write("</%s>%s" % (element.tag, "\n" if prettyprint else ""))
+    elif element.text is not None and not prettyprint:
+        # text made of illegal characters only, which ElementTree wrote before they were removed
+        write("></%s>" % element.tag)
+    else:
+        write(_end_start_tag(True, prettyprint))
+
+
+def _is_binary_file(file_descriptor):
+    """
+    Returns whether a file takes bytes rather than text.
+    """
+    if isinstance(file_descriptor, (io.RawIOBase, io.BufferedIOBase)):
+        return True
+    # files that take text, like those of codecs.open(), may still have been opened with mode "wb"
+    return False
+
+
+def _bomless_encoding(encoding):
+    """
+    Returns the encoding that writes what encoding writes after its byte order mark, if it writes one.
+    """
+    name = codecs.lookup(encoding).name
+    if name in ("utf-16", "utf-32"):
+        return "%s-%s" % (name, "le" if sys.byteorder == "little" else "be")
+    if name == "utf-8-sig":
+        return "utf-8"
+    return encoding
+
+
+class _ReportSink(object):
+    """
+    Collects the pieces of a document and writes them to a file in chunks, as text or, to a binary file,
+    encoded. Characters the output encoding cannot represent become character references.
+    A binary file is written one stream of the encoding, with a byte order mark at its start if the encoding
+    writes one and bom is set.
+    """
+
+    def __init__(
+        self, file_descriptor, prettyprint, encoding, chunk_size=64 * 1024, stats=None, phase="write", bom=True
+    ):
+        self.file_descriptor = file_descriptor
+        self.chunk_size = chunk_size
+        # a ReportStats the time spent writing is added to, as phase
+        self.stats = stats
+        self.phase = phase
+        self.binary = _is_binary_file(file_descriptor)
+        # the encoding of the bytes written to a binary file, or the one text is limited to
+        self.encoding = _charref_encoding(prettyprint, encoding)
+        if self.binary:
+            self.encoding = self.encoding or "utf-8"
+            self._encoder = codecs.getincrementalencoder(self.encoding)("xmlcharrefreplace")
+            if not bom:
+                # the state after the byte order mark was written
+                self._encoder.setstate(0)
+        self._pieces = []
+        self._size = 0
+
+    def write(self, text):
+        self._pieces.append(text)
+        self._size += len(text)
+        if self._size >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pieces:
+            return
+        start = _clock() if self.stats is not None else None
+        text = "".join(self._pieces)
+        self._pieces = []
+        self._size = 0
+        if self.binary:
+            text = self._encoder.encode(text)
+        elif self.encoding:
+            text = text.encode(self.encoding, "xmlcharrefreplace").decode(self.encoding)
+        self.file_descriptor.write(text)
+        if self.stats is not None:
+            self.stats.add_phase(self.phase, _clock() - start, len(text))
+
+    def tell(self):
+        self.flush()
+        return self.file_descriptor.tell()
+
+    def copy(self, source, length, encoding):
+        """
+        Copies length bytes of the output of another sink, written in encoding without a byte order mark, from a
+        file.
+        """
+        self.flush()
+        start = _clock() if self.stats is not None else None
+        copied = length
+        write = self.file_descriptor.write
+        if self.binary and codecs.lookup(encoding).name == codecs.lookup(self.encoding).name:
+            decoder = None
+            # the copied bytes continue the output, after the byte order mark if it is still to be written
+            write(self._encoder.encode(""))
+        else:
+            decoder = codecs.getincrementaldecoder(_bomless_encoding(encoding))()
+        while length > 0:
+            chunk = source.read(min(self.chunk_size, length))
+            length -= len(chunk)
+            if decoder is None:
+                write(chunk)
+                continue
+            text = decoder.decode(chunk, final=length <= 0)
+            if self.binary:
+                write(self._encoder.encode(text))
+            elif self.encoding:
+                write(text.encode(self.encoding, "xmlcharrefreplace").decode(self.encoding))
+            else:
+                write(text)
+        if self.stats is not None:
+            self.stats.add_phase(self.phase, _clock() - start, copied)
+
+
+class JUnitXMLWriter(object):
+    """
+    Writes a JUnit XML document to a file one test case at a time.
+
+    The markup is the same to_xml_report_file() produces for the same suites, but test cases are
+    serialized as soon as they are written and spooled to a temporary file, so memory stays flat no
+    matter how many test cases the report has. The spool is copied to the file on close(), once the
+    totals of the testsuites element are known. An OutputPolicy given as policy limits the captured output,
+    and compression compresses the document as to_xml_report_file() does.
+
+        with JUnitXMLWriter(f) as writer:
+            writer.begin_suite("my test suite", hostname="localhost")
+            for case in run_tests():
+                writer.write_test_case(case)
+            writer.end_suite()
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        file_descriptor,
+        prettyprint=True,
+        encoding=None,
+        policy=None,
+        compression=None,
+        compresslevel=None,
+        stats=None,
+    ):
+        self.file_descriptor = file_descriptor
+        self.prettyprint = prettyprint
+        self.encoding = encoding
+        self._limiter = _OutputLimiter(policy) if policy else None
+        self._output = _compressed_output(file_descriptor, compression, compresslevel)
+        self._stats = stats
+        # test cases and seconds spent on the current suite, when collecting stats
+        self._suite_cases = 0
+        self._suite_seconds = 0.0
+
+        # the spool holds the output already encoded, as a binary file would be written
+        import tempfile
+
+        self._spool = tempfile.TemporaryFile()
+        self._spool_sink = _ReportSink(
+            self._spool, prettyprint, encoding, self.chunk_size, stats, phase="spool", bom=False
+        )
+        self._suites = []
+        self._totals = _ReportTotals()
+        self._suite = None
+        self._suite_totals = None
+        self._suite_start = None
+        self._closed = False
+        self._values = _value_cache(prettyprint)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._spool.close()
+            self._closed = True
+
+    def begin_suite(self, name, **kwargs):
+        """
+        Starts a new test suite. Takes the same arguments as TestSuite, except for test_cases.
+        @return: The TestSuite holding the suite's attributes. Its properties, stdout and stderr may still be
+                 changed until end_suite() is called.
+        """
+        suite = TestSuite(name, **kwargs)
+        self.begin_test_suite(suite)
+        return suite
+
+    def write_test_case(self, test_case):
+        """
+        Serializes a test case into the current test suite.
+        """
+        if self._suite is None:
+            raise ValueError("no test suite has been begun")
+        self._suite_totals.add(test_case)
+        if self._stats is None:
+            self._spool_element(
+                test_case._build_xml_doc(self.encoding, lazy=True, limiter=self._limiter, values=self._values)
+            )
+            return
+        start = _clock()
+        element = test_case._build_xml_doc(self.encoding, lazy=True, limiter=self._limiter, values=self._values)
+        build_seconds = _clock() - start
+        self._stats.add_phase("build", build_seconds, cases=1)
+        self._suite_cases += 1
+        self._suite_seconds += build_seconds + self._spool_element_timed(element)
+
+    def end_suite(self):
+        """
+        Finishes the current test suite.
+        """
+        if self._suite is None:
+            raise ValueError("no test suite has been begun")
+        spool_element = self._spool_element if self._stats is None else self._spool_element_timed
+        cases_range = (self._suite_start, self._spool_sink.tell())
+        # stdout and stderr are spooled before the properties, which record what an output policy left out
+        for element in self._suite._build_output_elements(self.encoding, lazy=True, limiter=self._limiter):
+            self._suite_seconds += spool_element(element) or 0.0
+        output_range = (cases_range[1], self._spool_sink.tell())
+        properties_element = self._suite._build_properties_element(self.encoding, self._limiter)
+        if properties_element is not None:
+            self._suite_seconds += spool_element(properties_element) or 0.0
+        properties_range = (output_range[1], self._spool_sink.tell())
+        if self._stats is not None:
+            size = properties_range[1] - cases_range[0]
+            self._stats.add_suite(self._suite.name, self._suite_cases, self._suite_seconds, size)
+            self._suite_cases = 0
+            self._suite_seconds = 0.0
+
+        attributes = self._suite._build_attributes(self._suite_totals, self.encoding, self._values)
+        start_tag = _start_tag("testsuite", attributes, self.prettyprint, self._values)
+        self._suites.append((start_tag, [properties_range, output_range, cases_range]))
+        self._totals.add(self._suite_totals)
+        self._suite = None
+        self._suite_totals = None
+
+    def write_test_suite(self, test_suite):
+        """
+        Writes a complete test suite with all of its test cases.
+        """
+        self.begin_test_suite(test_suite)
+        for case in test_suite.test_cases:
+            self.write_test_case(case)
+        self.end_suite()
+
+    def close(self):
+        """
+        Writes the document to the file. The file itself is left open.
+        """
+        if self._closed:
+            return
+        if self._suite is not None:
+            self.end_suite()
+        self._closed = True
+
+        prettyprint = self.prettyprint
+        sink = _ReportSink(self._output, prettyprint, self.encoding, self.chunk_size, self._stats)
+        write = sink.write
+        write(_xml_declaration(prettyprint, self.encoding))
+        write(_start_tag("testsuites", self._totals.attributes(), prettyprint))
+        write(_end_start_tag(not self._suites, prettyprint))
+        indent = "\t" if prettyprint else ""
+        for start_tag, spool_ranges in self._suites:
+            empty = all(start == end for start, end in spool_ranges)
+            write(indent + start_tag + _end_start_tag(empty, prettyprint))
+            if not empty:
+                for spool_range in spool_ranges:
+                    self._copy(sink, spool_range)
+                write(indent + "</testsuite>" + ("\n" if prettyprint else ""))
+        if self._suites:
+            write("</testsuites>" + ("\n" if prettyprint else ""))
+        sink.flush()
+        if self._output is not self.file_descriptor:
+            start = _clock() if self._stats is not None else None
+            self._output.finish()
+            if self._stats is not None:
+                self._stats.add_phase("write", _clock() - start)
+        self._spool.close()
+
+    @property
+    def current_suite(self):
+        """The test suite begun and not ended yet, or None."""
+        return self._suite
+
+    def begin_test_suite(self, test_suite):
+        """
+        Starts a new test suite from a TestSuite. Its attributes, properties, stdout and stderr are written when
+        end_suite() is called, its test cases are not written: write them with write_test_case().
+        """
+        if self._closed:
+            raise ValueError("writer is closed")
+        if self._suite is not None:
+            raise ValueError("test suite %r has not been ended" % self._suite.name)
+        self._suite = test_suite
+        self._suite_totals = _SuiteTotals()
+        self._suite_start = self._spool_sink.tell()
+        if self._limiter is not None:
+            self._limiter.begin_suite()
+
+    def _spool_element(self, element):
+        _write_element(self._spool_sink.write, element, self.prettyprint, 2, self._values)
+
+    def _spool_element_timed(self, element):
+        """
+        Spools an element, adding the time spent serializing it, but not spooling it, to the stats.
+        @return: The seconds spent serializing.
+        """
+        start = _clock()
+        spooled = self._stats.seconds("spool")
+        self._spool_element(element)
+        seconds = _clock() - start - (self._stats.seconds("spool") - spooled)
+        self._stats.add_phase("serialize", seconds)
+        return seconds
+
+    def _copy(self, sink, spool_range):
+        start, end = spool_range
+        self._spool.seek(start)
+        sink.copy(self._spool, end - start, self._spool_sink.encoding)
+
+
+class _ResultInfo(MutableMapping):
+    """
+    The message, output and type of an error or failure of a test case.
+    Reads and writes like the dict it used to be, e.g. case.failures[0]["message"], without a per-instance dict.
+    """
+
+    __slots__ = ("message", "output", "type")
+    _fields = ("message", "output", "type")
+
+    def __init__(self, message=None, output=None, type=None):
+        self.message = message
+        self.output = output
+        self.type = type
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self._fields:
+            raise KeyError(key)
+        setattr(self, key, value)
 
-    @see: http://stackoverflow.com/questions/1707890/fast-way-to-filter-illegal-xml-unicode-chars-in-python
-    """
-
-    illegal_unichrs = [
-        (0x00, 0x08),
-        (0x0B, 0x1F),
-        (0x7F, 0x84),
-        (0x86, 0x9F),
-        (0xD800, 0xDFFF),
-        (0xFDD0, 0xFDDF),
-        (0xFFFE, 0xFFFF),
-        (0x1FFFE, 0x1FFFF),
-        (0x2FFFE, 0x2FFFF),
-        (0x3FFFE, 0x3FFFF),
-        (0x4FFFE, 0x4FFFF),
-        (0x5FFFE, 0x5FFFF),
-        (0x6FFFE, 0x6FFFF),
-        (0x7FFFE, 0x7FFFF),
-        (0x8FFFE, 0x8FFFF),
-        (0x9FFFE, 0x9FFFF),
-        (0xAFFFE, 0xAFFFF),
-        (0xBFFFE, 0xBFFFF),
-        (0xCFFFE, 0xCFFFF),
-        (0xDFFFE, 0xDFFFF),
-        (0xEFFFE, 0xEFFFF),
-        (0xFFFFE, 0xFFFFF),
-        (0x10FFFE, 0x10FFFF),
-    ]
-
-    illegal_ranges = ["%s-%s" % (unichr(low), unichr(high)) for (low, high) in illegal_unichrs if low < sys.maxunicode]
-
-    illegal_xml_re = re.compile(u("[%s]") % u("").join(illegal_ranges))
-    return illegal_xml_re.sub("", string_to_clean)
+    def __delitem__(self, key):
+        raise TypeError("%s fields cannot be deleted" % type(self).__name__)
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __getstate__(self):
+        return tuple(getattr(self, field) for field in self._fields)
+
+    def __setstate__(self, state):
+        for field, value in zip(self._fields, state):
+            setattr(self, field, value)
+
+
+class _SkippedInfo(_ResultInfo):
+    """The message and output of a skipped test case."""
+
+    __slots__ = ()
+    _fields = ("message", "output")
+
+    def __init__(self, message=None, output=None):
+        _ResultInfo.__init__(self, message, output)
 
 
 class TestCase(object):
     """A JUnit test case with a result and possibly some stdout or stderr"""
 
+    __slots__ = (
+        "name",
+        "_assertions",
+        "_elapsed_sec",
+        "timestamp",
+        "classname",
+        "status",
+        "category",
+        "file",
+        "line",
+        "log",
+        "url",
+        "stdout",
+        "stderr",
+        "_is_enabled",
+        "_errors",
+        "_failures",
+        "_skipped",
+        "allow_multiple_subalements",
+        "_suite_totals",
+    )
+
     def __init__(
         self,
         name,
@@ -381,9 +1780,11 @@ class TestCase(object):
         url=None,
         allow_multiple_subelements=False,
     ):
+        # totals of the test suites this test case is in, updated when its result changes
+        self._suite_totals = None
         self.name = name
-        self.assertions = assertions
-        self.elapsed_sec = elapsed_sec
+        self._assertions = assertions
+        self._elapsed_sec = elapsed_sec
         self.timestamp = timestamp
         self.classname = classname
         self.status = status
@@ -395,18 +1796,117 @@ class TestCase(object):
         self.stdout = stdout
         self.stderr = stderr
 
-        self.is_enabled = True
-        self.errors = []
-        self.failures = []
-        self.skipped = []
+        self._is_enabled = True
+        # the result lists are only allocated once something is added to them
+        self._errors = None
+        self._failures = None
+        self._skipped = None
         self.allow_multiple_subalements = allow_multiple_subelements
 
+    # the test suites a test case is in are not pickled with it
+    _pickled_slots = tuple(slot for slot in __slots__ if slot != "_suite_totals")
+
+    def __getstate__(self):
+        return tuple([getattr(self, slot) for slot in self._pickled_slots]), getattr(self, "__dict__", None)
+
+    def __setstate__(self, state):
+        values, attributes = state
+        for slot, value in zip(self._pickled_slots, values):
+            setattr(self, slot, value)
+        self._suite_totals = None
+        if attributes:
+            self.__dict__.update(attributes)
+
+    @property
+    def errors(self):
+        if self._errors is None:
+            self._errors = []
+        return self._errors
+
+    @errors.setter
+    def errors(self, value):
+        before = self._result_before_change()
+        self._errors = value
+        self._result_changed(before)
+
+    @property
+    def failures(self):
+        if self._failures is None:
+            self._failures = []
+        return self._failures
+
+    @failures.setter
+    def failures(self, value):
+        before = self._result_before_change()
+        self._failures = value
+        self._result_changed(before)
+
+    @property
+    def skipped(self):
+        if self._skipped is None:
+            self._skipped = []
+        return self._skipped
+
+    @skipped.setter
+    def skipped(self, value):
+        before = self._result_before_change()
+        self._skipped = value
+        self._result_changed(before)
+
+    @property
+    def is_enabled(self):
+        return self._is_enabled
+
+    @is_enabled.setter
+    def is_enabled(self, value):
+        before = self._result_before_change()
+        self._is_enabled = value
+        self._result_changed(before)
+
+    @property
+    def elapsed_sec(self):
+        return self._elapsed_sec
+
+    @elapsed_sec.setter
+    def elapsed_sec(self, value):
+        before = self._result_before_change()
+        self._elapsed_sec = value
+        self._result_changed(before)
+
+    @property
+    def assertions(self):
+        return self._assertions
+
+    @assertions.setter
+    def assertions(self, value):
+        before = self._result_before_change()
+        self._assertions = value
+        self._result_changed(before)
+
+    def _result(self):
+        """what this test case counts towards the totals of its test suites"""
+        return (
+            self.is_failure(),
+            self.is_error(),
+            self.is_skipped(),
+            not self._is_enabled,
+            self._assertions,
+            self._elapsed_sec,
+        )
+
+    def _result_before_change(self):
+        return self._result() if self._suite_totals else None
+
+    def _result_changed(self, before):
+        if before is not None:
+            for totals in self._suite_totals:
+                if not totals._abandoned:
+                    totals.update(self, before)
+
     def add_error_info(self, message=None, output=None, error_type=None):
         """Adds an error message, output, or both to the test case"""
-        error = {}
-        error["message"] = message
-        error["output"] = output
-        error["type"] = error_type
+        before = self._result_before_change()
+        error = _ResultInfo(message, output, error_type)
         if self.allow_multiple_subalements:
             if message or output:
                 self.errors.append(error)
@@ -419,13 +1919,12 @@ class TestCase(object):
                 self.errors[0]["output"] = output
             if error_type:
                 self.errors[0]["type"] = error_type
+        self._result_changed(before)
 
     def add_failure_info(self, message=None, output=None, failure_type=None):
         """Adds a failure message, output, or both to the test case"""
-        failure = {}
-        failure["message"] = message
-        failure["output"] = output
-        failure["type"] = failure_type
+        before = self._result_before_change()
+        failure = _ResultInfo(message, output, failure_type)
         if self.allow_multiple_subalements:
             if message or output:
                 self.failures.append(failure)
@@ -438,12 +1937,12 @@ class TestCase(object):
                 self.failures[0]["output"] = output
             if failure_type:
                 self.failures[0]["type"] = failure_type
+        self._result_changed(before)
 
     def add_skipped_info(self, message=None, output=None):
         """Adds a skipped message, output, or both to the test case"""
-        skipped = {}
-        skipped["message"] = message
-        skipped["output"] = output
+        before = self._result_before_change()
+        skipped = _SkippedInfo(message, output)
         if self.allow_multiple_subalements:
             if message or output:
                 self.skipped.append(skipped)
@@ -454,15 +1953,117 @@ class TestCase(object):
                 self.skipped[0]["message"] = message
             if output:
                 self.skipped[0]["output"] = output
+        self._result_changed(before)
 
     def is_failure(self):
         """returns true if this test case is a failure"""
-        return sum(1 for f in self.failures if f["message"] or f["output"]) > 0
+        return any(f["message"] or f["output"] for f in self._failures or ())
 
     def is_error(self):
         """returns true if this test case is an error"""
-        return sum(1 for e in self.errors if e["message"] or e["output"]) > 0
+        return any(e["message"] or e["output"] for e in self._errors or ())
 
     def is_skipped(self):
         """returns true if this test case has been skipped"""
-        return len(self.skipped) > 0
+        return bool(self._skipped)
+
+    def build_xml_doc(self, encoding=None):
+        """
+        Builds the XML element for the JUnit test case.
+        Produces clean unicode strings and decodes non-unicode with the help of encoding.
+        @param encoding: Used to decode encoded strings.
+        @return: XML element with unicode string elements
+        """
+        return self._build_xml_doc(encoding, lazy=False)
+
+    def _build_xml_doc(self, encoding, lazy, limiter=None, values=None):
+        """
+        Builds the XML element for the JUnit test case.
+        @param lazy: Leaves stdout, stderr and output given as paths, files or callables to be read while
+                     serializing.
+        @param limiter: The _OutputLimiter applying an output policy, if any.
+        @param values: The _ValueCache of the report being written, if any.
+        """
+        keeps_output = limiter is None or limiter.keeps_output(self)
+        xml_text = _xml_text if values is None else values.xml_text
+        test_case_attributes = dict()
+        test_case_attributes["name"] = _xml_text(self.name, encoding)
+        if self.assertions:
+            # Number of assertions in the test case
+            test_case_attributes["assertions"] = "%d" % self.assertions
+        if self.elapsed_sec:
+            test_case_attributes["time"] = "%f" % self.elapsed_sec
+        if self.timestamp:
+            test_case_attributes["timestamp"] = _xml_text(self.timestamp, encoding)
+        if self.classname:
+            test_case_attributes["classname"] = xml_text(self.classname, encoding)
+        if self.status:
+            test_case_attributes["status"] = _xml_text(self.status, encoding)
+        if self.category:
+            test_case_attributes["class"] = _xml_text(self.category, encoding)
+        if self.file:
+            test_case_attributes["file"] = xml_text(self.file, encoding)
+        if self.line:
+            test_case_attributes["line"] = _xml_text(self.line, encoding)
+        if self.log:
+            test_case_attributes["log"] = xml_text(self.log, encoding)
+        if self.url:
+            test_case_attributes["url"] = xml_text(self.url, encoding)
+
+        test_case_element = ET.Element("testcase", test_case_attributes)
+
+        # failures
+        for failure in self._failures or ():
+            if failure["output"] or failure["message"]:
+                attrs = {"type": "failure"}
+                if failure["message"]:
+                    attrs["message"] = _xml_text(failure["message"], encoding)
+                if failure["type"]:
+                    attrs["type"] = _xml_text(failure["type"], encoding)
+                failure_element = ET.Element("failure", attrs)
+                if failure["output"]:
+                    failure_element.text = _xml_content(failure["output"], encoding, lazy, limiter)
+                test_case_element.append(failure_element)
+
+        # errors
+        for error in self._errors or ():
+            if error["message"] or error["output"]:
+                attrs = {"type": "error"}
+                if error["message"]:
+                    attrs["message"] = _xml_text(error["message"], encoding)
+                if error["type"]:
+                    attrs["type"] = _xml_text(error["type"], encoding)
+                error_element = ET.Element("error", attrs)
+                if error["output"]:
+                    error_element.text = _xml_content(error["output"], encoding, lazy, limiter)
+                test_case_element.append(error_element)
+
+        # skippeds
+        for skipped in self._skipped or ():
+            attrs = {"type": "skipped"}
+            if skipped["message"]:
+                attrs["message"] = _xml_text(skipped["message"], encoding)
+            skipped_element = ET.Element("skipped", attrs)
+            if skipped["output"] and keeps_output:
+                skipped_element.text = _xml_content(skipped["output"], encoding, lazy, limiter)
+            elif skipped["output"]:
+                limiter.drop(skipped["output"])
+            test_case_element.append(skipped_element)
+
+        if not keeps_output:
+            limiter.drop(self.stdout, self.stderr)
+            return test_case_element
+
+        # test stdout
+        if self.stdout:
+            stdout_element = ET.Element("system-out")
+            stdout_element.text = _xml_content(self.stdout, encoding, lazy, limiter)
+            test_case_element.append(stdout_element)
+
+        # test stderr
+        if self.stderr:
+            stderr_element = ET.Element("system-err")
+            stderr_element.text = _xml_content(self.stderr, encoding, lazy, limiter)
+            test_case_element.append(stderr_element)
+
+        return test_case_element
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+Appends test suites to an existing JUnit XML report in place, e.g. the report of a long-running soak job.
+
+    for suites in run_soak_rounds():
+        append_to_xml_report_file("report.xml", suites)
+
+The new test suites are written over the closing </testsuites> tag, and only the start tag of the testsuites
+element is rewritten with the new totals. The start tag is padded with spaces so the totals can grow in place,
+so appending costs what writing the appended test suites costs, not what rewriting the report would.
+A report not written by append_to_xml_report_file() has no padding, and is rewritten once, on the first append,
+to add it.
+"""
+import codecs
+import io
+import os
+import re
+
+from junit_xml import (
+    _bomless_encoding,
+    _ReportSink,
+    _ReportTotals,
+    _start_tag,
+    _value_cache,
+    _write_test_suite,
+    _xml_declaration,
+)
+from junit_xml.compression import detect_compression
+
+# the spaces reserved in the start tag of the testsuites element, for its totals to grow
+_ROOT_PADDING = 64
+
+# how much of the start and of the end of a report is read to find the testsuites element in it
+_HEAD_SIZE = 64 * 1024
+_TAIL_SIZE = 4 * 1024
+
+_CHUNK_SIZE = 64 * 1024
+
+_declaration_re = re.compile(br"""^\s*<\?xml[^>]*?encoding=["']([A-Za-z0-9._-]+)["']""")
+_root_re = re.compile(br"<testsuites(\s[^>]*)?/?>")
+_attribute_re = re.compile(br"""([\w-]+)\s*=\s*["']([^"']*)["']""")
+_root_end = b"</testsuites>"
+
+
+def append_to_xml_report_file(file_descriptor, test_suites, prettyprint=True, encoding=None):
+    """
+    Appends test suites to a JUnit XML report, which is created if it does not exist or is empty.
+    @param file_descriptor: The path of the report, or the report opened for reading and writing in binary mode,
+                            e.g. with mode "r+b". It cannot be compressed.
+    @param prettyprint: Whether the report is pretty printed, as it was written.
+    @param encoding: The encoding of the input, and of the report as it was written.
+    """
+    try:
+        test_suites = list(test_suites)
+    except TypeError:
+        raise TypeError("test_suites must be a list of test suites")
+    if not hasattr(file_descriptor, "write"):
+        mode = "r+b" if os.path.exists(file_descriptor) else "w+b"
+        with io.open(file_descriptor, mode) as f:
+            _append(f, test_suites, prettyprint, encoding)
+    else:
+        _append(file_descriptor, test_suites, prettyprint, encoding)
+
+
+def _append(f, test_suites, prettyprint, encoding):
+    sink = _ReportSink(f, prettyprint, encoding, _CHUNK_SIZE)
+    if not sink.binary:
+        raise ValueError("reports can only be appended to in binary mode")
+    if not test_suites:
+        return
+
+    f.seek(0, io.SEEK_END)
+    size = f.tell()
+    if size == 0:
+        f.seek(0)
+        sink.write(_xml_declaration(prettyprint, encoding))
+        sink.write(_padded_root_tag(_added_totals(_ReportTotals(), test_suites), prettyprint, 0))
+        sink.write("\n" if prettyprint else "")
+        _write_suites(sink, test_suites, prettyprint, encoding)
+        return
+
+    # the suites are written into the middle of the report
+    sink = _ReportSink(f, prettyprint, encoding, _CHUNK_SIZE, bom=False)
+    f.seek(0)
+    head = f.read(_HEAD_SIZE)
+    if detect_compression(io.BytesIO(head)):
+        raise ValueError("compressed reports cannot be appended to")
+    _check_encoding(head, sink.encoding)
+    root = _root_re.search(head)
+    if root is None:
+        raise ValueError("the report has no testsuites element in its first %d bytes" % _HEAD_SIZE)
+    tag_start, tag_end = root.span()
+    attributes = dict(_attribute_re.findall(root.group(1) or b""))
+
+    if root.group(0).endswith(b"/>"):
+        # a report without test suites, which are written after the start tag turned into an end tag
+        body_end = tag_end
+        while head[body_end:body_end + 1].isspace():
+            body_end += 1
+        totals = _ReportTotals()
+    else:
+        tail_start = max(tag_end, size - _TAIL_SIZE)
+        f.seek(tail_start)
+        tail = f.read()
+        end = tail.rfind(_root_end)
+        if end < 0 or tail[end + len(_root_end):].strip():
+            raise ValueError("the report does not end with </testsuites>")
+        body_end = tail_start + end
+        totals = _existing_totals(f, attributes)
+    _added_totals(totals, test_suites)
+
+    root_encoding = _bomless_encoding(sink.encoding)
+    width = tag_end - tag_start
+    # a start tag without padding gets it, even if the new totals would fit it, so that later totals can grow
+    root_tag = _padded_root_tag(totals, prettyprint, width if _padded(root.group(0)) else 0).encode(root_encoding)
+    if len(root_tag) <= width:
+        root_tag = _padded_root_tag(totals, prettyprint, width).encode(root_encoding)
+    else:
+        # the totals outgrew the start tag, or it has no padding, the report is moved up to make room once
+        shift = len(root_tag) - width
+        _move(f, tag_end, body_end, shift)
+        body_end += shift
+    f.seek(tag_start)
+    f.write(root_tag)
+    f.seek(body_end)
+    if prettyprint and body_end == tag_end:
+        sink.write("\n")
+    _write_suites(sink, test_suites, prettyprint, encoding)
+
+
+def _write_suites(sink, test_suites, prettyprint, encoding):
+    values = _value_cache(prettyprint)
+    for ts in test_suites:
+        _write_test_suite(sink.write, ts, prettyprint, encoding, values)
+    sink.write("</testsuites>\n" if prettyprint else "</testsuites>")
+    sink.flush()
+    sink.file_descriptor.truncate()
+
+
+def _added_totals(totals, test_suites):
+    for ts in test_suites:
+        totals.add(ts._totals())
+    return totals
+
+
+def _padded(root_tag):
+    """Returns whether the start tag of a testsuites element has the padding _padded_root_tag() writes."""
+    return root_tag.endswith(b" >")
+
+
+def _padded_root_tag(totals, prettyprint, width):
+    """
+    Returns the start tag of the testsuites element, padded with spaces to width, or with _ROOT_PADDING spaces
+    if it does not fit.
+    """
+    tag = _start_tag("testsuites", totals.attributes(), prettyprint)
+    padding = width - len(tag) - 1
+    if padding < 0:
+        padding = _ROOT_PADDING
+    return tag + " " * padding + ">"
+
+
+def _check_encoding(head, encoding):
+    declared = _declaration_re.match(head)
+    declared = declared.group(1).decode("ascii") if declared else "utf-8"
+    compatible = [codecs.lookup(declared).name]
+    if compatible[0] == "utf-8":
+        compatible.append("ascii")
+    if codecs.lookup(encoding).name not in compatible:
+        raise ValueError("the report is encoded in %s, not in %s" % (declared, encoding))
+
+
+def _existing_totals(f, attributes):
+    """
+    Returns the totals of the test suites already in a report, from the attributes of its testsuites element, or
+    counted from its testsuite elements if it has none.
+    """
+    totals = _ReportTotals()
+    # a report holding test suites, which is all that matters of suites
+    totals.suites = 1
+    if b"tests" not in attributes:
+        return _counted_totals(f, totals)
+    totals.disabled = int(attributes.get(b"disabled", 0))
+    totals.errors = int(attributes.get(b"errors", 0))
+    totals.failures = int(attributes.get(b"failures", 0))
+    totals.tests = int(attributes[b"tests"])
+    totals.time = float(attributes.get(b"time", 0))
+    return totals
+
+
+def _counted_totals(f, totals):
+    import xml.etree.ElementTree as ET
+
+    f.seek(0)
+    depth = 0
+    for event, element in ET.iterparse(f, ("start", "end")):
+        if event == "end":
+            depth -= 1
+            element.clear()
+            continue
+        depth += 1
+        if depth == 2 and element.tag == "testsuite":
+            totals.disabled += int(element.get("disabled", 0))
+            totals.errors += int(element.get("errors", 0))
+            totals.failures += int(element.get("failures", 0))
+            totals.tests += int(element.get("tests", 0))
+            totals.time += float(element.get("time", 0))
+    return totals
+
+
+def _move(f, start, end, shift):
+    """
+    Moves the bytes of a file from start to end up by shift bytes, copying from the end down.
+    """
+    position = end
+    while position > start:
+        size = min(_CHUNK_SIZE, position - start)
+        position -= size
+        f.seek(position)
+        chunk = f.read(size)
+        f.seek(position + shift)
+        f.write(chunk)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+Writes JUnit XML reports from a background thread, so the test loop does not wait for serialization or I/O.
+
+    with open("report.xml", "w") as f, BackgroundReportWriter(f) as writer:
+        writer.begin_suite("my test suite")
+        for case in run_tests():
+            writer.write_test_case(case)
+        writer.end_suite()
+
+Test cases are handed over through a bounded queue. When the queue is full, write_test_case() blocks until the
+background thread caught up. A test case must not be changed after it has been written.
+"""
+import queue
+import threading
+
+from junit_xml import JUnitXMLWriter, TestSuite
+
+
+class BackgroundReportWriter(object):
+    """
+    A JUnitXMLWriter running in a background thread. Can be called from any thread; calls are carried out in the
+    order they are made. An error of the background thread is raised by the next call and every call after it,
+    close() included, and no report is written.
+    """
+
+    def __init__(
+        self,
+        file_descriptor,
+        prettyprint=True,
+        encoding=None,
+        max_queue_size=1024,
+        policy=None,
+        compression=None,
+        compresslevel=None,
+        stats=None,
+    ):
+        self._writer = JUnitXMLWriter(
+            file_descriptor,
+            prettyprint=prettyprint,
+            encoding=encoding,
+            policy=policy,
+            compression=compression,
+            compresslevel=compresslevel,
+            stats=stats,
+        )
+        self._queue = queue.Queue(max_queue_size)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="junit-xml-writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif not self._closed:
+            self._closed = True
+            self._put(self._writer.__exit__, exc_type, exc_value, traceback)
+            self._put(None)
+            self._thread.join()
+
+    def begin_suite(self, name, **kwargs):
+        """
+        Starts a new test suite. Takes the same arguments as TestSuite, except for test_cases.
+        @return: The TestSuite holding the suite's attributes. Its properties, stdout and stderr may still be
+                 changed until end_suite() is called.
+        """
+        suite = TestSuite(name, **kwargs)
+        self._submit(self._writer.begin_test_suite, suite)
+        return suite
+
+    def write_test_case(self, test_case):
+        """
+        Queues a test case to be serialized into the current test suite. Blocks while the queue is full.
+        """
+        self._submit(self._writer.write_test_case, test_case)
+
+    def end_suite(self):
+        """
+        Finishes the current test suite.
+        """
+        self._submit(self._writer.end_suite)
+
+    def write_test_suite(self, test_suite):
+        """
+        Queues a complete test suite with all of its test cases.
+        """
+        self._submit(self._writer.write_test_suite, test_suite)
+
+    def flush(self):
+        """
+        Waits until everything written so far has been serialized.
+        """
+        self._check()
+        self._queue.join()
+        self._check()
+
+    def close(self):
+        """
+        Waits for the background thread to write the document to the file. The file itself is left open.
+        """
+        if self._closed:
+            self._check()
+            return
+        self._closed = True
+        self._put(self._writer.close)
+        self._put(None)
+        self._thread.join()
+        self._check()
+
+    def _submit(self, method, *args):
+        self._check()
+        if self._closed:
+            raise ValueError("writer is closed")
+        self._put(method, *args)
+
+    def _put(self, method, *args):
+        self._queue.put((method, args))
+
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        failed = False
+        while True:
+            method, args = self._queue.get()
+            try:
+                if method is None:
+                    return
+                if not failed:
+                    method(*args)
+            except Exception as e:
+                # everything after a failed call is dropped, the error is raised in the calling thread
+                failed = True
+                self._error = e
+            finally:
+                self._queue.task_done()
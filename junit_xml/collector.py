@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+Collects the test results of many worker processes into one JUnit XML report, over a Unix domain socket.
+
+    with ReportCollector("report.xml") as collector:
+        start_workers(collector.address)
+
+    # in every worker
+    with CollectorClient(address) as client:
+        client.begin_suite("worker %d" % worker_id)
+        for case in run_tests():
+            client.write_test_case(case)
+        client.end_suite()
+
+Clients send the records of a result journal, see junit_xml.journal. The collector does not parse them while the
+workers run: what every connection sends is appended to a temporary file of its own, so the collector keeps up
+with the workers and its memory stays flat. When the collector is closed, it waits for the clients to disconnect
+and writes the report one test case at a time, the test suites of each connection in the order they were sent
+and the connections in the order they were made. A worker that dies loses at most the test case it was sending.
+"""
+import os
+import selectors
+import shutil
+import socket
+import tempfile
+import threading
+
+from junit_xml import JUnitXMLWriter
+from junit_xml.journal import ResultJournal, _materialize
+
+
+class ReportCollector(object):
+    """
+    Listens for CollectorClients on a Unix domain socket and writes what they send into one report.
+    @param file_descriptor: The file the report is written to, as JUnitXMLWriter takes it.
+    @param address: The path of the socket, a new one in a temporary directory by default.
+    Takes the other arguments of JUnitXMLWriter.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        file_descriptor,
+        address=None,
+        prettyprint=True,
+        encoding=None,
+        policy=None,
+        compression=None,
+        compresslevel=None,
+        stats=None,
+    ):
+        self._writer = JUnitXMLWriter(
+            file_descriptor,
+            prettyprint=prettyprint,
+            encoding=encoding,
+            policy=policy,
+            compression=compression,
+            compresslevel=compresslevel,
+            stats=stats,
+        )
+        self._directory = None
+        if address is None:
+            self._directory = tempfile.mkdtemp(prefix="junit-xml-")
+            address = os.path.join(self._directory, "collector.sock")
+        self.address = address
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(address)
+        self._server.listen(128)
+        self._server.setblocking(False)
+
+        # the spool of every connection, in the order they were made
+        self._spools = []
+        self._stopping = threading.Event()
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="junit-xml-collector")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif not self._closed:
+            self._closed = True
+            self._stop()
+            self._cleanup()
+
+    def close(self):
+        """
+        Stops accepting connections, waits until every client has disconnected and writes the report. The file
+        itself is left open.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._stop()
+            if self._error is not None:
+                raise self._error
+            with self._writer:
+                for spool in self._spools:
+                    spool.seek(0)
+                    _materialize(self._writer, spool)
+        finally:
+            self._cleanup()
+
+    def _stop(self):
+        self._stopping.set()
+        self._thread.join()
+
+    def _cleanup(self):
+        for spool in self._spools:
+            spool.close()
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+        else:
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+    def _run(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self._server, selectors.EVENT_READ)
+        buffer = bytearray(self.chunk_size)
+        view = memoryview(buffer)
+        listening = True
+        try:
+            while listening or selector.get_map():
+                if listening and self._stopping.is_set():
+                    # connections waiting to be accepted are taken before the socket stops listening
+                    self._accept(selector)
+                    selector.unregister(self._server)
+                    self._server.close()
+                    listening = False
+                    continue
+                for key, _ in selector.select(timeout=0.05):
+                    if key.fileobj is self._server:
+                        self._accept(selector)
+                        continue
+                    size = key.fileobj.recv_into(buffer)
+                    if size:
+                        key.data.write(view[:size])
+                    else:
+                        selector.unregister(key.fileobj)
+                        key.fileobj.close()
+        except Exception as e:
+            self._error = e
+        finally:
+            for key in list(selector.get_map().values()):
+                key.fileobj.close()
+            selector.close()
+            self._server.close()
+
+    def _accept(self, selector):
+        while True:
+            try:
+                connection, _ = self._server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            spool = tempfile.TemporaryFile()
+            self._spools.append(spool)
+            selector.register(connection, selectors.EVENT_READ, spool)
+
+
+class CollectorClient(ResultJournal):
+    """
+    Sends test results to a ReportCollector. Takes the calls of a ResultJournal: begin_suite(), write_test_case(),
+    end_suite() and write_test_suite(). Create the client in the worker process, after it has been forked.
+    @param address: The address of the collector.
+    @param encoding: Used to decode encoded strings.
+    """
+
+    def __init__(self, address, encoding=None):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(address)
+        ResultJournal.__init__(
+            self, self._socket.makefile("wb"), encoding=encoding, sync_every=None, sync_interval=None
+        )
+
+    def sync(self):
+        """
+        Sends what has been written so far.
+        """
+        self.file_descriptor.flush()
+
+    def close(self):
+        """
+        Disconnects from the collector.
+        """
+        if self._closed:
+            return
+        ResultJournal.close(self)
+        self.file_descriptor.close()
+        self._socket.close()
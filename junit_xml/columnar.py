@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+Column-wise storage of test cases, for generated test suites with millions of test cases.
+
+    from junit_xml.columnar import ColumnarTestSuite
+
+    ts = ColumnarTestSuite("generated", hostname="localhost")
+    for case in generate_test_cases():
+        ts.test_cases.append(case)
+    to_xml_report_file(f, [ts])
+
+The suite does not keep the TestCase objects. Each test case is taken apart into columns when it is added:
+elapsed times and assertions in arrays, the result as a status bitmask, classnames and files as indexes into
+their distinct values, and everything else only for the test cases that have it. Reading test_cases returns
+TestCase views built from the columns.
+"""
+import copy
+from array import array
+
+from junit_xml import TestCase, TestSuite
+
+try:
+    import numpy
+except ImportError:  # pragma: nocover
+    numpy = None
+
+# status bitmask of a test case
+FAILURE = 1
+ERROR = 2
+SKIPPED = 4
+DISABLED = 8
+_STATUSES = 16
+
+# the result fields, whose entries are copied rather than shared with the test case or a view
+_RESULT_FIELDS = ("_errors", "_failures", "_skipped")
+# fields that only some test cases have, stored per row when set
+_SPARSE_FIELDS = (
+    "timestamp",
+    "status",
+    "category",
+    "line",
+    "log",
+    "url",
+    "stdout",
+    "stderr",
+    "_errors",
+    "_failures",
+    "_skipped",
+    "allow_multiple_subalements",
+)
+
+
+class _InternedColumn(object):
+    """A column of strings, each distinct value stored once and the rows holding its index."""
+
+    def __init__(self):
+        self.values = [None]
+        self._indexes = {None: 0}
+        self.rows = array("L")
+
+    def append(self, value):
+        index = self._indexes.get(value)
+        if index is None:
+            index = self._indexes[value] = len(self.values)
+            self.values.append(value)
+        self.rows.append(index)
+
+    def __getitem__(self, row):
+        return self.values[self.rows[row]]
+
+
+class _ColumnTotals(object):
+    """The totals of a columnar test suite, computed in one pass over each column."""
+
+    def __init__(self, columns):
+        counts = _count_statuses(columns.statuses)
+        self.tests = len(columns.statuses)
+        self.failures = sum(counts[s] for s in range(_STATUSES) if s & FAILURE)
+        self.errors = sum(counts[s] for s in range(_STATUSES) if s & ERROR)
+        self.skipped = sum(counts[s] for s in range(_STATUSES) if s & SKIPPED)
+        self.disabled = sum(counts[s] for s in range(_STATUSES) if s & DISABLED)
+        # summed in order, so the total is the same as for a TestSuite with the same test cases
+        self.assertions = sum(columns.assertions) or None
+        if columns.float_times:
+            self.time = sum(columns.elapsed_sec) or 0
+        else:
+            # times that are not floats, e.g. whole seconds, are summed as they were given
+            self.time = sum(fields["_elapsed_sec"] for fields in columns.sparse.values() if "_elapsed_sec" in fields)
+
+
+def _count_statuses(statuses):
+    """
+    Returns how many rows have each status bitmask.
+    """
+    if numpy is not None:
+        return numpy.bincount(numpy.frombuffer(statuses, dtype=numpy.uint8), minlength=_STATUSES).tolist()
+    data = statuses.tobytes()
+    return [data.count(bytes((s,))) for s in range(_STATUSES)]
+
+
+class _ColumnarTestCases(object):
+    """
+    The test cases of a columnar test suite. Can be appended to, and read as TestCase views.
+    Views are built from the columns on every access, with copies of the results, so changing them does not change
+    the suite. Nor does changing a test case after it was added.
+    """
+
+    def __init__(self, test_cases=()):
+        self.names = []
+        self.classnames = _InternedColumn()
+        self.files = _InternedColumn()
+        self.elapsed_sec = array("d")
+        self.assertions = array("l")
+        self.statuses = array("B")
+        # the number of test cases whose time is a float, the others keep their time in sparse as well
+        self.float_times = 0
+        self.sparse = {}
+        self._totals = None
+        self.extend(test_cases)
+
+    def append(self, case):
+        row = len(self.names)
+        self.names.append(case.name)
+        self.classnames.append(case.classname)
+        self.files.append(case.file)
+        elapsed_sec = case.elapsed_sec
+        self.elapsed_sec.append(elapsed_sec or 0.0)
+        self.assertions.append(int(case.assertions or 0))
+        self.statuses.append(
+            (FAILURE if case.is_failure() else 0)
+            | (ERROR if case.is_error() else 0)
+            | (SKIPPED if case.is_skipped() else 0)
+            | (DISABLED if not case.is_enabled else 0)
+        )
+        fields = dict((field, getattr(case, field)) for field in _SPARSE_FIELDS if getattr(case, field))
+        for field in _RESULT_FIELDS:
+            if field in fields:
+                fields[field] = [copy.copy(entry) for entry in fields[field]]
+        if type(elapsed_sec) is float:
+            self.float_times += 1
+        elif elapsed_sec:
+            fields["_elapsed_sec"] = elapsed_sec
+        if fields:
+            self.sparse[row] = fields
+        self._totals = None
+
+    def extend(self, cases):
+        for case in cases:
+            self.append(case)
+
+    def __iadd__(self, cases):
+        self.extend(cases)
+        return self
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._view(row) for row in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("test case index out of range")
+        return self._view(index)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self._view(row)
+
+    @property
+    def totals(self):
+        if self._totals is None:
+            self._totals = _ColumnTotals(self)
+        return self._totals
+
+    def recount(self):
+        # the columns are only changed by adding test cases, which counts them again
+        pass
+
+    def _view(self, row):
+        case = TestCase(
+            self.names[row],
+            classname=self.classnames[row],
+            elapsed_sec=self.elapsed_sec[row] or None,
+            assertions=self.assertions[row] or None,
+            file=self.files[row],
+        )
+        if self.statuses[row] & DISABLED:
+            case.is_enabled = False
+        for field, value in self.sparse.get(row, {}).items():
+            if field in _RESULT_FIELDS:
+                value = [copy.copy(entry) for entry in value]
+            setattr(case, field, value)
+        return case
+
+
+class ColumnarTestSuite(TestSuite):
+    """
+    Suite of test cases stored column-wise. Takes the same arguments as TestSuite.
+    Test cases can only be added, through test_cases.append() or test_cases.extend().
+    """
+
+    @property
+    def test_cases(self):
+        return self._test_cases
+
+    @test_cases.setter
+    def test_cases(self, test_cases):
+        self._test_cases = _ColumnarTestCases(test_cases)
+
+    def _totals(self):
+        return self._test_cases.totals
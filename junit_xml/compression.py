@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+Compressed JUnit XML reports: gzip, bz2 and xz.
+
+Reports are compressed as they are written, so the uncompressed document is never held in memory:
+
+    with open("report.xml.gz", "wb") as f:
+        to_xml_report_file(f, test_suites, compression="gzip")
+
+The reader and merge detect compressed reports by their first bytes and decompress them as they are read.
+"""
+import io
+import zlib
+
+COMPRESSIONS = ("gzip", "bz2", "xz")
+
+# the first bytes of a compressed file
+_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+)
+_MAGIC_SIZE = max(len(magic) for magic, _ in _MAGIC)
+
+
+def _compressor(compression, compresslevel):
+    if compression == "gzip":
+        # a gzip header and trailer, with no file name and mtime 0, so the same report compresses the same
+        return zlib.compressobj(9 if compresslevel is None else compresslevel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if compression == "bz2":
+        import bz2
+
+        return bz2.BZ2Compressor(9 if compresslevel is None else compresslevel)
+    if compression == "xz":
+        import lzma
+
+        return lzma.LZMACompressor(preset=compresslevel)
+    raise ValueError("unknown compression %r, use one of %s" % (compression, ", ".join(COMPRESSIONS)))
+
+
+class CompressedFile(io.RawIOBase):
+    """
+    A binary file compressing what is written to it into another binary file.
+    finish() writes the end of the compressed data; closing without finishing leaves it incomplete.
+    The file written to is not closed.
+    @param compression: "gzip", "bz2" or "xz".
+    @param compresslevel: 1 (fastest) to 9 (smallest), 9 by default, or the xz preset, 6 by default.
+    """
+
+    def __init__(self, file_descriptor, compression, compresslevel=None):
+        io.RawIOBase.__init__(self)
+        self.file_descriptor = file_descriptor
+        self.compression = compression
+        self._compressor = _compressor(compression, compresslevel)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        compressed = self._compressor.compress(bytes(data))
+        if compressed:
+            self.file_descriptor.write(compressed)
+        return len(data)
+
+    def finish(self):
+        self.file_descriptor.write(self._compressor.flush())
+        self.close()
+
+
+def detect_compression(file_descriptor):
+    """
+    Returns the compression of a file from its first bytes, or None. The file is left at its start.
+    @param file_descriptor: A binary file that can seek or peek.
+    """
+    if hasattr(file_descriptor, "peek"):
+        start = file_descriptor.peek(_MAGIC_SIZE)[:_MAGIC_SIZE]
+    else:
+        position = file_descriptor.tell()
+        start = file_descriptor.read(_MAGIC_SIZE)
+        file_descriptor.seek(position)
+    if not isinstance(start, bytes):
+        # a file of text
+        return None
+    for magic, compression in _MAGIC:
+        if start.startswith(magic):
+            return compression
+    return None
+
+
+def decompressed(file_descriptor):
+    """
+    Returns a file reading the decompressed content of a compressed file, or the file itself if it is not
+    compressed.
+    """
+    if not hasattr(file_descriptor, "peek") and not _seekable(file_descriptor):
+        file_descriptor = io.BufferedReader(_RawReader(file_descriptor))
+    compression = detect_compression(file_descriptor)
+    if compression == "gzip":
+        import gzip
+
+        return gzip.GzipFile(fileobj=file_descriptor, mode="rb")
+    if compression == "bz2":
+        import bz2
+
+        return bz2.BZ2File(file_descriptor, "rb")
+    if compression == "xz":
+        import lzma
+
+        return lzma.LZMAFile(file_descriptor, "rb")
+    return file_descriptor
+
+
+def _seekable(file_descriptor):
+    try:
+        return file_descriptor.seekable()
+    except AttributeError:
+        return False
+
+
+class _RawReader(io.RawIOBase):
+    """Reads a file object that cannot seek or peek, so that it can be buffered."""
+
+    def __init__(self, file_descriptor):
+        io.RawIOBase.__init__(self)
+        self.file_descriptor = file_descriptor
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.file_descriptor.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+A test suite that many threads add test cases to at once, e.g. the threads of a pool running the tests.
+
+    from junit_xml.concurrent import ConcurrentTestSuite
+
+    ts = ConcurrentTestSuite("my test suite", order="start")
+    with ThreadPoolExecutor(8) as pool:
+        pool.map(lambda test: ts.test_cases.append(run(test)), tests)
+    to_xml_report_file(f, [ts])
+
+Every thread appends to a buffer of its own, without waiting for the other threads. The buffers are merged when
+the suite is read: in the order the test cases were added, or by their timestamp with order="start". The totals
+the properties of the suite return are kept up to date per buffer, under a lock of its own which only the thread
+adding to it takes, unless the result of a test case is changed from another thread. A report counts the test
+cases as they are when it is written.
+"""
+import itertools
+import threading
+
+from junit_xml import TestSuite, _SuiteTotals, _TestCaseList
+
+ORDERS = ("sequence", "start")
+
+
+class _LockedSuiteTotals(_SuiteTotals):
+    """Suite totals that can be changed from several threads."""
+
+    def __init__(self, test_cases=None):
+        _SuiteTotals.__init__(self, test_cases)
+        self._lock = threading.Lock()
+
+    def add(self, case, last=True):
+        with self._lock:
+            _SuiteTotals.add(self, case, last)
+
+    def remove(self, case):
+        with self._lock:
+            _SuiteTotals.remove(self, case)
+
+    def update(self, case, before):
+        with self._lock:
+            _SuiteTotals.update(self, case, before)
+
+
+class _ThreadTestCases(_TestCaseList):
+    """The test cases one thread added, and the keys they are merged by."""
+
+    def __init__(self):
+        _TestCaseList.__init__(self)
+        self.totals = _LockedSuiteTotals(self)
+        self.keys = []
+
+
+class _ConcurrentTotals(object):
+    """The totals of the test cases of all threads."""
+
+    def __init__(self, test_cases):
+        self._test_cases = test_cases
+
+    def _sum(self, field):
+        return sum(getattr(buffer.totals, field) for buffer in self._test_cases._snapshot())
+
+    @property
+    def tests(self):
+        return self._sum("tests")
+
+    @property
+    def failures(self):
+        return self._sum("failures")
+
+    @property
+    def errors(self):
+        return self._sum("errors")
+
+    @property
+    def skipped(self):
+        return self._sum("skipped")
+
+    @property
+    def disabled(self):
+        return self._sum("disabled")
+
+    @property
+    def assertions(self):
+        if not self._sum("_assertion_cases"):
+            return None
+        return self._sum("_assertions")
+
+    @property
+    def time(self):
+        # the running time of each thread, not summed in the order the test cases are written, so it may differ
+        # from the time in a report in the last digits
+        return self._sum("time")
+
+
+class _ConcurrentTestCases(object):
+    """
+    The test cases of a concurrent test suite. Can be appended to from any thread, and read in the order of the
+    suite. Reading merges what the threads added so far.
+    """
+
+    def __init__(self, order="sequence", test_cases=()):
+        if order not in ORDERS:
+            raise ValueError("unknown order %r, use one of %s" % (order, ", ".join(ORDERS)))
+        self.order = order
+        self.totals = _ConcurrentTotals(self)
+        self._sequence = itertools.count()
+        self._local = threading.local()
+        self._buffers = []
+        self._lock = threading.Lock()
+        # the merged test cases, and how many test cases there were when they were merged
+        self._merged_cases = ([], 0)
+        self.extend(test_cases)
+
+    def __reduce__(self):
+        return (_ConcurrentTestCases, (self.order, self._merged()))
+
+    def _new_buffer(self):
+        buffer = self._local.buffer = _ThreadTestCases()
+        with self._lock:
+            self._buffers.append(buffer)
+        return buffer
+
+    def append(self, case):
+        # next() of a count is atomic, the sequence numbers are unique across threads
+        sequence = next(self._sequence)
+        try:
+            buffer = self._local.buffer
+        except AttributeError:
+            buffer = self._new_buffer()
+        buffer.append(case)
+        if self.order == "start":
+            buffer.keys.append((case.timestamp is None, case.timestamp, sequence))
+        else:
+            buffer.keys.append(sequence)
+
+    def extend(self, cases):
+        for case in cases:
+            self.append(case)
+
+    def __iadd__(self, cases):
+        self.extend(cases)
+        return self
+
+    def recount(self):
+        """Counts the test cases of every thread again. No thread may add test cases meanwhile."""
+        for buffer in self._snapshot():
+            buffer.recount()
+
+    def _snapshot(self):
+        with self._lock:
+            return list(self._buffers)
+
+    def __len__(self):
+        return sum(len(buffer.keys) for buffer in self._snapshot())
+
+    def _merged(self):
+        cases, count = self._merged_cases
+        buffers = self._snapshot()
+        # a test case is only merged once its key has been added after it
+        lengths = [len(buffer.keys) for buffer in buffers]
+        if sum(lengths) == count:
+            return cases
+        entries = []
+        for buffer, length in zip(buffers, lengths):
+            entries.extend(zip(buffer.keys[:length], buffer[:length]))
+        # keys are unique, test cases are never compared
+        entries.sort()
+        cases = [case for _, case in entries]
+        self._merged_cases = (cases, len(cases))
+        return cases
+
+    def __iter__(self):
+        return iter(self._merged())
+
+    def __getitem__(self, index):
+        return self._merged()[index]
+
+
+class ConcurrentTestSuite(TestSuite):
+    """
+    Suite of test cases that can be added from many threads at once. Takes the same arguments as TestSuite, and
+    as keyword argument the order its test cases are written in: "sequence", the order they were added, or
+    "start", by timestamp, then in the order they were added. Test cases without a timestamp come last.
+    Test cases can only be added, through test_cases.append() or test_cases.extend().
+    """
+
+    def __init__(self, name, test_cases=None, *args, **kwargs):
+        self._order = kwargs.pop("order", "sequence")
+        TestSuite.__init__(self, name, test_cases, *args, **kwargs)
+
+    @property
+    def test_cases(self):
+        return self._test_cases
+
+    @test_cases.setter
+    def test_cases(self, test_cases):
+        self._test_cases = _ConcurrentTestCases(self._order, test_cases)
+
+    def _totals(self):
+        # a report is the one of a TestSuite of the merged test cases, with the time summed in their order
+        return _SuiteTotals.of(self.test_cases)
+
+    def _live_totals(self):
+        return self._test_cases.totals
@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+Compares a JUnit XML report with a baseline report, e.g. to gate a merge on no new failures and no test case
+more than twice as slow as on the main branch.
+
+    python -m junit_xml.diff --max-ratio 2 --min-time 0.1 baseline.xml report.xml
+
+    from junit_xml.diff import diff_reports
+
+    diff = diff_reports("baseline.xml", "report.xml", max_ratio=2.0)
+    if diff.new_failures() or diff.slower:
+        sys.exit(1)
+
+Test cases are matched by (suite name, classname, name). The baseline is read once into a table of its keys,
+statuses and elapsed times, then the current report is compared with it one test case at a time, so memory grows
+with the test cases of the baseline only. Reports are read without turning their test cases into TestCase
+objects, and may be compressed.
+"""
+import argparse
+import sys
+from array import array
+from xml.parsers import expat
+
+from junit_xml.compression import decompressed
+from junit_xml.query import STATUSES
+
+# the status a test case is compared by, the first it has of error, failure and skipped
+_ERROR, _FAILURE, _SKIPPED, _PASSED = (STATUSES.index(status) for status in ("error", "failure", "skipped", "passed"))
+# how much of a report is parsed at a time
+_CHUNK_SIZE = 64 * 1024
+# set on the status of a baseline test case once the current report had it
+_MATCHED = 0x80
+
+
+def _status(case):
+    # as the test case is written: an error or failure without message and output is not, and a report cannot say
+    # that a test case is disabled
+    if case.is_error():
+        return _ERROR
+    if case.is_failure():
+        return _FAILURE
+    if case.is_skipped():
+        return _SKIPPED
+    return _PASSED
+
+
+def _is_report(source):
+    return isinstance(source, (str, bytes)) or hasattr(source, "read") or hasattr(source, "__fspath__")
+
+
+def _iter_results(source):
+    """
+    Yields ((suite name, classname, name), status, elapsed time) for every test case of a report or test suites.
+    Suite names and classnames are shared between the test cases that have them.
+    """
+    if not _is_report(source):
+        for suite in source:
+            for case in suite.test_cases:
+                yield (suite.name, case.classname, case.name), _status(case), float(case.elapsed_sec or 0.0)
+        return
+    if hasattr(source, "read"):
+        for result in _iter_report_results(decompressed(source)):
+            yield result
+        return
+    with open(source, "rb") as f:
+        for result in _iter_report_results(decompressed(f)):
+            yield result
+
+
+def _iter_report_results(source):
+    # expat is called directly: building an element for every test case would take most of the time of a diff
+    results = []
+    names = {}
+    suites = []
+    case = None
+    status = _PASSED
+
+    def start(tag, attributes):
+        nonlocal case, status
+        if tag == "testcase":
+            case = attributes
+            status = _PASSED
+        elif case is not None:
+            # a result of the test case, the first of error, failure and skipped wins
+            if tag == "error":
+                status = _ERROR
+            elif tag == "failure" and status != _ERROR:
+                status = _FAILURE
+            elif tag == "skipped" and status == _PASSED:
+                status = _SKIPPED
+        elif tag == "testsuite":
+            name = attributes.get("name")
+            suites.append(names.setdefault(name, name))
+
+    def end(tag):
+        nonlocal case
+        if tag == "testcase":
+            classname = case.get("classname")
+            elapsed_sec = case.get("time")
+            key = (suites[-1] if suites else None, names.setdefault(classname, classname), case.get("name"))
+            results.append((key, status, float(elapsed_sec) if elapsed_sec else 0.0))
+            case = None
+        elif tag == "testsuite" and case is None:
+            suites.pop()
+
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    while True:
+        data = source.read(_CHUNK_SIZE)
+        parser.Parse(data, not data)
+        # the test cases of a chunk are handed on before the next one is read
+        for result in results:
+            yield result
+        del results[:]
+        if not data:
+            return
+
+
+class ReportDiff(object):
+    """
+    The differences between a baseline and a current report. Test cases are keyed by (suite name, classname, name)
+    and statuses are those of junit_xml.query.STATUSES, a test case having the first of error, failure and skipped
+    it has, or passed.
+
+    added: [(key, status)] of the test cases only in the current report, in its order.
+    removed: [(key, status)] of the test cases only in the baseline, in its order.
+    transitions: [(key, baseline status, current status)] of the test cases whose status changed.
+    slower: [(key, ratio, baseline time, current time)] of the test cases at least max_ratio times slower, the
+            largest ratio first.
+    faster: the same for the test cases at least max_ratio times faster, the smallest ratio first.
+    compared: The number of test cases in both reports.
+    """
+
+    def __init__(self, max_ratio, min_time):
+        self.max_ratio = max_ratio
+        self.min_time = min_time
+        self.added = []
+        self.removed = []
+        self.transitions = []
+        self.slower = []
+        self.faster = []
+        self.compared = 0
+
+    def new_failures(self):
+        """
+        Returns the keys of the test cases that failed or errored in the current report but not in the baseline,
+        because their status changed or they were added.
+        """
+        failed = ("failure", "error")
+        keys = [key for key, before, after in self.transitions if after in failed and before not in failed]
+        keys.extend(key for key, status in self.added if status in failed)
+        return keys
+
+    def fixed(self):
+        """
+        Returns the keys of the test cases that failed or errored in the baseline and passed in the current report.
+        """
+        return [
+            key for key, before, after in self.transitions if before in ("failure", "error") and after == "passed"
+        ]
+
+    def transition_counts(self):
+        """
+        Returns {(baseline status, current status): number of test cases}.
+        """
+        counts = {}
+        for _, before, after in self.transitions:
+            counts[(before, after)] = counts.get((before, after), 0) + 1
+        return counts
+
+
+def diff_reports(baseline, current, max_ratio=2.0, min_time=0.0):
+    """
+    Compares the test cases of a report with those of a baseline, reading each of them once.
+    A test case that is in the baseline more than once is compared by the last of them, and one that is in the
+    current report more than once is compared every time.
+    @param baseline: File name or file object of the baseline report, which may be compressed, or its test suites.
+    @param current: The current report, in any of the forms of baseline.
+    @param max_ratio: Test cases whose elapsed time grew or shrank by this factor or more are listed as slower or
+                      faster. None to not compare times.
+    @param min_time: Test cases that took less than this many seconds in both reports are not listed as slower or
+                     faster, their times being mostly noise. Test cases without a time in the baseline are
+                     never listed.
+    @return: ReportDiff
+    """
+    if max_ratio is not None and max_ratio <= 1:
+        raise ValueError("max_ratio must be greater than 1, not %r" % max_ratio)
+    diff = ReportDiff(max_ratio, min_time)
+
+    rows = {}
+    statuses = array("B")
+    elapsed = array("d")
+    for key, status, elapsed_sec in _iter_results(baseline):
+        row = rows.get(key)
+        if row is None:
+            rows[key] = len(statuses)
+            statuses.append(status)
+            elapsed.append(elapsed_sec)
+        else:
+            statuses[row] = status
+            elapsed[row] = elapsed_sec
+
+    # the comparison runs once per test case of the current report, the lists it appends to are looked up once
+    added, transitions, slower, faster = diff.added, diff.transitions, diff.slower, diff.faster
+    compare_times = max_ratio is not None
+    compared = 0
+    for key, status, elapsed_sec in _iter_results(current):
+        row = rows.get(key)
+        if row is None:
+            added.append((key, STATUSES[status]))
+            continue
+        compared += 1
+        baseline_status = statuses[row] & ~_MATCHED
+        statuses[row] = baseline_status | _MATCHED
+        if status != baseline_status:
+            transitions.append((key, STATUSES[baseline_status], STATUSES[status]))
+        if not compare_times:
+            continue
+        baseline_sec = elapsed[row]
+        if not baseline_sec:
+            # no time in the baseline, the test case took no time or did not say
+            continue
+        if elapsed_sec > baseline_sec:
+            if elapsed_sec >= min_time and elapsed_sec >= baseline_sec * max_ratio:
+                slower.append((key, elapsed_sec / baseline_sec, baseline_sec, elapsed_sec))
+        elif baseline_sec > elapsed_sec:
+            if baseline_sec >= min_time and baseline_sec >= elapsed_sec * max_ratio:
+                faster.append((key, elapsed_sec / baseline_sec, baseline_sec, elapsed_sec))
+    diff.compared = compared
+
+    # rows is in the order of the baseline
+    diff.removed = [(key, STATUSES[statuses[row]]) for key, row in rows.items() if not statuses[row] & _MATCHED]
+    diff.slower.sort(key=lambda entry: -entry[1])
+    diff.faster.sort(key=lambda entry: entry[1])
+    return diff
+
+
+def _format_key(key):
+    suite_name, classname, name = key
+    return "%s: %s" % (suite_name, ".".join(part for part in (classname, name) if part))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compares a JUnit XML report with a baseline report. Exits with status 1 when test cases "
+        "failed that did not fail in the baseline, or, with --max-ratio, got that many times slower."
+    )
+    parser.add_argument("baseline", help="the baseline report")
+    parser.add_argument("report", help="the report compared with the baseline")
+    parser.add_argument("--max-ratio", type=float, help="fail when a test case got this many times slower")
+    parser.add_argument(
+        "--min-time", type=float, default=0.0, help="ignore the times of test cases faster than this many seconds"
+    )
+    parser.add_argument("--allow-new-failures", action="store_true", help="do not fail on new failures")
+    parser.add_argument("-v", "--verbose", action="store_true", help="also list added and removed test cases")
+    args = parser.parse_args(argv)
+
+    diff = diff_reports(args.baseline, args.report, max_ratio=args.max_ratio, min_time=args.min_time)
+    new_failures = diff.new_failures()
+    out = sys.stdout
+    counts = (diff.compared, len(diff.added), len(diff.removed), len(diff.transitions), len(new_failures))
+    out.write("%d compared, %d added, %d removed, %d changed status, %d new failures\n" % counts)
+    for key in new_failures:
+        out.write("new failure  %s\n" % _format_key(key))
+    for key, ratio, baseline_sec, current_sec in diff.slower:
+        out.write("%.1fx slower  %s (%.3fs -> %.3fs)\n" % (ratio, _format_key(key), baseline_sec, current_sec))
+    if args.verbose:
+        for key, status in diff.added:
+            out.write("added  %s (%s)\n" % (_format_key(key), status))
+        for key, status in diff.removed:
+            out.write("removed  %s (%s)\n" % (_format_key(key), status))
+
+    if (new_failures and not args.allow_new_failures) or diff.slower:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
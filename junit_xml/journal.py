@@ -0,0 +1,349 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+A crash-safe journal of test results, turned into a JUnit XML report afterwards.
+
+    with ResultJournal("results.journal") as journal:
+        journal.begin_suite("my test suite")
+        for case in run_tests():
+            journal.write_test_case(case)
+        journal.end_suite()
+
+    materialize_journal("results.journal", "report.xml")
+
+Every test case is appended to the journal as one line of JSON as soon as it is written, so a process that is
+killed loses at most the test case being written. The journal is synced to disk every sync_every records or
+sync_interval seconds. materialize_journal() writes the report in one streaming pass over the journal, and
+leaves out a last record that was torn by a crash.
+"""
+import io
+import json
+import os
+
+from junit_xml import (
+    JUnitXMLWriter,
+    TestCase,
+    TestSuite,
+    _ResultInfo,
+    _SkippedInfo,
+    _clock,
+    _is_lazy_source,
+    _iter_source_text,
+    decode,
+)
+
+# the attributes of a test case, in the order of TestCase's arguments, that are journaled when set
+_CASE_FIELDS = (
+    "name",
+    "classname",
+    "elapsed_sec",
+    "stdout",
+    "stderr",
+    "assertions",
+    "timestamp",
+    "status",
+    "category",
+    "file",
+    "line",
+    "log",
+    "url",
+)
+_SUITE_FIELDS = ("name", "hostname", "id", "package", "timestamp", "file", "log", "url", "stdout", "stderr")
+_RESULTS = (("errors", _ResultInfo), ("failures", _ResultInfo), ("skipped", _SkippedInfo))
+
+# how far back from its end a journal is read at a time, to find where its last complete record ends
+_CHUNK_SIZE = 64 * 1024
+
+
+class ResultJournal(object):
+    """
+    Appends test results to a journal, one record per test case.
+    @param file_descriptor: The path of the journal, which is appended to if it exists, or a binary file.
+    @param encoding: Used to decode encoded strings.
+    @param sync_every: Syncs the journal to disk after this many records, never if None.
+    @param sync_interval: Syncs the journal to disk when a record is written this many seconds after the last sync,
+                          never if None.
+    """
+
+    def __init__(self, file_descriptor, encoding=None, sync_every=100, sync_interval=1.0):
+        if hasattr(file_descriptor, "write"):
+            self.file_descriptor = file_descriptor
+            self._owned = False
+        else:
+            # unbuffered, every record is written to the operating system as a whole
+            self.file_descriptor = io.open(file_descriptor, "a+b", buffering=0)
+            self._owned = True
+            _truncate_torn_record(self.file_descriptor)
+        self.encoding = encoding
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._unsynced = 0
+        self._last_sync = _clock()
+        self._suite = None
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def begin_suite(self, name, **kwargs):
+        """
+        Starts a new test suite. Takes the same arguments as TestSuite, except for test_cases.
+        @return: The TestSuite holding the suite's attributes. Its properties, stdout and stderr may still be
+                 changed until end_suite() is called.
+        """
+        suite = TestSuite(name, **kwargs)
+        self._begin(suite)
+        return suite
+
+    def write_test_case(self, test_case):
+        """
+        Appends a test case to the current test suite.
+        """
+        if self._suite is None:
+            raise ValueError("no test suite has been begun")
+        self._write({"case": self._case_record(test_case)})
+
+    def end_suite(self):
+        """
+        Finishes the current test suite.
+        """
+        if self._suite is None:
+            raise ValueError("no test suite has been begun")
+        self._write({"end": self._suite_record(self._suite)})
+        self._suite = None
+
+    def write_test_suite(self, test_suite):
+        """
+        Appends a complete test suite with all of its test cases.
+        """
+        self._begin(test_suite)
+        for case in test_suite.test_cases:
+            self.write_test_case(case)
+        self.end_suite()
+
+    def sync(self):
+        """
+        Syncs the records written so far to disk.
+        """
+        self.file_descriptor.flush()
+        try:
+            fileno = self.file_descriptor.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            # a file in memory
+            fileno = None
+        if fileno is not None:
+            os.fsync(fileno)
+        self._unsynced = 0
+        self._last_sync = _clock()
+
+    def close(self):
+        """
+        Syncs the journal to disk. A journal opened from a path is closed, a file is left open.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.sync()
+        if self._owned:
+            self.file_descriptor.close()
+
+    def _begin(self, test_suite):
+        if self._closed:
+            raise ValueError("journal is closed")
+        if self._suite is not None:
+            raise ValueError("test suite %r has not been ended" % self._suite.name)
+        self._suite = test_suite
+        self._write({"suite": self._suite_record(test_suite)})
+
+    def _write(self, record):
+        data = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        self.file_descriptor.write(data.encode("utf-8", "surrogatepass"))
+        self.file_descriptor.flush()
+        self._unsynced += 1
+        if (self.sync_every is not None and self._unsynced >= self.sync_every) or (
+            self.sync_interval is not None and _clock() - self._last_sync >= self.sync_interval
+        ):
+            self.sync()
+
+    def _value(self, value):
+        """
+        Returns a value as it is journaled: JSON numbers and strings as they are, lazy sources read, and other
+        values decoded, as they would be in the report.
+        """
+        if value is None or isinstance(value, (str, bool, int, float)):
+            return value
+        if _is_lazy_source(value):
+            return "".join(_iter_source_text(value, self.encoding))
+        return decode(value, self.encoding)
+
+    def _case_record(self, test_case):
+        record = {}
+        for field in _CASE_FIELDS:
+            value = getattr(test_case, field)
+            if value is not None:
+                record[field] = self._value(value)
+        if not test_case.is_enabled:
+            record["disabled"] = True
+        if test_case.allow_multiple_subalements:
+            record["allow_multiple_subelements"] = True
+        for field, cls in _RESULTS:
+            results = getattr(test_case, "_" + field)
+            if results:
+                # by key, as results may be plain dicts with their keys in any order, and other keys
+                record[field] = [[self._value(result.get(key)) for key in cls._fields] for result in results]
+        return record
+
+    def _suite_record(self, test_suite):
+        record = {}
+        for field in _SUITE_FIELDS:
+            value = getattr(test_suite, field)
+            if value is not None:
+                record[field] = self._value(value)
+        if test_suite.properties:
+            record["properties"] = [[self._value(k), self._value(v)] for k, v in test_suite.properties.items()]
+        return record
+
+
+def _truncate_torn_record(f):
+    """
+    Truncates a journal after its last complete record, so a record torn by a crash is not continued.
+    """
+    end = f.seek(0, io.SEEK_END)
+    position = end
+    while position > 0:
+        size = min(_CHUNK_SIZE, position)
+        f.seek(position - size)
+        newline = f.read(size).rfind(b"\n")
+        if newline >= 0:
+            position = position - size + newline + 1
+            break
+        position -= size
+    if position != end:
+        f.truncate(position)
+
+
+def iter_journal(journal):
+    """
+    Yields (record type, record) for every complete record of a journal: "suite" when a test suite is begun,
+    "case" for a test case and "end" when the test suite is ended. A torn last record is left out.
+    @param journal: The path of the journal, or the journal opened in binary mode.
+    """
+    if hasattr(journal, "read"):
+        for record in _iter_journal_file(journal):
+            yield record
+        return
+    with io.open(journal, "rb") as f:
+        for record in _iter_journal_file(f):
+            yield record
+
+
+def _iter_journal_file(f):
+    line_number = 0
+    pending = None
+    for line in f:
+        if pending is not None:
+            yield _parse_record(pending, line_number, last=False)
+        line_number += 1
+        pending = line
+    if pending is not None:
+        record = _parse_record(pending, line_number, last=True)
+        if record is not None:
+            yield record
+
+
+def _parse_record(line, line_number, last):
+    if line.endswith(b"\n"):
+        try:
+            record = json.loads(line.decode("utf-8", "surrogatepass"))
+            (kind, fields), = record.items()
+            return kind, fields
+        except (AttributeError, ValueError):
+            pass
+    if last:
+        # the record being written when the process died
+        return None
+    raise ValueError("record %d of the journal is corrupt" % line_number)
+
+
+def _test_suite(fields, test_suite=None):
+    """
+    Returns the test suite of a suite or end record, or updates the suite begun with the fields of its end record.
+    """
+    fields = dict(fields)
+    properties = fields.pop("properties", None)
+    if properties is not None:
+        properties = dict(properties)
+    if test_suite is None:
+        return TestSuite(properties=properties, **fields)
+    for field in _SUITE_FIELDS:
+        setattr(test_suite, field, fields.get(field))
+    test_suite.properties = properties
+    return test_suite
+
+
+def _test_case(fields):
+    fields = dict(fields)
+    disabled = fields.pop("disabled", False)
+    results = [(field, cls, fields.pop(field, None)) for field, cls in _RESULTS]
+    case = TestCase(**fields)
+    for field, cls, values in results:
+        if values:
+            setattr(case, field, [cls(*value) for value in values])
+    if disabled:
+        case.is_enabled = False
+    return case
+
+
+def materialize_journal(
+    journal,
+    file_descriptor,
+    prettyprint=True,
+    encoding=None,
+    policy=None,
+    compression=None,
+    compresslevel=None,
+):
+    """
+    Writes the JUnit XML report of a journal, reading and writing one test case at a time. A test suite that was
+    not ended, as the journal of a crashed process has, is written with the test cases it has.
+    @param journal: The path of the journal, or the journal opened in binary mode.
+    @param file_descriptor: The path of the report, or a file, as to_xml_report_file() takes it.
+    @param encoding: The encoding of the report.
+    """
+    if not hasattr(file_descriptor, "write"):
+        with io.open(file_descriptor, "wb") as f:
+            return materialize_journal(journal, f, prettyprint, encoding, policy, compression, compresslevel)
+    writer = JUnitXMLWriter(
+        file_descriptor,
+        prettyprint=prettyprint,
+        encoding=encoding,
+        policy=policy,
+        compression=compression,
+        compresslevel=compresslevel,
+    )
+    with writer:
+        _materialize(writer, journal)
+
+
+def _materialize(writer, journal):
+    """
+    Writes the test suites of a journal with a JUnitXMLWriter, ending a test suite the journal did not end.
+    """
+    suite = None
+    for kind, fields in iter_journal(journal):
+        if kind == "case":
+            writer.write_test_case(_test_case(fields))
+        elif kind == "suite":
+            if suite is not None:
+                writer.end_suite()
+            suite = _test_suite(fields)
+            writer.begin_test_suite(suite)
+        elif kind == "end":
+            _test_suite(fields, suite)
+            writer.end_suite()
+            suite = None
+    if suite is not None:
+        writer.end_suite()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+Merges JUnit XML reports, e.g. the shards of a test run split across several workers, into one report.
+
+    python -m junit_xml.merge -o report.xml shard-*.xml
+
+The reports are read and written one test case at a time, so only one test case per report is held in memory.
+The totals of the merged report are computed from its test cases. Compressed reports are read as they are.
+"""
+import argparse
+import heapq
+import io
+
+from junit_xml import JUnitXMLWriter
+from junit_xml.compression import COMPRESSIONS
+from junit_xml.reader import _iter_report
+
+
+class _Shard(object):
+    """A report being merged, positioned at one of its test suites."""
+
+    def __init__(self, index, source):
+        self.index = index
+        self._events = _iter_report(source)
+        self.suite = None
+        self._case = None
+        self._next_suite()
+
+    def _next_suite(self):
+        # the first test case of a suite is read ahead to learn which suite comes next
+        self.suite, self._case = next(self._events, (None, None))
+
+    def sort_key(self):
+        return (self.suite.name or "", self.index)
+
+    def test_cases(self):
+        """
+        Yields the test cases of the current suite and moves on to the next suite.
+        """
+        case = self._case
+        while case is not None:
+            yield case
+            _, case = next(self._events)
+        self._next_suite()
+
+
+def merge_reports(
+    sources,
+    file_descriptor,
+    prettyprint=True,
+    encoding=None,
+    merge_suites=False,
+    sort_suites=False,
+    compression=None,
+    compresslevel=None,
+):
+    """
+    Writes the test suites of several JUnit XML reports into one report.
+    @param sources: File names or file objects of the reports, which may be compressed.
+    @param merge_suites: Combines test suites with the same name that follow each other into one.
+    @param sort_suites: Writes the test suites ordered by name, and by the order of the reports for the same name.
+                        Reports which list their suites by name, as merged reports do, are merged into one
+                        report ordered by name, so that with merge_suites every name is written once.
+    @param compression: "gzip", "bz2" or "xz" to compress the merged report, written to a binary file.
+    """
+    shards = [_Shard(index, source) for index, source in enumerate(sources)]
+    with JUnitXMLWriter(
+        file_descriptor,
+        prettyprint=prettyprint,
+        encoding=encoding,
+        compression=compression,
+        compresslevel=compresslevel,
+    ) as writer:
+        if sort_suites:
+            heap = [(shard.sort_key(), shard) for shard in shards if shard.suite is not None]
+            heapq.heapify(heap)
+            while heap:
+                _, shard = heapq.heappop(heap)
+                _write_suite(writer, shard, merge_suites)
+                if shard.suite is not None:
+                    heapq.heappush(heap, (shard.sort_key(), shard))
+        else:
+            for shard in shards:
+                while shard.suite is not None:
+                    _write_suite(writer, shard, merge_suites)
+
+
+def _write_suite(writer, shard, merge_suites):
+    suite = shard.suite
+    current = writer.current_suite
+    if current is not None and merge_suites and current.name == suite.name:
+        for case in shard.test_cases():
+            writer.write_test_case(case)
+        # properties and output written after the test cases are only known now
+        if suite.properties:
+            properties = dict(current.properties or {})
+            properties.update(suite.properties)
+            current.properties = properties
+        current.stdout = _join_output(current.stdout, suite.stdout)
+        current.stderr = _join_output(current.stderr, suite.stderr)
+        return
+
+    if current is not None:
+        writer.end_suite()
+    writer.begin_test_suite(suite)
+    for case in shard.test_cases():
+        writer.write_test_case(case)
+    if not merge_suites:
+        writer.end_suite()
+
+
+def _join_output(output, more_output):
+    if output and more_output:
+        return output + "\n" + more_output
+    return output or more_output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merges JUnit XML reports into one report.")
+    parser.add_argument("reports", nargs="+", help="the reports to merge")
+    parser.add_argument("-o", "--output", required=True, help="file name of the merged report")
+    parser.add_argument("--merge-suites", action="store_true", help="combine test suites with the same name")
+    parser.add_argument("--sort-suites", action="store_true", help="write the test suites ordered by name")
+    parser.add_argument("--encoding", help="encoding of the merged report, UTF-8 by default")
+    parser.add_argument("--no-prettyprint", dest="prettyprint", action="store_false", help="do not indent the XML")
+    parser.add_argument("--compression", choices=COMPRESSIONS, help="compress the merged report")
+    args = parser.parse_args(argv)
+
+    with io.open(args.output, "wb") as f:
+        merge_reports(
+            args.reports,
+            f,
+            prettyprint=args.prettyprint,
+            encoding=args.encoding,
+            merge_suites=args.merge_suites,
+            sort_suites=args.sort_suites,
+            compression=args.compression,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+Random access into large JUnit XML reports through an index of where their test suites and test cases start.
+
+    from junit_xml.offsets import OffsetIndex, build_offset_index
+
+    build_offset_index("report.xml")  # once, writes report.xml.offsets
+    with OffsetIndex("report.xml") as index:
+        for position in index.find("test_login", classname="tests.auth"):
+            case = index.test_case(position)
+            print(index.suite_of(position).name, case.failures)
+
+build_offset_index() scans the report once, memory mapped, for the start tags of its testsuite and testcase
+elements, and writes their byte offsets to a sidecar file, with the suite of every test case, the test cases of
+every suite and a hash of the name of every test case. A lookup seeks to the offset of a test case and parses
+that element only, so reading one test case of a report of many gigabytes costs what reading a report of one test
+case does. The index records the size and modification time of the report, and refuses to be used with a report
+that has changed since.
+Compressed reports cannot be indexed, decompress them first.
+"""
+import codecs
+import io
+import mmap
+import os
+import re
+import struct
+import sys
+import xml.etree.ElementTree as ET
+import zlib
+from array import array
+
+from junit_xml.compression import detect_compression
+from junit_xml.reader import _read_test_case, _read_test_suite
+
+# magic, version, length of the encoding name, report size, report modification time, suites, test cases
+_HEADER = struct.Struct("<4sHHQqQQ")
+_MAGIC = b"JXOI"
+_VERSION = 2
+_SUFFIX = ".offsets"
+# the suite of a test case outside of any test suite
+_NO_SUITE = 0xFFFFFFFF
+
+# how much of the report is handed to the parser at a time when reading one element
+_CHUNK_SIZE = 64 * 1024
+
+_declaration_re = re.compile(br"""^\s*<\?xml[^>]*?encoding\s*=\s*["']([A-Za-z0-9._-]+)["']""")
+# the markup the scanner matches: the start tag of a test suite or test case, with the name of a test case, the end
+# tag of a test suite, and sections that may contain text looking like those, which are skipped whole. The
+# attributes before the name are matched one by one, so a name in the value of another attribute is not taken for
+# it. Attribute values are taken to have any ">" escaped, as ElementTree and minidom write them.
+_markup_re = re.compile(
+    br"""<(testsuite|testcase)(?=[\s/>])(?:\s+(?!name\s*=)[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*"""
+    br"""(?:\s+name\s*=\s*(?:"([^"]*)"|'([^']*)'))?[^>]*>"""
+    br"""|(</testsuite\s*>)|<!\[CDATA\[.*?\]\]>|<!--.*?-->""",
+    re.DOTALL,
+)
+_start_tag_re = re.compile(br"<[^>]*>")
+_needs_unescaping_re = re.compile(br"[&\t\n\r]")
+_attribute_re = re.compile(br"""([^\s=/>]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+_reference_re = re.compile(r"&(#x[0-9a-fA-F]+|#[0-9]+|amp|lt|gt|quot|apos);")
+_ENTITIES = {"amp": "&", "lt": "<", "gt": ">", "quot": '"', "apos": "'"}
+
+
+def _unescape_reference(match):
+    reference = match.group(1)
+    if reference.startswith("#x"):
+        return chr(int(reference[2:], 16))
+    if reference.startswith("#"):
+        return chr(int(reference[1:]))
+    return _ENTITIES[reference]
+
+
+def _attribute_value(raw, encoding):
+    """
+    Returns an attribute value as a parser reads it: decoded, whitespace normalized and references replaced.
+    """
+    value = raw.decode(encoding)
+    if "\t" in value or "\n" in value or "\r" in value:
+        value = value.replace("\r\n", " ").replace("\t", " ").replace("\n", " ").replace("\r", " ")
+    if "&" in value:
+        value = _reference_re.sub(_unescape_reference, value)
+    return value
+
+
+def _name_hash(name):
+    return zlib.crc32(name.encode("utf-8", "surrogatepass")) & 0xFFFFFFFF
+
+
+def _report_encoding(head):
+    if head.startswith((b"\xff\xfe", b"\xfe\xff")) or head[:2].count(b"\x00"):
+        raise ValueError("reports encoded in UTF-16 or UTF-32 cannot be indexed")
+    declaration = _declaration_re.match(head)
+    return declaration.group(1).decode("ascii") if declaration else "utf-8"
+
+
+def _index_path(report, index_path):
+    return report + _SUFFIX if index_path is None else index_path
+
+
+def _open_map(f):
+    if detect_compression(f):
+        raise ValueError("compressed reports cannot be indexed, decompress them first")
+    size = os.fstat(f.fileno()).st_size
+    if size == 0:
+        raise ValueError("the report is empty")
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def build_offset_index(report, index_path=None):
+    """
+    Scans a report once and writes the offsets of its test suites and test cases to an index file.
+    @param report: The path of the report.
+    @param index_path: The path of the index, the report's with ".offsets" appended by default.
+    @return: OffsetIndex
+    """
+    index_path = _index_path(report, index_path)
+    with io.open(report, "rb") as f:
+        report_map = _open_map(f)
+        try:
+            stat = os.fstat(f.fileno())
+            encoding = _report_encoding(report_map[:_CHUNK_SIZE])
+            suite_offsets, case_offsets, case_suites, name_hashes = _scan(report_map, encoding)
+        finally:
+            report_map.close()
+    suite_starts, suite_cases = _cases_by_suite(len(suite_offsets), case_suites)
+
+    encoding_name = encoding.encode("ascii")
+    header = _HEADER.pack(
+        _MAGIC,
+        _VERSION,
+        len(encoding_name),
+        stat.st_size,
+        stat.st_mtime_ns,
+        len(suite_offsets),
+        len(case_offsets),
+    )
+    # written next to the index and renamed over it, so an index is never read half written
+    temporary_path = index_path + ".tmp"
+    with io.open(temporary_path, "wb") as f:
+        f.write(header)
+        f.write(encoding_name)
+        for offsets in (suite_offsets, case_offsets, case_suites, name_hashes, suite_starts, suite_cases):
+            _write_array(f, offsets)
+    os.replace(temporary_path, index_path)
+    return OffsetIndex(report, index_path)
+
+
+def _scan(report_map, encoding):
+    suite_offsets = array("Q")
+    case_offsets = array("Q")
+    case_suites = array("I")
+    name_hashes = array("I")
+    # the suites the scanner is in, a test case outside of any suite has the suite _NO_SUITE
+    open_suites = []
+    # names are hashed as they are in the report, unless they need decoding or unescaping first
+    raw_names = codecs.lookup(encoding).name == "utf-8"
+    crc32 = zlib.crc32
+    needs_unescaping = _needs_unescaping_re.search
+    for markup in _markup_re.finditer(report_map):
+        tag, double_quoted, single_quoted, suite_end = markup.groups()
+        if tag == b"testcase":
+            name = double_quoted if double_quoted is not None else single_quoted or b""
+            if not (raw_names or name.isascii()) or needs_unescaping(name):
+                name = _attribute_value(name, encoding).encode("utf-8", "surrogatepass")
+            case_offsets.append(markup.start())
+            case_suites.append(open_suites[-1] if open_suites else _NO_SUITE)
+            name_hashes.append(crc32(name) & 0xFFFFFFFF)
+        elif tag == b"testsuite":
+            if not markup.group(0).endswith(b"/>"):
+                open_suites.append(len(suite_offsets))
+            suite_offsets.append(markup.start())
+        elif suite_end is not None and open_suites:
+            open_suites.pop()
+    return suite_offsets, case_offsets, case_suites, name_hashes
+
+
+def _cases_by_suite(suites, case_suites):
+    """
+    Returns the positions of the test cases grouped by their suite, each suite's in report order, and where the
+    test cases of each suite start among them, with the end of the last suite's appended.
+    """
+    counts = array("Q", bytes(8 * (suites + 1)))
+    for suite in case_suites:
+        if suite != _NO_SUITE:
+            counts[suite + 1] += 1
+    suite_starts = array("Q", counts)
+    for suite in range(suites):
+        suite_starts[suite + 1] += suite_starts[suite]
+    suite_cases = array("Q", bytes(8 * suite_starts[suites]))
+    next_positions = array("Q", suite_starts)
+    for position, suite in enumerate(case_suites):
+        if suite != _NO_SUITE:
+            suite_cases[next_positions[suite]] = position
+            next_positions[suite] += 1
+    return suite_starts, suite_cases
+
+
+def _attributes(start_tag, encoding):
+    attributes = {}
+    for name, double_quoted, single_quoted in _attribute_re.findall(start_tag):
+        attributes[name.decode("ascii")] = _attribute_value(double_quoted or single_quoted, encoding)
+    return attributes
+
+
+def _write_array(f, values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    f.write(values.tobytes())
+
+
+def _read_array(f, typecode, count):
+    values = array(typecode)
+    data = f.read(values.itemsize * count)
+    if len(data) != values.itemsize * count:
+        raise ValueError("the offset index is truncated")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class OffsetIndex(object):
+    """
+    The offset index of a report, written by build_offset_index(), to read single test cases and test suites of it.
+    Test cases and test suites are numbered in the order they start in the report, from 0.
+    @param report: The path of the report.
+    @param index_path: The path of the index, the report's with ".offsets" appended by default.
+    """
+
+    def __init__(self, report, index_path=None):
+        index_path = _index_path(report, index_path)
+        with io.open(index_path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ValueError("%s is not an offset index" % index_path)
+            magic, version, encoding_size, size, mtime_ns, suites, cases = _HEADER.unpack(header)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError("%s is not an offset index of this version" % index_path)
+            self.encoding = f.read(encoding_size).decode("ascii")
+            self._suite_offsets = _read_array(f, "Q", suites)
+            self._case_offsets = _read_array(f, "Q", cases)
+            self._case_suites = _read_array(f, "I", cases)
+            self._name_hashes = _read_array(f, "I", cases)
+            self._suite_starts = _read_array(f, "Q", suites + 1)
+            self._suite_cases = _read_array(f, "Q", self._suite_starts[suites])
+        self._by_name = None
+
+        self._file = io.open(report, "rb")
+        try:
+            stat = os.fstat(self._file.fileno())
+            if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                raise ValueError("%s has changed since it was indexed, build the index again" % report)
+            self._map = _open_map(self._file)
+        except Exception:
+            self._file.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __len__(self):
+        return len(self._case_offsets)
+
+    @property
+    def suite_count(self):
+        return len(self._suite_offsets)
+
+    def test_case(self, position):
+        """
+        Returns the test case at a position, with its results and output, parsed from the report.
+        """
+        return _read_test_case(self._parse(self._case_offsets[position], whole=True))
+
+    def test_suite(self, position):
+        """
+        Returns the test suite at a position with its attributes, without its test cases, properties and output.
+        """
+        return _read_test_suite(self._parse(self._suite_offsets[position], whole=False))
+
+    def suite_of(self, position):
+        """
+        Returns the test suite of the test case at a position as test_suite() does, or None for a test case outside
+        of any test suite.
+        """
+        suite = self._case_suites[position]
+        return None if suite == _NO_SUITE else self.test_suite(suite)
+
+    def test_cases_of(self, suite_position):
+        """
+        Returns the positions of the test cases of the test suite at a position.
+        """
+        return self._suite_cases[self._suite_starts[suite_position]:self._suite_starts[suite_position + 1]].tolist()
+
+    def find(self, name, classname=None):
+        """
+        Returns the positions of the test cases with a name, and a classname if it is given, in report order.
+        """
+        if self._by_name is None:
+            self._by_name = {}
+            for position, name_hash in enumerate(self._name_hashes):
+                positions = self._by_name.get(name_hash)
+                if positions is None:
+                    self._by_name[name_hash] = positions = array("L")
+                positions.append(position)
+        found = []
+        for position in self._by_name.get(_name_hash(name), ()):
+            # names are hashed, the start tag tells whether it is the test case asked for
+            tag = _start_tag_re.match(self._map, self._case_offsets[position]).group(0)
+            attributes = _attributes(tag, self.encoding)
+            if attributes.get("name") == name and (classname is None or attributes.get("classname") == classname):
+                found.append(position)
+        return found
+
+    def _parse(self, offset, whole):
+        """
+        Returns the element starting at an offset of the report, with its children if whole, else only with its
+        attributes.
+        """
+        parser = ET.XMLPullParser(events=("start", "end"))
+        parser.feed(('<?xml version="1.0" encoding="%s"?>' % self.encoding).encode("ascii"))
+        depth = 0
+        while True:
+            chunk = self._map[offset:offset + _CHUNK_SIZE]
+            if not chunk:
+                raise ValueError("the report ends inside the element at byte %d" % offset)
+            offset += len(chunk)
+            parser.feed(chunk)
+            for event, element in parser.read_events():
+                if event == "start":
+                    if not whole:
+                        return element
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return element
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+Indexes the test cases of a report for the questions asked of every report: the slowest test cases, the
+failures of every class, the test cases over a time limit and the test cases that both passed and failed.
+
+    from junit_xml.query import ReportIndex
+
+    index = ReportIndex.from_report("report.xml")
+    for case in index.slowest(10):
+        print(case.classname, case.name, case.elapsed_sec)
+    for classname, cases in index.failures_by_classname().items():
+        print(classname, len(cases))
+
+The index is built in one pass over the test cases. Test cases are found by classname, file and status through
+hash indexes, and by elapsed time through an array of the test cases sorted by it, so that a query costs what it
+returns rather than a pass over the report.
+"""
+from array import array
+from bisect import bisect_right
+
+# the statuses test cases are indexed by; a test case that failed and errored has both
+STATUSES = ("passed", "failure", "error", "skipped", "disabled")
+_PASSED = ("passed",)
+
+
+def _statuses(case):
+    if case._is_enabled and not (case._failures or case._errors or case._skipped):
+        return _PASSED
+    statuses = []
+    if case.is_failure():
+        statuses.append("failure")
+    if case.is_error():
+        statuses.append("error")
+    if case.is_skipped():
+        statuses.append("skipped")
+    if not case.is_enabled:
+        statuses.append("disabled")
+    return statuses or _PASSED
+
+
+class ReportIndex(object):
+    """
+    The test cases of some test suites, indexed.
+    @param test_suites: The test suites, e.g. read with junit_xml.reader.
+    """
+
+    def __init__(self, test_suites=()):
+        self.test_cases = []
+        self._suites = []
+        # the index of the suite of every test case
+        self._case_suites = array("L")
+        self._by_classname = {}
+        self._by_file = {}
+        self._by_status = dict((status, array("L")) for status in STATUSES)
+        self._elapsed_sec = array("d")
+        self._flaky = None
+        for suite in test_suites:
+            for case in suite.test_cases:
+                self._add(suite, case)
+        self._sort()
+
+    @classmethod
+    def from_report(cls, source):
+        """
+        Returns the index of a report, read one test case at a time.
+        @param source: File name or file object of the report, which may be compressed.
+        """
+        from junit_xml.reader import iter_test_cases
+
+        index = cls()
+        for suite, case in iter_test_cases(source):
+            index._add(suite, case)
+        index._sort()
+        return index
+
+    def _add(self, suite, case):
+        if not self._suites or self._suites[-1] is not suite:
+            self._suites.append(suite)
+        row = len(self.test_cases)
+        self.test_cases.append(case)
+        self._case_suites.append(len(self._suites) - 1)
+        for rows, key in ((self._by_classname, case.classname), (self._by_file, case.file)):
+            keyed = rows.get(key)
+            if keyed is None:
+                keyed = rows[key] = array("L")
+            keyed.append(row)
+        for status in _statuses(case):
+            self._by_status[status].append(row)
+        self._elapsed_sec.append(float(case.elapsed_sec or 0.0))
+
+    def _sort(self):
+        elapsed_sec = self._elapsed_sec
+        # the rows ordered by elapsed time, and the elapsed times in that order, to bisect
+        self._by_time = array("L", sorted(range(len(elapsed_sec)), key=elapsed_sec.__getitem__))
+        self._sorted_sec = array("d", (elapsed_sec[row] for row in self._by_time))
+
+    def __len__(self):
+        return len(self.test_cases)
+
+    def _cases(self, rows):
+        test_cases = self.test_cases
+        return [test_cases[row] for row in rows]
+
+    def suite_of(self, case_index):
+        """
+        Returns the test suite of the test case at an index of test_cases.
+        """
+        return self._suites[self._case_suites[case_index]]
+
+    def slowest(self, n=10):
+        """
+        Returns the n slowest test cases, the slowest first.
+        """
+        start = max(0, len(self._by_time) - n)
+        return self._cases(reversed(self._by_time[start:]))
+
+    def over(self, seconds):
+        """
+        Returns the test cases that took longer than seconds, the slowest first.
+        """
+        start = bisect_right(self._sorted_sec, seconds)
+        return self._cases(reversed(self._by_time[start:]))
+
+    def by_classname(self, classname):
+        """
+        Returns the test cases of a class, in the order of the report.
+        """
+        return self._cases(self._by_classname.get(classname, ()))
+
+    def by_file(self, file):
+        """
+        Returns the test cases of a file, in the order of the report.
+        """
+        return self._cases(self._by_file.get(file, ()))
+
+    def with_status(self, status):
+        """
+        Returns the test cases with a status, one of STATUSES, in the order of the report.
+        """
+        if status not in self._by_status:
+            raise ValueError("unknown status %r, use one of %s" % (status, ", ".join(STATUSES)))
+        return self._cases(self._by_status[status])
+
+    def classnames(self):
+        """
+        Returns the classnames of the test cases.
+        """
+        return list(self._by_classname)
+
+    def counts(self):
+        """
+        Returns the number of test cases of every status.
+        """
+        return dict((status, len(rows)) for status, rows in self._by_status.items())
+
+    def failures_by_classname(self, statuses=("failure", "error")):
+        """
+        Returns {classname: test cases} of the test cases that failed or errored, or have any of statuses.
+        """
+        rows = set()
+        for status in statuses:
+            rows.update(self._by_status[status])
+        grouped = {}
+        for row in sorted(rows):
+            case = self.test_cases[row]
+            grouped.setdefault(case.classname, []).append(case)
+        return grouped
+
+    def flaky_candidates(self):
+        """
+        Returns the (classname, name) of the test cases that are in the report more than once, e.g. rerun, and
+        both passed and failed or errored.
+        """
+        if self._flaky is None:
+            failed = set(self._by_status["failure"]) | set(self._by_status["error"])
+            outcomes = {}
+            for rows, outcome in ((sorted(failed), 1), (self._by_status["passed"], 2)):
+                for row in rows:
+                    case = self.test_cases[row]
+                    key = (case.classname, case.name)
+                    outcomes[key] = outcomes.get(key, 0) | outcome
+            self._flaky = [key for key, outcome in outcomes.items() if outcome == 3]
+        return list(self._flaky)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+Reads JUnit XML reports back into TestSuite and TestCase objects.
+
+The report is parsed incrementally and every element is dropped as soon as it has been turned into a test
+case, so iter_test_cases() processes reports of any size in bounded memory:
+
+    from junit_xml.reader import iter_test_cases
+
+    for suite, case in iter_test_cases("report.xml"):
+        if case.is_failure():
+            print(suite.name, case.name)
+
+Totals in the report (tests, failures, time...) are not read, TestSuite computes them from its test cases.
+Reports compressed with gzip, bz2 or xz are read the same way.
+"""
+import xml.etree.ElementTree as ET
+from io import BytesIO
+
+from junit_xml import TestCase, TestSuite, _ResultInfo, _SkippedInfo
+from junit_xml.compression import decompressed
+
+_SUITE_ATTRIBUTES = ("hostname", "id", "package", "timestamp", "file", "log", "url")
+_CASE_ATTRIBUTES = ("timestamp", "classname", "status", "file", "line", "log", "url")
+
+
+def iter_test_cases(source):
+    """
+    Yields (test suite, test case) for every test case of the report, as it is parsed.
+    The test suite holds the attributes, properties, stdout and stderr of the test case's suite, but not its
+    test cases. Properties, stdout and stderr written after the test cases are only set once those are read.
+    @param source: File name or file object of the report.
+    """
+    for suite, case in _iter_report(source):
+        if case is not None:
+            yield suite, case
+
+
+def iter_test_suites(source):
+    """
+    Yields every test suite of the report with its test cases, as soon as the suite has been parsed.
+    @param source: File name or file object of the report.
+    """
+    for suite, case in _iter_report(source):
+        if case is None:
+            yield suite
+        else:
+            suite.test_cases.append(case)
+
+
+def from_xml_report_file(file_descriptor):
+    """
+    Reads all test suites of a JUnit XML report.
+    @param file_descriptor: File name or file object of the report.
+    @return: list of test suites
+    """
+    return list(iter_test_suites(file_descriptor))
+
+
+def from_xml_report_string(xml_string):
+    """
+    Reads all test suites of a JUnit XML document, which may be compressed bytes.
+    @return: list of test suites
+    """
+    if isinstance(xml_string, str):
+        xml_string = xml_string.encode("utf-8")
+        # a declared encoding would not match the bytes any more
+        if xml_string.startswith(b"<?xml"):
+            end_of_declaration = xml_string.index(b"?>") + 2
+            xml_string = xml_string[end_of_declaration:]
+    return from_xml_report_file(BytesIO(xml_string))
+
+
+def _iter_report(source):
+    """
+    Yields (test suite, test case) for every test case and (test suite, None) at the end of every test suite.
+    Reports compressed with gzip, bz2 or xz are decompressed as they are read.
+    """
+    if hasattr(source, "read"):
+        for event in _iter_report_file(decompressed(source)):
+            yield event
+        return
+    with open(source, "rb") as f:
+        for event in _iter_report_file(decompressed(f)):
+            yield event
+
+
+def _iter_report_file(source):
+    suites = []
+    parents = []
+    case_element = None
+    for event, element in ET.iterparse(source, events=("start", "end")):
+        tag = element.tag
+        if event == "start":
+            if tag == "testsuite":
+                suites.append(_read_test_suite(element))
+            elif tag == "testcase":
+                case_element = element
+            parents.append(element)
+            continue
+
+        parents.pop()
+        if tag == "testcase":
+            yield suites[-1], _read_test_case(element)
+            case_element = None
+        elif tag == "testsuite":
+            yield suites.pop(), None
+        elif case_element is not None or not suites:
+            # part of a test case, read with it, or outside of any test suite
+            continue
+        elif tag == "property":
+            if suites[-1].properties is None:
+                suites[-1].properties = {}
+            suites[-1].properties[element.get("name")] = element.get("value")
+        elif tag == "system-out":
+            suites[-1].stdout = element.text
+        elif tag == "system-err":
+            suites[-1].stderr = element.text
+        else:
+            continue
+
+        # everything read so far has been turned into objects
+        if parents:
+            del parents[-1][:]
+
+
+def _read_test_suite(element):
+    kwargs = dict((key, element.get(key)) for key in _SUITE_ATTRIBUTES if element.get(key) is not None)
+    return TestSuite(element.get("name"), **kwargs)
+
+
+def _number(value, parse):
+    """
+    Returns a number attribute as parse reads it, or None for a missing, empty or unreadable one, which other
+    tools write, e.g. time="" or assertions="2.0".
+    """
+    if not value:
+        return None
+    try:
+        return parse(value)
+    except ValueError:
+        try:
+            return parse(float(value))
+        except (ValueError, OverflowError):
+            return None
+
+
+def _result_message(element):
+    """
+    Returns the message of a failure or error element. One without message and text, e.g.
+    <failure type="AssertionError"/>, takes its type or tag as message, so the test case keeps the result.
+    """
+    message = element.get("message")
+    if message or element.text:
+        return message
+    return element.get("type") or element.tag
+
+
+def _read_test_case(element):
+    kwargs = dict((key, element.get(key)) for key in _CASE_ATTRIBUTES if element.get(key) is not None)
+    elapsed_sec = _number(element.get("time"), float)
+    if elapsed_sec is not None:
+        kwargs["elapsed_sec"] = elapsed_sec
+    assertions = _number(element.get("assertions"), int)
+    if assertions is not None:
+        kwargs["assertions"] = assertions
+    if element.get("class") is not None:
+        kwargs["category"] = element.get("class")
+    case = TestCase(element.get("name"), **kwargs)
+
+    failures, errors, skipped = [], [], []
+    for child in element:
+        if child.tag == "failure":
+            failures.append(_ResultInfo(_result_message(child), child.text, child.get("type")))
+        elif child.tag == "error":
+            errors.append(_ResultInfo(_result_message(child), child.text, child.get("type")))
+        elif child.tag == "skipped":
+            skipped.append(_SkippedInfo(child.get("message"), child.text))
+        elif child.tag == "system-out":
+            case.stdout = child.text
+        elif child.tag == "system-err":
+            case.stderr = child.text
+    # the result lists of a test case are only allocated when it has results
+    if failures:
+        case.failures = failures
+    if errors:
+        case.errors = errors
+    if skipped:
+        case.skipped = skipped
+    if len(failures) > 1 or len(errors) > 1 or len(skipped) > 1:
+        case.allow_multiple_subalements = True
+    element.clear()
+    return case
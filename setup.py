@@ -13,10 +13,10 @@ setup(
     author_email="brian@kyr.us",
     url="https://github.com/kyrus/python-junit-xml",
     license="MIT",
-    packages=find_packages(exclude=["tests"]),
+    packages=find_packages(exclude=["tests", "benchmarks"]),
     description="Creates JUnit XML test result documents that can be read by tools such as Jenkins",
     long_description=read("README.rst"),
-    version="1.9",
+    version="1.10",
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         "Intended Audience :: Developers",
@@ -25,8 +25,17 @@ setup(
         "Operating System :: OS Independent",
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3 :: Only",
+        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
+        "Programming Language :: Python :: 3.12",
         "Topic :: Software Development :: Build Tools",
         "Topic :: Software Development :: Testing",
     ],
-    install_requires=["six"],
+    python_requires=">=3.8",
+    entry_points={
+        "console_scripts": ["junit-xml-merge = junit_xml.merge:main", "junit-xml-diff = junit_xml.diff:main"]
+    },
 )
@@ -1,4 +1,30 @@
-def verify_test_case(  # noqa: E302
+# -*- coding: UTF-8 -*-
+import io
+
+from junit_xml import TestCase as Case
+from junit_xml import TestSuite as Suite
+from junit_xml import to_xml_report_file
+
+
+def make_suite(name, cases=2, classname=None, failing_every=None):
+    """a suite of passed cases, the first one failed, and every failing_every-th one after it"""
+    test_cases = []
+    for c in range(cases):
+        case = Case("Test%d" % c, classname, 0.5, stdout=u"I am stdout! ä")
+        if c == 0 or (failing_every and c % failing_every == 0):
+            case.add_failure_info("failure message", "I failed!")
+        test_cases.append(case)
+    return Suite(name, test_cases, hostname="localhost")
+
+
+def report(test_suites, **kwargs):
+    """the report of test_suites, as written to a binary file"""
+    f = io.BytesIO()
+    to_xml_report_file(f, test_suites, **kwargs)
+    return f.getvalue()
+
+
+def verify_test_case(
     test_case_element,
     expected_attributes,
     error_message=None,
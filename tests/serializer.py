@@ -3,8 +3,6 @@ import os
 import tempfile
 from xml.dom import minidom
 
-from six import PY2
-
 from junit_xml import to_xml_report_file, to_xml_report_string
 
 
@@ -26,8 +24,7 @@ def serialize_and_read(test_suites, to_file=False, prettyprint=False, encoding=N
         os.remove(filename)
     else:
         xml_string = to_xml_report_string(test_suites, prettyprint=prettyprint, encoding=encoding)
-        if PY2:
-            assert isinstance(xml_string, unicode)  # noqa: F821
+        assert isinstance(xml_string, str)
         print("Serialized XML to string:\n%s" % xml_string)
         if encoding:
             xml_string = xml_string.encode(encoding)
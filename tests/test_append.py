@@ -0,0 +1,124 @@
+# -*- coding: UTF-8 -*-
+import gzip
+import io
+import re
+
+import pytest
+
+from junit_xml.append import _HEAD_SIZE, _ROOT_PADDING, _TAIL_SIZE, append_to_xml_report_file
+from junit_xml.reader import from_xml_report_file
+
+from .asserts import make_suite, report
+
+
+def unpadded(xml):
+    """the report without the padding of its testsuites start tag"""
+    return re.sub(b" +>", b">", xml, count=1)
+
+
+class CountingFile(io.BytesIO):
+    """counts the bytes read"""
+
+    read_bytes = 0
+
+    def read(self, size=-1):
+        data = io.BytesIO.read(self, size)
+        self.read_bytes += len(data)
+        return data
+
+
+@pytest.mark.parametrize("prettyprint", [True, False])
+@pytest.mark.parametrize("encoding", [None, "utf-8", "latin-1"])
+def test_append_to_new_report(tmp_path, prettyprint, encoding):
+    path = str(tmp_path / "report.xml")
+    suites = [make_suite("suite1"), make_suite("suite2", 3), make_suite("suite3", 1)]
+    append_to_xml_report_file(path, suites[:1], prettyprint=prettyprint, encoding=encoding)
+    append_to_xml_report_file(path, suites[1:], prettyprint=prettyprint, encoding=encoding)
+    with open(path, "rb") as f:
+        xml = f.read()
+    assert unpadded(xml) == report(suites, prettyprint=prettyprint, encoding=encoding)
+    assert [ts.name for ts in from_xml_report_file(path)] == ["suite1", "suite2", "suite3"]
+
+
+@pytest.mark.parametrize("prettyprint", [True, False])
+def test_append_to_written_report(prettyprint):
+    suites = [make_suite("suite1"), make_suite("suite2")]
+    f = io.BytesIO(report(suites[:1], prettyprint=prettyprint))
+    append_to_xml_report_file(f, suites[1:], prettyprint=prettyprint)
+    assert unpadded(f.getvalue()) == report(suites, prettyprint=prettyprint)
+
+
+@pytest.mark.parametrize("prettyprint", [True, False])
+def test_append_to_empty_report(prettyprint):
+    suites = [make_suite("suite1")]
+    f = io.BytesIO(report([], prettyprint=prettyprint))
+    append_to_xml_report_file(f, suites, prettyprint=prettyprint)
+    assert unpadded(f.getvalue()) == report(suites, prettyprint=prettyprint)
+
+
+def test_append_pads_written_report_once():
+    f = io.BytesIO(report([make_suite("suite1", 8)]))
+    # the new totals fit the start tag, which is padded all the same
+    append_to_xml_report_file(f, [make_suite("suite2", 1)])
+    before = f.getvalue()
+    root_end = before.index(b">", before.index(b"<testsuites")) + 1
+    assert b'tests="9"' in before[:root_end]
+    assert before[:root_end].endswith(b" " * _ROOT_PADDING + b">")
+
+    # so totals that grow by a digit are rewritten in place
+    append_to_xml_report_file(f, [make_suite("suite3", 1)])
+    after = f.getvalue()
+    assert b'tests="10"' in after[:root_end]
+    assert after[root_end:len(before) - len(b"</testsuites>\n")] == before[root_end:-len(b"</testsuites>\n")]
+
+
+def test_append_nothing():
+    xml = report([make_suite("suite1")])
+    f = io.BytesIO(xml)
+    append_to_xml_report_file(f, [])
+    assert f.getvalue() == xml
+
+
+def test_append_reads_start_and_end_only():
+    f = CountingFile()
+    append_to_xml_report_file(f, [make_suite("suite%d" % s, 100) for s in range(20)])
+    assert len(f.getvalue()) > 2 * (_HEAD_SIZE + _TAIL_SIZE)
+    before = f.getvalue()
+    root_end = before.index(b">", before.index(b"<testsuites")) + 1
+    body_end = len(before) - len(b"</testsuites>\n")
+
+    f.read_bytes = 0
+    append_to_xml_report_file(f, [make_suite("suite20")])
+    assert f.read_bytes <= _HEAD_SIZE + _TAIL_SIZE
+    # the totals are rewritten in place, the test suites already written are left as they are
+    after = f.getvalue()
+    assert b'tests="2002"' in after[:root_end]
+    assert after[root_end:body_end] == before[root_end:body_end]
+    test_suites = from_xml_report_file(io.BytesIO(after))
+    assert [ts.name for ts in test_suites][-2:] == ["suite19", "suite20"]
+
+
+def test_append_counts_totals_of_report_without_them():
+    xml = b'<?xml version="1.0" ?>\n<testsuites>\n'
+    xml += b'\t<testsuite name="other" tests="3" failures="1" errors="1" time="2.5">\n\t</testsuite>\n</testsuites>\n'
+    f = io.BytesIO(xml)
+    append_to_xml_report_file(f, [make_suite("suite1")])
+    assert b'<testsuites disabled="0" errors="1" failures="2" tests="5" time="3.5"' in f.getvalue()
+    assert from_xml_report_file(io.BytesIO(f.getvalue()))[1].name == "suite1"
+
+
+def test_append_errors():
+    with pytest.raises(ValueError, match="binary mode"):
+        append_to_xml_report_file(io.StringIO(), [make_suite("suite1")])
+
+    compressed = io.BytesIO()
+    with gzip.GzipFile(fileobj=compressed, mode="wb") as f:
+        f.write(report([make_suite("suite1")]))
+    with pytest.raises(ValueError, match="compressed"):
+        append_to_xml_report_file(io.BytesIO(compressed.getvalue()), [make_suite("suite2")])
+
+    with pytest.raises(ValueError, match="does not end"):
+        append_to_xml_report_file(io.BytesIO(report([make_suite("suite1")])[:-20]), [make_suite("suite2")])
+
+    with pytest.raises(ValueError, match="encoded in latin-1"):
+        append_to_xml_report_file(io.BytesIO(report([make_suite("suite1")], encoding="latin-1")), [make_suite("s")])
@@ -0,0 +1,82 @@
+# -*- coding: UTF-8 -*-
+import threading
+from io import StringIO
+
+import pytest
+
+from junit_xml import TestCase as Case
+from junit_xml import TestSuite as Suite
+from junit_xml import to_xml_report_string
+from junit_xml.background import BackgroundReportWriter
+
+
+def test_same_as_report_string():
+    failed = Case("Failed", elapsed_sec=1.5)
+    failed.add_failure_info("failure message", "I failed!")
+    test_suites = [Suite("suite1", [Case("Test1"), failed], hostname="localhost"), Suite("suite2")]
+
+    f = StringIO()
+    with BackgroundReportWriter(f, max_queue_size=1) as writer:
+        suite = writer.begin_suite("suite1", hostname="localhost")
+        writer.write_test_case(Case("Test1"))
+        writer.write_test_case(failed)
+        writer.end_suite()
+        writer.write_test_suite(Suite("suite2"))
+        writer.flush()
+        assert suite.name == "suite1"
+        assert f.getvalue() == ""
+    assert f.getvalue() == to_xml_report_string(test_suites)
+
+
+def test_write_from_threads():
+    f = StringIO()
+    writer = BackgroundReportWriter(f, prettyprint=False, max_queue_size=4)
+    writer.begin_suite("suite1")
+
+    def run(thread):
+        for i in range(50):
+            writer.write_test_case(Case("Test%d-%d" % (thread, i), elapsed_sec=1.0))
+
+    threads = [threading.Thread(target=run, args=(thread,)) for thread in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+
+    xml_string = f.getvalue()
+    assert 'tests="200"' in xml_string
+    assert 'time="200.0"' in xml_string
+    assert xml_string.count("<testcase ") == 200
+
+
+def test_error_raised_in_calling_thread():
+    f = StringIO()
+    writer = BackgroundReportWriter(f)
+    writer.write_test_case(Case("Test1"))
+    with pytest.raises(ValueError) as excinfo:
+        writer.flush()
+    assert str(excinfo.value) == "no test suite has been begun"
+
+    # the error is raised again by every later call, and no report is written
+    for call in (lambda: writer.begin_suite("suite1"), writer.end_suite, writer.flush, writer.close, writer.close):
+        with pytest.raises(ValueError, match="no test suite has been begun"):
+            call()
+    assert f.getvalue() == ""
+
+
+def test_closed():
+    writer = BackgroundReportWriter(StringIO())
+    writer.close()
+    with pytest.raises(ValueError) as excinfo:
+        writer.begin_suite("suite1")
+    assert str(excinfo.value) == "writer is closed"
+
+
+def test_exception_discards_report():
+    f = StringIO()
+    with pytest.raises(RuntimeError):
+        with BackgroundReportWriter(f) as writer:
+            writer.begin_suite("suite1")
+            raise RuntimeError("test run failed")
+    assert f.getvalue() == ""
@@ -0,0 +1,91 @@
+# -*- coding: UTF-8 -*-
+import io
+import multiprocessing
+import os
+import signal
+import socket
+
+import pytest
+
+from junit_xml import TestCase as Case
+from junit_xml import TestSuite as Suite
+from junit_xml.reader import from_xml_report_file
+
+from .asserts import make_suite, report
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix domain sockets")
+
+if hasattr(socket, "AF_UNIX"):
+    from junit_xml.collector import CollectorClient, ReportCollector
+
+
+def make_worker_suite(worker, cases=50):
+    name = "worker%d" % worker
+    return make_suite(name, cases, classname=name, failing_every=10)
+
+
+def send_suite(address, worker):
+    with CollectorClient(address) as client:
+        client.write_test_suite(make_worker_suite(worker))
+
+
+def send_and_die(address):
+    client = CollectorClient(address)
+    client.begin_suite("dying")
+    client.write_test_case(Case("Test1"))
+    client.write_test_case(Case("Test2"))
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def test_one_client():
+    f = io.BytesIO()
+    with ReportCollector(f, prettyprint=False) as collector:
+        with CollectorClient(collector.address) as client:
+            suite = client.begin_suite("worker0", hostname="localhost")
+            for case in make_worker_suite(0).test_cases:
+                client.write_test_case(case)
+            suite.stdout = "suite stdout"
+            client.end_suite()
+            client.write_test_suite(make_worker_suite(1))
+    expected = make_worker_suite(0)
+    expected.stdout = "suite stdout"
+    assert f.getvalue() == report([expected, make_worker_suite(1)], prettyprint=False)
+    assert not os.path.exists(collector.address)
+
+
+def test_worker_processes():
+    context = multiprocessing.get_context("fork")
+    f = io.BytesIO()
+    with ReportCollector(f) as collector:
+        workers = [context.Process(target=send_suite, args=(collector.address, w)) for w in range(8)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    test_suites = from_xml_report_file(io.BytesIO(f.getvalue()))
+    assert sorted(ts.name for ts in test_suites) == ["worker%d" % w for w in range(8)]
+    assert sum(ts.tests for ts in test_suites) == 400
+    assert sum(ts.failures for ts in test_suites) == 40
+    for ts in test_suites:
+        assert report([ts]) == report([make_worker_suite(int(ts.name[len("worker"):]))])
+
+
+def test_worker_killed():
+    context = multiprocessing.get_context("fork")
+    f = io.BytesIO()
+    with ReportCollector(f) as collector:
+        worker = context.Process(target=send_and_die, args=(collector.address,))
+        worker.start()
+        worker.join()
+        assert worker.exitcode == -signal.SIGKILL
+    assert f.getvalue() == report([Suite("dying", [Case("Test1"), Case("Test2")])])
+
+
+def test_address(tmp_path):
+    address = str(tmp_path / "collector.sock")
+    f = io.BytesIO()
+    with ReportCollector(f, address=address) as collector:
+        assert collector.address == address
+        send_suite(address, 0)
+    assert f.getvalue() == report([make_worker_suite(0)])
+    assert not os.path.exists(address)
@@ -0,0 +1,110 @@
+# -*- coding: UTF-8 -*-
+from io import StringIO
+
+import pytest
+
+from junit_xml import JUnitXMLWriter
+from junit_xml import TestCase as Case
+from junit_xml import TestSuite as Suite
+from junit_xml import to_xml_report_string
+from junit_xml import columnar
+from junit_xml.columnar import ColumnarTestSuite
+
+
+def make_test_cases():
+    cases = []
+    for i in range(20):
+        case = Case("Test%d" % i, classname="some.class%d" % (i % 3), elapsed_sec=0.1 * i, file="test_file.py")
+        if i % 4 == 1:
+            case.add_failure_info("failure message", "I failed!")
+        if i % 5 == 2:
+            case.add_error_info("error message")
+        if i % 6 == 3:
+            case.add_skipped_info("skipped message")
+            case.is_enabled = False
+        if i % 7 == 4:
+            case.stdout = "I am stdout!"
+            case.assertions = i
+        cases.append(case)
+    return cases
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "no-numpy"])
+def numpy(request, monkeypatch):
+    if request.param:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(columnar, "numpy", None)
+
+
+@pytest.mark.usefixtures("numpy")
+def test_totals():
+    suite = Suite("test", make_test_cases())
+    columnar_suite = ColumnarTestSuite("test", make_test_cases())
+    for total in ["tests", "failures", "errors", "skipped", "disabled", "assertions", "time"]:
+        assert getattr(columnar_suite, total) == getattr(suite, total)
+
+
+def test_totals_no_test_cases():
+    suite = ColumnarTestSuite("test")
+    assert (suite.tests, suite.failures, suite.assertions, suite.time) == (0, 0, None, 0)
+
+
+@pytest.mark.parametrize("prettyprint", [True, False])
+def test_same_markup_as_test_suite(prettyprint):
+    expected = to_xml_report_string([Suite("test", make_test_cases(), properties={"foo": "bar"})], prettyprint)
+    columnar_suite = ColumnarTestSuite("test", properties={"foo": "bar"})
+    columnar_suite.test_cases.extend(make_test_cases())
+    assert to_xml_report_string([columnar_suite], prettyprint) == expected
+
+    f = StringIO()
+    with JUnitXMLWriter(f, prettyprint=prettyprint) as writer:
+        writer.write_test_suite(columnar_suite)
+    assert f.getvalue() == expected
+
+
+def test_append_updates_totals():
+    suite = ColumnarTestSuite("test", [Case("Test1")])
+    assert suite.failures == 0
+    case = Case("Test2", elapsed_sec=2.5)
+    case.add_failure_info("failure message")
+    suite.test_cases.append(case)
+    assert (suite.tests, suite.failures, suite.time) == (2, 1, 2.5)
+    # the suite keeps copies of the results
+    case.failures[0]["message"] = "changed"
+    assert suite.test_cases[1].failures[0]["message"] == "failure message"
+
+
+@pytest.mark.parametrize("times", [[2, 3], [2, 0.5], [0.1, 0.2]])
+def test_time_as_test_suite(times):
+    cases = [Case("Test%d" % i, elapsed_sec=elapsed_sec) for i, elapsed_sec in enumerate(times)]
+    suite = ColumnarTestSuite("test", cases)
+    assert repr(suite.time) == repr(Suite("test", cases).time)
+    assert to_xml_report_string([suite]) == to_xml_report_string([Suite("test", cases)])
+    assert suite.test_cases[0].elapsed_sec == times[0]
+
+
+def test_views():
+    suite = ColumnarTestSuite("test", make_test_cases())
+    assert len(suite.test_cases) == 20
+    view = suite.test_cases[1]
+    assert view.name == "Test1"
+    assert view.classname == "some.class1"
+    assert view.failures[0]["message"] == "failure message"
+    assert suite.test_cases[-1].name == "Test19"
+    assert [case.name for case in suite.test_cases[2:4]] == ["Test2", "Test3"]
+    assert not suite.test_cases[3].is_enabled
+    with pytest.raises(IndexError):
+        suite.test_cases[20]
+
+    # views are copies
+    view.add_error_info("error message")
+    assert not suite.test_cases[1].is_error()
+    view.failures[0]["message"] = "changed"
+    assert suite.test_cases[1].failures[0]["message"] == "failure message"
+
+
+def test_strings_interned():
+    suite = ColumnarTestSuite("test", make_test_cases())
+    assert suite.test_cases.classnames.values == [None, "some.class0", "some.class1", "some.class2"]
+    assert suite.test_cases.files.values == [None, "test_file.py"]
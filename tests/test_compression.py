@@ -0,0 +1,127 @@
+# -*- coding: UTF-8 -*-
+import gzip
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+import pytest
+
+from junit_xml import JUnitXMLWriter
+from junit_xml import TestCase as Case
+from junit_xml import TestSuite as Suite
+from junit_xml import decode, to_xml_report_file, to_xml_report_string
+from junit_xml.background import BackgroundReportWriter
+from junit_xml.compression import CompressedFile, decompressed, detect_compression
+from junit_xml.merge import main
+from junit_xml.reader import from_xml_report_file, from_xml_report_string
+
+compressions = ["gzip", "bz2"]
+try:
+    import lzma  # noqa: F401
+
+    compressions.append("xz")
+except ImportError:  # pragma: nocover
+    pass
+
+
+def make_suites():
+    failed = Case(decode("Failed äöü", "utf-8"), elapsed_sec=1.5, stdout="I am stdout!\n" * 1000)
+    failed.add_failure_info("failure message", "I failed!")
+    return [Suite("suite1", [Case("Test1"), failed], hostname="localhost"), Suite("suite2")]
+
+
+def uncompressed(data):
+    return decompressed(BytesIO(data)).read()
+
+
+@pytest.mark.parametrize("compression", compressions)
+@pytest.mark.parametrize("compresslevel", [None, 1])
+def test_to_xml_report_file(compression, compresslevel):
+    f = BytesIO()
+    to_xml_report_file(f, make_suites(), compression=compression, compresslevel=compresslevel)
+    expected = to_xml_report_string(make_suites()).encode("utf-8")
+    assert detect_compression(BytesIO(f.getvalue())) == compression
+    assert len(f.getvalue()) < len(expected)
+    assert uncompressed(f.getvalue()) == expected
+
+
+@pytest.mark.parametrize("compression", compressions)
+def test_writers(compression):
+    expected = to_xml_report_string(make_suites(), encoding="latin-1").encode("latin-1")
+    f = BytesIO()
+    with JUnitXMLWriter(f, encoding="latin-1", compression=compression) as writer:
+        for suite in make_suites():
+            writer.write_test_suite(suite)
+    assert uncompressed(f.getvalue()) == expected
+
+    f = BytesIO()
+    with BackgroundReportWriter(f, encoding="latin-1", compression=compression) as writer:
+        for suite in make_suites():
+            writer.write_test_suite(suite)
+    assert uncompressed(f.getvalue()) == expected
+
+
+def test_gzip_module_reads_report():
+    f = BytesIO()
+    to_xml_report_file(f, make_suites(), compression="gzip")
+    assert gzip.GzipFile(fileobj=BytesIO(f.getvalue())).read() == to_xml_report_string(make_suites()).encode("utf-8")
+
+
+def test_exception_writes_nothing():
+    f = BytesIO()
+    with pytest.raises(RuntimeError):
+        with JUnitXMLWriter(f, compression="gzip") as writer:
+            writer.begin_suite("suite1")
+            raise RuntimeError("test run failed")
+    del writer
+    assert f.getvalue() == b""
+
+
+def test_text_file():
+    with pytest.raises(ValueError):
+        to_xml_report_file(StringIO(), make_suites(), compression="gzip")
+
+
+def test_unknown_compression():
+    with pytest.raises(ValueError):
+        CompressedFile(BytesIO(), "zip")
+
+
+@pytest.mark.parametrize("compression", compressions)
+def test_read(compression):
+    f = BytesIO()
+    to_xml_report_file(f, make_suites(), compression=compression)
+    expected = from_xml_report_string(to_xml_report_string(make_suites()))
+
+    suites = from_xml_report_string(f.getvalue())
+    assert [len(suite.test_cases) for suite in suites] == [2, 0]
+    assert to_xml_report_string(suites) == to_xml_report_string(expected)
+
+    # a file that can neither seek nor peek
+    class Stream(object):
+        def __init__(self, data):
+            self.data = BytesIO(data)
+
+        def read(self, size=-1):
+            return self.data.read(size)
+
+    suites = from_xml_report_file(Stream(f.getvalue()))
+    assert to_xml_report_string(suites) == to_xml_report_string(expected)
+
+
+def test_merge_main():
+    directory = tempfile.mkdtemp()
+    try:
+        inputs = []
+        for i, compression in enumerate(compressions):
+            inputs.append(os.path.join(directory, "shard-%d.xml" % i))
+            with open(inputs[-1], "wb") as f:
+                to_xml_report_file(f, make_suites(), compression=compression)
+        output = os.path.join(directory, "merged.xml.gz")
+
+        main(["-o", output, "--compression", "gzip"] + inputs)
+        suites = from_xml_report_file(output)
+    finally:
+        shutil.rmtree(directory)
+    assert [suite.name for suite in suites] == ["suite1", "suite2"] * len(compressions)
@@ -0,0 +1,96 @@
+# -*- coding: UTF-8 -*-
+import pickle
+import threading
+
+import pytest
+
+from junit_xml import TestCase as Case
+from junit_xml import TestSuite as Suite
+from junit_xml import to_xml_report_string
+from junit_xml.concurrent import ConcurrentTestSuite
+
+
+def run_threads(suite, threads=8, cases=500):
+    """adds test cases from several threads, failing every tenth after it was added"""
+    barrier = threading.Barrier(threads)
+
+    def run(thread):
+        barrier.wait()
+        for c in range(cases):
+            case = Case("Test%d" % c, "thread%d" % thread, 0.001 * (c % 7), timestamp=float(c * threads + thread))
+            suite.test_cases.append(case)
+            if c % 10 == 0:
+                case.add_failure_info("failure message")
+            if c % 50 == 0:
+                case.add_skipped_info("skipped")
+
+    workers = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def test_totals_under_concurrency():
+    suite = ConcurrentTestSuite("concurrent", hostname="localhost")
+    run_threads(suite)
+    assert len(suite.test_cases) == suite.tests == 4000
+    assert suite.failures == 400
+    assert suite.skipped == 80
+    cases = list(suite.test_cases)
+    assert suite.time == pytest.approx(sum(c.elapsed_sec for c in cases if c.elapsed_sec))
+    # the report is the one of a TestSuite of the merged test cases
+    expected = Suite("concurrent", cases, hostname="localhost")
+    assert to_xml_report_string([suite]) == to_xml_report_string([expected])
+
+
+def test_totals_without_merging(monkeypatch):
+    suite = ConcurrentTestSuite("concurrent")
+    run_threads(suite, threads=4, cases=100)
+    expected = sum(c.elapsed_sec for c in suite.test_cases if c.elapsed_sec)
+    monkeypatch.setattr(suite.test_cases, "_merged", None)
+    assert (suite.tests, suite.failures, suite.time) == (400, 40, pytest.approx(expected))
+
+
+def test_recount():
+    suite = ConcurrentTestSuite("concurrent")
+    run_threads(suite, threads=4, cases=100)
+    for case in suite.test_cases:
+        del case.failures[:]
+    suite.recount()
+    assert (suite.tests, suite.failures, suite.skipped) == (400, 0, 8)
+
+
+def test_sequence_order():
+    suite = ConcurrentTestSuite("concurrent")
+    run_threads(suite, threads=4, cases=100)
+    per_thread = {}
+    for case in suite.test_cases:
+        per_thread.setdefault(case.classname, []).append(case.name)
+    # every thread's test cases stay in the order it added them
+    assert all(names == ["Test%d" % c for c in range(100)] for names in per_thread.values())
+
+
+def test_start_order():
+    suite = ConcurrentTestSuite("concurrent", order="start")
+    run_threads(suite, threads=4, cases=100)
+    suite.test_cases.append(Case("no timestamp"))
+    timestamps = [case.timestamp for case in suite.test_cases]
+    assert timestamps == [float(t) for t in range(400)] + [None]
+
+
+def test_single_thread():
+    cases = [Case("Test1", elapsed_sec=1.5, assertions=2), Case("Test2")]
+    cases[1].add_error_info("error")
+    suite = ConcurrentTestSuite("suite", cases, "localhost", order="sequence")
+    suite.test_cases += [Case("Test3")]
+    assert suite.hostname == "localhost"
+    assert [c.name for c in suite.test_cases] == ["Test1", "Test2", "Test3"]
+    assert suite.test_cases[1].name == "Test2"
+    assert (suite.tests, suite.errors, suite.assertions, suite.time) == (3, 1, 2, 1.5)
+    expected = Suite("suite", [Case("Test1", elapsed_sec=1.5, assertions=2), cases[1], Case("Test3")], "localhost")
+    assert to_xml_report_string([suite]) == to_xml_report_string([expected])
+    assert to_xml_report_string([pickle.loads(pickle.dumps(suite))]) == to_xml_report_string([expected])
+
+    with pytest.raises(ValueError, match="unknown order"):
+        ConcurrentTestSuite("suite", order="name")
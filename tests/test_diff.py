@@ -0,0 +1,166 @@
+# -*- coding: UTF-8 -*-
+import gzip
+import io
+
+import pytest
+
+from junit_xml import TestCase as Case
+from junit_xml import TestSuite as Suite
+from junit_xml.diff import diff_reports, main
+
+from .asserts import report
+
+
+def case(name, elapsed_sec=1.0, status="passed", classname="some.class"):
+    test_case = Case(name, classname, elapsed_sec)
+    if status == "failure":
+        test_case.add_failure_info("failure message")
+    elif status == "error":
+        test_case.add_error_info("error message")
+    elif status == "skipped":
+        test_case.add_skipped_info("skipped message")
+    return test_case
+
+
+def baseline_suites():
+    return [
+        Suite("suite1", [case("Test1"), case("Test2"), case("Test3", status="failure"), case("Test4", 0.01)]),
+        Suite("suite2", [case("Test1", 2.0), case("Gone", status="skipped"), case("Test5", 0.05)]),
+    ]
+
+
+def current_suites():
+    return [
+        Suite(
+            "suite1",
+            [case("Test1", 2.5), case("Test2", status="error"), case("Test3"), case("Test4", 0.05)],
+        ),
+        Suite("suite2", [case("Test1", 0.5), case("Test5", 0.2), case("New", status="failure")]),
+        Suite("suite3", [case("Test1", classname=None)]),
+    ]
+
+
+def report_file(suites):
+    return io.BytesIO(report(suites, encoding="utf-8"))
+
+
+def compressed_report(tmp_path, suites):
+    path = str(tmp_path / "report.xml.gz")
+    with gzip.open(path, "wb") as f:
+        f.write(report(suites, encoding="utf-8"))
+    return path
+
+
+@pytest.mark.parametrize("form", ["suites", "report", "compressed"])
+def test_diff(tmp_path, form):
+    if form == "suites":
+        baseline, current = baseline_suites(), current_suites()
+    elif form == "report":
+        baseline, current = report_file(baseline_suites()), report_file(current_suites())
+    else:
+        baseline, current = compressed_report(tmp_path, baseline_suites()), report_file(current_suites())
+    diff = diff_reports(baseline, current)
+
+    assert diff.compared == 6
+    assert diff.added == [(("suite2", "some.class", "New"), "failure"), (("suite3", None, "Test1"), "passed")]
+    assert diff.removed == [(("suite2", "some.class", "Gone"), "skipped")]
+    assert diff.transitions == [
+        (("suite1", "some.class", "Test2"), "passed", "error"),
+        (("suite1", "some.class", "Test3"), "failure", "passed"),
+    ]
+    assert diff.slower == [
+        (("suite1", "some.class", "Test4"), 5.0, 0.01, 0.05),
+        (("suite2", "some.class", "Test5"), 4.0, 0.05, 0.2),
+        (("suite1", "some.class", "Test1"), 2.5, 1.0, 2.5),
+    ]
+    assert diff.faster == [(("suite2", "some.class", "Test1"), 0.25, 2.0, 0.5)]
+    assert diff.new_failures() == [("suite1", "some.class", "Test2"), ("suite2", "some.class", "New")]
+    assert diff.fixed() == [("suite1", "some.class", "Test3")]
+    assert diff.transition_counts() == {("passed", "error"): 1, ("failure", "passed"): 1}
+
+
+def test_times():
+    diff = diff_reports(baseline_suites(), current_suites(), max_ratio=3.0, min_time=0.1)
+    assert [key for key, _, _, _ in diff.slower] == [("suite2", "some.class", "Test5")]
+    assert [key for key, _, _, _ in diff.faster] == [("suite2", "some.class", "Test1")]
+
+    diff = diff_reports(baseline_suites(), current_suites(), max_ratio=None)
+    assert diff.slower == diff.faster == []
+    assert len(diff.transitions) == 2
+
+    with pytest.raises(ValueError):
+        diff_reports(baseline_suites(), current_suites(), max_ratio=1.0)
+
+
+def test_times_without_baseline_time(tmp_path):
+    # a test case without a time reads as taking none, whatever it takes now is not a slowdown
+    untimed = Case("Test1", "some.class")
+    baseline = [Suite("suite1", [untimed, case("Test2", 0.0)])]
+    current = [Suite("suite1", [case("Test1", 0.001), case("Test2", 0.5)])]
+    assert diff_reports(baseline, current).slower == []
+    assert diff_reports(report_file(baseline), report_file(current)).slower == []
+
+    paths = []
+    for name, suites in (("baseline.xml", baseline), ("report.xml", current)):
+        paths.append(str(tmp_path / name))
+        with io.open(paths[-1], "wb") as f:
+            f.write(report(suites, encoding="utf-8"))
+    assert main(paths + ["--max-ratio", "2"]) == 0
+
+
+def test_status_precedence_and_repeats():
+    failed_and_errored = case("Test1", status="failure")
+    failed_and_errored.add_error_info("error message")
+    # the baseline ran Test1 twice, the current report runs Test2 twice
+    baseline = [Suite("suite1", [case("Test1", status="failure"), case("Test1"), case("Test2")])]
+    current = [Suite("suite1", [failed_and_errored, case("Test2", status="skipped"), case("Test2")])]
+
+    diff = diff_reports(baseline, current)
+    assert diff.compared == 3
+    assert diff.transitions == [
+        (("suite1", "some.class", "Test1"), "passed", "error"),
+        (("suite1", "some.class", "Test2"), "passed", "skipped"),
+    ]
+    assert diff_reports(report_file(baseline), report_file(current)).transitions[0][2] == "error"
+
+
+def test_results_without_message_or_output():
+    errored, failed = Case("Test1", "some.class", 1.0), Case("Test2", "some.class", 1.0)
+    errored.add_error_info()
+    failed.add_failure_info(failure_type="AssertionError")
+    disabled = case("Test3")
+    disabled.is_enabled = False
+    current = [Suite("suite1", [errored, failed, disabled])]
+    baseline_cases = [case("Test1", status="failure"), case("Test2", status="error"), case("Test3", status="skipped")]
+    baseline = [Suite("suite1", baseline_cases)]
+
+    # they are not written to a report, nor is a test case being disabled, so they pass, from test suites as from
+    # their report
+    expected = [
+        (("suite1", "some.class", "Test1"), "failure", "passed"),
+        (("suite1", "some.class", "Test2"), "error", "passed"),
+        (("suite1", "some.class", "Test3"), "skipped", "passed"),
+    ]
+    assert diff_reports(baseline, current).transitions == expected
+    assert diff_reports(report_file(baseline), report_file(current)).transitions == expected
+
+
+def test_main(tmp_path, capsys):
+    paths = []
+    for name, suites in (("baseline.xml", baseline_suites()), ("report.xml", current_suites())):
+        paths.append(str(tmp_path / name))
+        with io.open(paths[-1], "wb") as f:
+            f.write(report(suites, encoding="utf-8"))
+
+    assert main(paths) == 1
+    out = capsys.readouterr().out
+    assert out.splitlines() == [
+        "6 compared, 2 added, 1 removed, 2 changed status, 2 new failures",
+        "new failure  suite1: some.class.Test2",
+        "new failure  suite2: some.class.New",
+    ]
+
+    assert main(paths + ["--allow-new-failures"]) == 0
+    assert main(paths + ["--allow-new-failures", "--max-ratio", "3", "--min-time", "0.1"]) == 1
+    assert "4.0x slower  suite2: some.class.Test5 (0.050s -> 0.200s)" in capsys.readouterr().out
+    assert main([paths[0], paths[0], "--max-ratio", "2", "-v"]) == 0
@@ -0,0 +1,60 @@
+# -*- coding: UTF-8 -*-
+import os
+import subprocess
+import sys
+
+import pytest
+
+from junit_xml import TestCase as Case
+from junit_xml import TestSuite as Suite
+from junit_xml import to_xml_report_string
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# imported when a report is written, not when junit_xml is
+DEFERRED = ["functools", "re", "six", "tempfile", "warnings", "xml.etree.ElementTree"]
+
+
+def imported_modules(code):
+    """the modules imported by code, run in a fresh interpreter that imports nothing at startup"""
+    script = "import sys\nbefore = set(sys.modules)\n%s\nprint(' '.join(set(sys.modules) - before))" % code
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.check_output([sys.executable, "-S", "-c", script], env=env)
+    return set(output.decode().split())
+
+
+def test_import_defers_modules():
+    imported = imported_modules("import junit_xml")
+    assert "junit_xml" in imported
+    assert sorted(imported.intersection(DEFERRED)) == []
+
+
+def test_modules_imported_on_first_use():
+    imported = imported_modules("import junit_xml\njunit_xml.TestSuite('suite').build_xml_doc()")
+    assert "xml.etree.ElementTree" in imported
+
+    imported = imported_modules("import junit_xml\njunit_xml.to_xml_report_string([junit_xml.TestSuite('\\a')])")
+    assert "re" in imported
+    assert "xml.etree.ElementTree" not in imported
+
+
+def test_clean_illegal_characters_after_lazy_import():
+    case = Case("Test1", stdout=u"ascii \x07bell, unicode ￾ and \x1b[0m")
+    xml_string = to_xml_report_string([Suite("suite", [case])], prettyprint=False)
+    assert u"ascii bell, unicode  and [0m" in xml_string
+
+
+def test_deprecated_six_names():
+    import junit_xml
+
+    with pytest.warns(DeprecationWarning):
+        iteritems = junit_xml.iteritems
+    assert sorted(iteritems({"a": 1, "b": 2})) == [("a", 1), ("b", 2)]
+    with pytest.warns(DeprecationWarning):
+        assert junit_xml.u("text") == "text"
+    with pytest.warns(DeprecationWarning):
+        assert junit_xml.PY2 is False
+    with pytest.warns(DeprecationWarning):
+        assert junit_xml.unichr(0xE4) == u"ä"
+    with pytest.raises(AttributeError):
+        junit_xml.itervalues
@@ -0,0 +1,151 @@
+# -*- coding: UTF-8 -*-
+import io
+import os
+import signal
+import subprocess
+import sys
+
+import pytest
+
+import junit_xml.journal
+from junit_xml import TestCase as Case
+from junit_xml import TestSuite as Suite
+from junit_xml.journal import ResultJournal, iter_journal, materialize_journal
+
+from .asserts import report
+
+
+def make_suites(tmp_path):
+    log = tmp_path / "test2.log"
+    log.write_bytes(b"line one\r\nline two\n")
+    failed = Case("Test2", "some.class.name", 1.5, stdout=log, stderr=u"I am stderr! \x07日本")
+    failed.add_failure_info("failure message", "I failed!", "AssertionError")
+    failed.add_error_info(output="and errored")
+    skipped = Case("Test3", allow_multiple_subelements=True, line=42, assertions=3)
+    skipped.add_skipped_info("first")
+    skipped.add_skipped_info("second", "output")
+    disabled = Case("Test4", status="disabled")
+    disabled.is_enabled = False
+    return [
+        Suite("suite1", [Case("Test1", elapsed_sec=0.25), failed], hostname="localhost", properties={"a": "1"}),
+        Suite("suite2", [skipped, disabled], stdout="suite stdout", timestamp="2024-01-01T00:00:00"),
+    ]
+
+
+def materialized(journal, **kwargs):
+    f = io.BytesIO()
+    materialize_journal(journal, f, **kwargs)
+    return f.getvalue()
+
+
+@pytest.mark.parametrize("prettyprint", [True, False])
+def test_materialize(tmp_path, prettyprint):
+    path = str(tmp_path / "results.journal")
+    with ResultJournal(path) as journal:
+        for suite in make_suites(tmp_path):
+            journal.write_test_suite(suite)
+    assert materialized(path, prettyprint=prettyprint) == report(make_suites(tmp_path), prettyprint=prettyprint)
+
+    report_path = str(tmp_path / "report.xml")
+    materialize_journal(path, report_path, encoding="latin-1")
+    with open(report_path, "rb") as f:
+        assert f.read() == report(make_suites(tmp_path), encoding="latin-1")
+
+
+def test_results_as_plain_dicts(tmp_path):
+    def make_suite():
+        case = Case("Test1")
+        case.failures.append({"output": "OUT", "message": "MSG", "type": "T"})
+        case.errors.append({"type": None, "message": "error message", "output": None})
+        case.skipped.append({"type": "skip", "output": "skipped output", "message": "skipped message"})
+        return Suite("suite1", [case])
+
+    path = str(tmp_path / "results.journal")
+    with ResultJournal(path) as journal:
+        journal.write_test_suite(make_suite())
+    assert materialized(path) == report([make_suite()])
+    records = dict(iter_journal(path))
+    assert records["case"]["failures"] == [["MSG", "OUT", "T"]]
+    assert records["case"]["skipped"] == [["skipped message", "skipped output"]]
+
+
+def test_suite_changed_until_ended(tmp_path):
+    path = str(tmp_path / "results.journal")
+    with ResultJournal(path) as journal:
+        suite = journal.begin_suite("suite1")
+        journal.write_test_case(Case("Test1"))
+        suite.stdout = "set later"
+        suite.properties = {"key": "value"}
+        journal.end_suite()
+    expected = Suite("suite1", [Case("Test1")], stdout="set later", properties={"key": "value"})
+    assert materialized(path) == report([expected])
+
+
+def test_torn_record(tmp_path):
+    path = str(tmp_path / "results.journal")
+    with ResultJournal(path) as journal:
+        journal.begin_suite("suite1")
+        journal.write_test_case(Case("Test1"))
+        journal.write_test_case(Case("Test2", stdout="x" * 1000))
+    with open(path, "rb") as f:
+        data = f.read()
+    # the process died while writing the second test case
+    with open(path, "wb") as f:
+        f.write(data[:-500])
+    assert [kind for kind, _ in iter_journal(path)] == ["suite", "case"]
+    assert materialized(path) == report([Suite("suite1", [Case("Test1")])])
+
+    # a journal continued after a crash leaves out the torn record
+    with ResultJournal(path) as journal:
+        journal.write_test_suite(Suite("suite2", [Case("Test3")]))
+    assert materialized(path) == report([Suite("suite1", [Case("Test1")]), Suite("suite2", [Case("Test3")])])
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs SIGKILL")
+def test_killed_process(tmp_path):
+    path = str(tmp_path / "results.journal")
+    script = """
+import os, signal
+from junit_xml import TestCase
+from junit_xml.journal import ResultJournal
+journal = ResultJournal(%r, sync_every=None, sync_interval=None)
+journal.begin_suite("suite1")
+for c in range(3):
+    journal.write_test_case(TestCase("Test%%d" %% c))
+os.kill(os.getpid(), signal.SIGKILL)
+""" % path
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen([sys.executable, "-c", script], env=dict(os.environ, PYTHONPATH=root))
+    assert process.wait() == -signal.SIGKILL
+    assert materialized(path) == report([Suite("suite1", [Case("Test0"), Case("Test1"), Case("Test2")])])
+
+
+def test_corrupt_record():
+    journal = io.BytesIO(b'{"suite":{"name":"suite1"}}\n{"case":{"name":\n{"case":{"name":"Test2"}}\n')
+    with pytest.raises(ValueError, match="record 2"):
+        materialized(journal)
+
+
+def test_sync_batching(monkeypatch, tmp_path):
+    synced = []
+    monkeypatch.setattr(os, "fsync", synced.append)
+    now = [0.0]
+    monkeypatch.setattr(junit_xml.journal, "_clock", lambda: now[0])
+
+    journal = ResultJournal(str(tmp_path / "results.journal"), sync_every=3, sync_interval=None)
+    journal.begin_suite("suite1")
+    for c in range(7):
+        journal.write_test_case(Case("Test%d" % c))
+    assert len(synced) == 2
+    journal.close()
+    assert len(synced) == 3
+
+    synced[:] = []
+    journal = ResultJournal(str(tmp_path / "results2.journal"), sync_every=None, sync_interval=1.0)
+    journal.begin_suite("suite1")
+    journal.write_test_case(Case("Test1"))
+    assert synced == []
+    now[0] = 1.5
+    journal.write_test_case(Case("Test2"))
+    assert len(synced) == 1
+    journal.close()
@@ -0,0 +1,108 @@
+# -*- coding: UTF-8 -*-
+import io
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from junit_xml import TestCase as Case
+from junit_xml import TestSuite as Suite
+from junit_xml import decode, to_xml_report_string
+from junit_xml.merge import main, merge_reports
+
+from .asserts import report
+
+
+def report_file(test_suites):
+    return io.BytesIO(report(test_suites, encoding="utf-8"))
+
+
+def failed_case(name):
+    case = Case(name, elapsed_sec=1.5)
+    case.add_failure_info("failure message")
+    return case
+
+
+def merge(shards, **kwargs):
+    f = io.StringIO()
+    merge_reports([report_file(shard) for shard in shards], f, **kwargs)
+    return f.getvalue()
+
+
+def shards():
+    return [
+        [Suite("a", [failed_case("a1")], properties={"shard": "1"}), Suite("b", [Case("b1")])],
+        [Suite("a", [Case("a2"), Case("a3")], stdout="I am stdout!"), Suite("c")],
+    ]
+
+
+def merged_suite_a():
+    return Suite(
+        "a",
+        [failed_case("a1"), Case("a2"), Case("a3")],
+        properties={"shard": "1"},
+        stdout="I am stdout!",
+    )
+
+
+def test_merge():
+    a1, a2 = shards()
+    assert merge(shards()) == to_xml_report_string(a1 + a2)
+
+
+def test_merge_sorted():
+    (a1, b), (a2, c) = shards()
+    assert merge(shards(), sort_suites=True, prettyprint=False) == to_xml_report_string(
+        [a1, a2, b, c], prettyprint=False
+    )
+
+
+def test_merge_suites():
+    (_, b), (_, c) = shards()
+    assert merge(shards(), merge_suites=True, sort_suites=True) == to_xml_report_string([merged_suite_a(), b, c])
+
+
+def test_merge_suites_only_adjacent_without_sort():
+    (a1, b), (a2, c) = shards()
+    assert merge([[b, a1], [a2, c]], merge_suites=True) == to_xml_report_string([b, merged_suite_a(), c])
+
+
+def test_merge_no_reports():
+    assert merge([]) == to_xml_report_string([])
+
+
+def test_main():
+    directory = tempfile.mkdtemp()
+    try:
+        inputs = []
+        for i, shard in enumerate(shards()):
+            inputs.append(os.path.join(directory, "shard-%d.xml" % i))
+            with open(inputs[-1], "wb") as f:
+                f.write(report(shard, encoding="utf-8"))
+        output = os.path.join(directory, "merged.xml")
+
+        main(["-o", output, "--merge-suites", "--sort-suites"] + inputs)
+        with io.open(output, encoding="utf-8") as f:
+            merged = f.read()
+    finally:
+        shutil.rmtree(directory)
+    assert merged == merge(shards(), merge_suites=True, sort_suites=True)
+
+
+def test_main_requires_output():
+    with pytest.raises(SystemExit):
+        main([decode("shard.xml", "utf-8")])
+
+
+def test_merge_keeps_results_without_message():
+    xml = (
+        b'<testsuites><testsuite name="a">'
+        b'<testcase name="a1"><failure type="AssertionError"/></testcase><testcase name="a2"><error/></testcase>'
+        b"</testsuite></testsuites>"
+    )
+    f = io.StringIO()
+    merge_reports([io.BytesIO(xml)], f)
+    merged = f.getvalue()
+    assert 'errors="1" failures="1"' in merged
+    assert '<failure type="AssertionError" message="AssertionError"/>' in merged
@@ -0,0 +1,129 @@
+# -*- coding: UTF-8 -*-
+import gzip
+import io
+import os
+
+import pytest
+
+from junit_xml import TestCase as Case
+from junit_xml import TestSuite as Suite
+from junit_xml import to_xml_report_file, to_xml_report_string
+from junit_xml.offsets import OffsetIndex, build_offset_index
+from junit_xml.reader import from_xml_report_file
+
+
+def make_suites():
+    failed = Case(u"Failed äöü", "some.class", 2.25, stdout="<testcase name='not a test case'>")
+    failed.add_failure_info("failure message", "I failed!\n<testsuite>", "AssertionError")
+    escaped = Case('a&b "quoted"\tname', "other.class", 0.5)
+    escaped.add_skipped_info("skipped")
+    return [
+        Suite("suite1", [Case("Test1", "some.class", 1.5), failed], hostname="localhost", package="pkg"),
+        Suite("empty"),
+        Suite("suite3", [Case("Test1", "other.class"), escaped, Case("Test1", "some.class", 3.0)]),
+    ]
+
+
+def write_report(path, suites=None, **kwargs):
+    with io.open(path, "wb") as f:
+        to_xml_report_file(f, make_suites() if suites is None else suites, **kwargs)
+    return path
+
+
+def as_xml(case):
+    return to_xml_report_string([Suite("suite", [case])])
+
+
+@pytest.mark.parametrize("prettyprint", [True, False])
+@pytest.mark.parametrize("encoding", ["utf-8", "latin-1"])
+def test_lookup(tmp_path, prettyprint, encoding):
+    report = write_report(str(tmp_path / "report.xml"), prettyprint=prettyprint, encoding=encoding)
+    expected = from_xml_report_file(report)
+    with build_offset_index(report) as index:
+        assert os.path.exists(report + ".offsets")
+        assert (len(index), index.suite_count) == (5, 3)
+        positions = [(s, c) for s, suite in enumerate(expected) for c in suite.test_cases]
+        for position, (suite_position, case) in enumerate(positions):
+            assert as_xml(index.test_case(position)) == as_xml(case)
+            assert index.suite_of(position).name == expected[suite_position].name
+        suite = index.test_suite(0)
+        assert (suite.name, suite.hostname, suite.package, suite.test_cases) == ("suite1", "localhost", "pkg", [])
+        assert index.test_cases_of(1) == []
+        assert index.test_cases_of(2) == [2, 3, 4]
+
+    with OffsetIndex(report) as index:
+        assert index.find("Test1") == [0, 2, 4]
+        assert index.find("Test1", classname="some.class") == [0, 4]
+        assert index.find(u"Failed äöü") == [1]
+        # a tab is read back as a space when it was not escaped
+        assert expected[2].test_cases[1].name == ('a&b "quoted" name' if prettyprint else 'a&b "quoted"\tname')
+        assert index.find(expected[2].test_cases[1].name) == [3]
+        assert index.find("Test2") == []
+
+
+def test_skips_cdata_and_comments(tmp_path):
+    report = str(tmp_path / "report.xml")
+    with io.open(report, "wb") as f:
+        f.write(
+            b'<?xml version="1.0" encoding="utf-8"?>\n<testsuites>\n'
+            b"<!-- <testsuite name='commented'> -->\n"
+            b'<testcase name="outside"/>\n'
+            b"<testsuite name='single quoted'>\n"
+            b'  <testcase classname="c" name="Test1"><system-out><![CDATA[<testcase name="x">]]></system-out>'
+            b"</testcase>\n"
+            b"</testsuite>\n</testsuites>\n"
+        )
+    with build_offset_index(report) as index:
+        assert (len(index), index.suite_count) == (2, 1)
+        assert index.suite_of(0) is None
+        assert index.suite_of(1).name == "single quoted"
+        assert index.test_case(1).stdout == '<testcase name="x">'
+        assert index.find("outside") == [0]
+
+
+def test_nested_suites_and_names_in_other_attributes(tmp_path):
+    report = str(tmp_path / "report.xml")
+    with io.open(report, "wb") as f:
+        f.write(
+            b'<?xml version="1.0" encoding="utf-8"?>\n<testsuites>\n'
+            b'<testsuite name="outer">\n'
+            b"  <testcase classname=\"a name='wrong'\" name=\"Test1\"/>\n"
+            b'  <testsuite name="inner"><testcase name="Test2"/></testsuite>\n'
+            b"  <testcase classname=' name=\"wrong\"'/>\n"
+            b"  <testcase file='x.py' name='Test3'/>\n"
+            b"</testsuite>\n</testsuites>\n"
+        )
+    with build_offset_index(report) as index:
+        assert (len(index), index.suite_count) == (4, 2)
+        assert index.test_cases_of(0) == [0, 2, 3]
+        assert index.test_cases_of(1) == [1]
+        assert index.find("wrong") == []
+        assert index.find("Test1") == [0]
+        assert index.find("Test3") == [3]
+        assert index.test_case(0).classname == "a name='wrong'"
+
+
+def test_index_path_and_stale_index(tmp_path):
+    report = write_report(str(tmp_path / "report.xml"))
+    index_path = str(tmp_path / "index")
+    build_offset_index(report, index_path).close()
+    with OffsetIndex(report, index_path) as index:
+        assert index.test_case(1).is_failure()
+
+    write_report(report, [Suite("suite1", [Case("Test1")])] * 2)
+    with pytest.raises(ValueError, match="changed"):
+        OffsetIndex(report, index_path)
+    with pytest.raises(ValueError, match="not an offset index"):
+        OffsetIndex(index_path, report)
+
+
+def test_unindexable_reports(tmp_path):
+    report = str(tmp_path / "report.xml.gz")
+    with gzip.open(report, "wb") as f:
+        f.write(to_xml_report_string(make_suites()).encode("utf-8"))
+    with pytest.raises(ValueError, match="compressed"):
+        build_offset_index(report)
+
+    report = write_report(str(tmp_path / "report.xml"), encoding="utf-16")
+    with pytest.raises(ValueError, match="UTF-16"):
+        build_offset_index(report)
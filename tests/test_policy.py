@@ -0,0 +1,83 @@
+# -*- coding: UTF-8 -*-
+from io import BytesIO
+
+import pytest
+
+from junit_xml import OutputPolicy
+from junit_xml import TestCase as Case
+from junit_xml import TestSuite as Suite
+from junit_xml import decode, to_xml_report_string
+from junit_xml.reader import from_xml_report_string
+
+
+def read_back(test_suites, **kwargs):
+    return from_xml_report_string(to_xml_report_string(test_suites, **kwargs))
+
+
+def make_suite():
+    passed = Case("Passed", stdout="passed stdout", stderr="passed stderr")
+    failed = Case("Failed", stdout="failed stdout")
+    failed.add_failure_info("failure message", "failure output")
+    skipped = Case("Skipped", stdout="skipped stdout")
+    skipped.add_skipped_info("skipped message", "skipped output")
+    return Suite("suite1", [passed, failed, skipped], properties={"foo": "bar"})
+
+
+@pytest.mark.parametrize("prettyprint", [True, False])
+def test_within_limits_same_as_without_policy(prettyprint):
+    policy = OutputPolicy(max_field_size=100, max_report_size=1000)
+    expected = to_xml_report_string([make_suite()], prettyprint=prettyprint)
+    assert to_xml_report_string([make_suite()], prettyprint=prettyprint, policy=policy) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_max_field_size(monkeypatch, chunk_size):
+    monkeypatch.setattr("junit_xml._SOURCE_CHUNK_SIZE", chunk_size)
+    output = decode("äöü", "utf-8") * 10 + "x" * 100 + decode("€", "utf-8") * 10
+    # the head is cut before a split character, the tail after one
+    output = "x" + output
+    suite = Suite("suite1", [Case("Test1", stdout=BytesIO(output.encode("utf-8")), stderr="short")])
+
+    [suite] = read_back([suite], policy=OutputPolicy(max_field_size=40))
+    stdout = suite.test_cases[0].stdout
+    # 19 of the 20 bytes of the head, 18 of the 20 bytes of the tail
+    truncated = len(output.encode("utf-8")) - 37
+    assert stdout == output[:10] + "\n[... %d bytes truncated ...]\n" % truncated + output[-6:]
+    assert suite.test_cases[0].stderr == "short"
+    assert suite.properties == {"output-truncated-fields": "1", "output-truncated-bytes": str(truncated)}
+
+
+def test_drop_passed_and_skipped():
+    [suite] = read_back([make_suite()], policy=OutputPolicy(drop_passed=True, drop_skipped=True))
+    passed, failed, skipped = suite.test_cases
+    assert passed.stdout is None and passed.stderr is None
+    assert failed.stdout == "failed stdout"
+    assert failed.failures[0]["output"] == "failure output"
+    assert skipped.stdout is None and skipped.skipped[0]["output"] is None
+    assert skipped.skipped[0]["message"] == "skipped message"
+    assert suite.properties == {"foo": "bar", "output-dropped-fields": "4"}
+
+
+def test_max_report_size():
+    suites = [Suite("suite1", [Case("Test1", stdout="a" * 10), Case("Test2", stdout="b" * 10)], stdout="c" * 10)]
+    [suite] = read_back(suites, policy=OutputPolicy(max_report_size=15), prettyprint=False)
+    assert suite.test_cases[0].stdout == "a" * 10
+    assert suite.test_cases[1].stdout == "bb\n[... 5 bytes truncated ...]\nbbb"
+    assert suite.stdout == OutputPolicy.dropped_marker
+    assert suite.properties == {
+        "output-truncated-fields": "1",
+        "output-truncated-bytes": "5",
+        "output-dropped-fields": "1",
+    }
+
+
+def test_build_xml_doc():
+    element = make_suite().build_xml_doc(policy=OutputPolicy(drop_passed=True))
+    properties = dict((p.get("name"), p.get("value")) for p in element.find("properties"))
+    assert properties == {"foo": "bar", "output-dropped-fields": "2"}
+    assert element.find("testcase").find("system-out") is None
+
+
+def test_workers():
+    with pytest.raises(ValueError):
+        to_xml_report_string([make_suite()], workers=2, policy=OutputPolicy(drop_passed=True))
@@ -0,0 +1,82 @@
+# -*- coding: UTF-8 -*-
+import io
+
+import pytest
+
+from junit_xml import TestCase as Case
+from junit_xml import TestSuite as Suite
+from junit_xml.query import STATUSES, ReportIndex
+
+from .asserts import report
+
+
+def make_suites():
+    cases = []
+    for c in range(100):
+        case = Case("Test%d" % c, "pkg.Class%d" % (c % 4), elapsed_sec=float(c % 17), file="test_%d.py" % (c % 3))
+        if c % 10 == 0:
+            case.add_failure_info("failure message")
+        if c % 25 == 0:
+            case.add_error_info("error message")
+        if c % 30 == 7:
+            case.add_skipped_info("skipped")
+        cases.append(case)
+    rerun = [Case("Test0", "pkg.Class0", 1.0), Case("Test1", "pkg.Class1", 1.0)]
+    rerun[1].add_failure_info("failed on rerun")
+    return [Suite("suite1", cases[:60]), Suite("suite2", cases[60:]), Suite("rerun", rerun)]
+
+
+def all_cases(suites):
+    return [case for suite in suites for case in suite.test_cases]
+
+
+def names(cases):
+    return [(case.classname, case.name) for case in cases]
+
+
+@pytest.fixture(params=["suites", "report"])
+def index(request):
+    if request.param == "suites":
+        return ReportIndex(make_suites())
+    return ReportIndex.from_report(io.BytesIO(report(make_suites())))
+
+
+def test_time_queries(index):
+    cases = all_cases(make_suites())
+    # sorted by time, the slowest first, ties in the order of the report
+    by_time = sorted(range(len(cases)), key=lambda row: (-cases[row].elapsed_sec, -row))
+    assert names(index.slowest(5)) == names([cases[row] for row in by_time[:5]])
+    assert names(index.slowest(1000)) == names([cases[row] for row in by_time])
+    assert names(index.over(14.0)) == names([c for c in (cases[row] for row in by_time) if c.elapsed_sec > 14.0])
+    assert index.over(100.0) == []
+
+
+def test_hash_queries(index):
+    cases = all_cases(make_suites())
+    assert len(index) == 102
+    assert names(index.by_classname("pkg.Class2")) == names([c for c in cases if c.classname == "pkg.Class2"])
+    assert names(index.by_file("test_1.py")) == names([c for c in cases if c.file == "test_1.py"])
+    assert index.by_classname("unknown") == []
+    assert names(index.with_status("failure")) == names([c for c in cases if c.is_failure()])
+    assert names(index.with_status("error")) == names([c for c in cases if c.is_error()])
+    assert names(index.with_status("skipped")) == names([c for c in cases if c.is_skipped()])
+    assert index.counts() == {"passed": 85, "failure": 11, "error": 4, "skipped": 4, "disabled": 0}
+    assert sorted(index.classnames()) == ["pkg.Class%d" % c for c in range(4)]
+    assert index.suite_of(0).name == "suite1"
+    assert index.suite_of(101).name == "rerun"
+    with pytest.raises(ValueError, match="unknown status"):
+        index.with_status("flaky")
+    assert set(STATUSES) == set(index.counts())
+
+
+def test_failures_by_classname(index):
+    grouped = index.failures_by_classname()
+    assert sorted(grouped) == ["pkg.Class0", "pkg.Class1", "pkg.Class2", "pkg.Class3"]
+    assert [c.name for c in grouped["pkg.Class0"]] == ["Test0", "Test20", "Test40", "Test60", "Test80"]
+    assert [c.name for c in grouped["pkg.Class1"]] == ["Test25", "Test1"]
+    assert [c.name for c in index.failures_by_classname(["skipped"])["pkg.Class1"]] == ["Test37", "Test97"]
+
+
+def test_flaky_candidates(index):
+    # Test0 failed, then passed on a rerun, Test1 passed, then failed
+    assert sorted(index.flaky_candidates()) == [("pkg.Class0", "Test0"), ("pkg.Class1", "Test1")]
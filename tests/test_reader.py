@@ -0,0 +1,131 @@
+# -*- coding: UTF-8 -*-
+import os
+import tempfile
+from io import BytesIO
+
+import pytest
+
+from junit_xml import TestCase as Case
+from junit_xml import TestSuite as Suite
+from junit_xml import decode, to_xml_report_file, to_xml_report_string
+from junit_xml.reader import from_xml_report_file, from_xml_report_string, iter_test_cases, iter_test_suites
+
+
+def make_suites():
+    passed = Case(
+        "Passed",
+        classname="some.class.name",
+        elapsed_sec=1.5,
+        stdout="I am stdout!",
+        stderr="I am stderr!",
+        assertions=3,
+        timestamp="2020-01-01T00:00:00",
+        status="run",
+        category="unit",
+        file="test_file.py",
+        line=42,
+        log="test.log",
+        url="http://example.com/test",
+    )
+    failed = Case(decode("Failed äöü", "utf-8"), elapsed_sec=2.25, allow_multiple_subelements=True)
+    failed.add_failure_info("failure message", "I failed!", "com.example.Failure")
+    failed.add_failure_info("second failure message", "I failed again!")
+    failed.add_error_info(output="I errored!")
+    skipped = Case("Skipped")
+    skipped.add_skipped_info()
+    return [
+        Suite(
+            "suite1",
+            [passed, failed, skipped],
+            hostname="localhost",
+            id=1,
+            package="mypackage",
+            timestamp="2020-01-01T00:00:00",
+            properties={"foo": "bar", "baz": "qux"},
+            file="suite.py",
+            log="suite.log",
+            url="http://example.com/suite",
+            stdout="I am suite stdout!",
+            stderr="I am suite stderr!",
+        ),
+        Suite("suite2"),
+        Suite("suite3", [Case("Test3")]),
+    ]
+
+
+@pytest.mark.parametrize("prettyprint", [True, False])
+def test_round_trip(prettyprint):
+    xml_string = to_xml_report_string(make_suites(), prettyprint=prettyprint)
+    assert to_xml_report_string(from_xml_report_string(xml_string), prettyprint=prettyprint) == xml_string
+
+
+def test_round_trip_file():
+    fd, filename = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        with open(filename, "w") as f:
+            to_xml_report_file(f, make_suites(), encoding="utf-8")
+        suites = from_xml_report_file(filename)
+    finally:
+        os.remove(filename)
+    assert to_xml_report_string(suites) == to_xml_report_string(make_suites())
+
+
+def test_read_test_cases():
+    suites = from_xml_report_string(to_xml_report_string(make_suites()))
+    assert [suite.name for suite in suites] == ["suite1", "suite2", "suite3"]
+    assert (suites[0].tests, suites[0].failures, suites[0].errors, suites[0].skipped) == (3, 1, 1, 1)
+    assert suites[0].properties == {"foo": "bar", "baz": "qux"}
+
+    passed, failed, skipped = suites[0].test_cases
+    assert passed.elapsed_sec == 1.5
+    assert passed.assertions == 3
+    assert passed.category == "unit"
+    assert passed.line == "42"
+    assert failed.name == decode("Failed äöü", "utf-8")
+    assert failed.failures[1]["message"] == "second failure message"
+    assert failed.errors[0]["output"] == "I errored!"
+    assert skipped.is_skipped()
+    assert passed._failures is None
+
+
+def test_iter_test_cases():
+    xml_string = to_xml_report_string(make_suites(), encoding="utf-8")
+    cases = list(iter_test_cases(BytesIO(xml_string.encode("utf-8"))))
+    assert [(suite.name, case.name) for suite, case in cases][-1] == ("suite3", "Test3")
+    assert len(cases) == 4
+    # the suites only hold their attributes
+    assert cases[0][0].stdout == "I am suite stdout!"
+    assert cases[0][0].tests == 0
+
+
+def test_iter_test_suites_single_suite_root():
+    xml = b'<testsuite name="suite1"><testcase name="Test1"/><system-out>late output</system-out></testsuite>'
+    suites = list(iter_test_suites(BytesIO(xml)))
+    assert len(suites) == 1
+    assert suites[0].stdout == "late output"
+    assert suites[0].test_cases[0].name == "Test1"
+
+
+def test_results_without_message_or_text():
+    xml = (
+        b'<testsuites><testsuite name="suite1">'
+        b'<testcase name="Failed"><failure type="AssertionError"/></testcase>'
+        b'<testcase name="Errored"><error/></testcase>'
+        b'<testcase name="Skipped"><skipped/></testcase>'
+        b"</testsuite></testsuites>"
+    )
+    failed, errored, skipped = from_xml_report_string(xml)[0].test_cases
+    assert failed.is_failure() and failed.failures[0]["message"] == "AssertionError"
+    assert errored.is_error() and errored.errors[0]["message"] == "error"
+    assert skipped.is_skipped()
+
+
+def test_lenient_numbers():
+    xml = (
+        b'<testsuite name="suite1"><testcase name="Test1" time="" assertions="2.0"/>'
+        b'<testcase name="Test2" time="1.5s" assertions="many"/></testsuite>'
+    )
+    first, second = from_xml_report_string(xml)[0].test_cases
+    assert (first.elapsed_sec, first.assertions) == (None, 2)
+    assert (second.elapsed_sec, second.assertions) == (None, None)
@@ -0,0 +1,76 @@
+# -*- coding: UTF-8 -*-
+from io import BytesIO, StringIO
+
+import pytest
+
+from junit_xml import JUnitXMLWriter, OutputPolicy, ReportStats
+from junit_xml import TestCase as Case
+from junit_xml import TestSuite as Suite
+from junit_xml import to_xml_report_file, to_xml_report_string
+
+
+def make_suites():
+    failed = Case("Failed", elapsed_sec=1.5, stdout="I am stdout!")
+    failed.add_failure_info("failure message", "I failed!")
+    return [Suite("suite1", [Case("Test1"), failed], stdout="suite stdout"), Suite("suite2", [Case("Test2")])]
+
+
+@pytest.mark.parametrize("policy", [None, OutputPolicy(max_field_size=5)])
+def test_report_string(policy):
+    stats = ReportStats()
+    xml_string = to_xml_report_string(make_suites(), policy=policy, stats=stats)
+    assert xml_string == to_xml_report_string(make_suites(), policy=policy)
+
+    assert stats.phases["build"]["cases"] == 3
+    assert stats.phases["serialize"]["seconds"] > 0
+    assert [(suite["name"], suite["cases"]) for suite in stats.suites] == [("suite1", 2), ("suite2", 1)]
+    if policy is None:
+        assert stats.phases["totals"]["cases"] == 3
+        assert stats.phases["encode"]["bytes"] == len(xml_string)
+        assert sum(suite["bytes"] for suite in stats.suites) < len(xml_string)
+    else:
+        assert stats.phases["write"]["bytes"] == len(xml_string)
+
+
+def test_report_file():
+    stats = ReportStats()
+    f = BytesIO()
+    to_xml_report_file(f, make_suites(), compression="gzip", stats=stats)
+    assert stats.phases["write"]["bytes"] == len(to_xml_report_string(make_suites()).encode("utf-8"))
+    assert stats.phases["serialize"]["bytes"] == sum(suite["bytes"] for suite in stats.suites)
+    assert str(stats).splitlines()[0].split() == ["phase", "seconds", "bytes", "cases"]
+
+
+def test_workers():
+    stats = ReportStats()
+    to_xml_report_string(make_suites(), workers=2, stats=stats)
+    assert stats.phases["serialize"]["cases"] == 3
+    assert [suite["seconds"] for suite in stats.suites] == [None, None]
+
+
+def test_writer():
+    stats = ReportStats()
+    f = StringIO()
+    with JUnitXMLWriter(f, stats=stats) as writer:
+        for suite in make_suites():
+            writer.write_test_suite(suite)
+    assert f.getvalue() == to_xml_report_string(make_suites())
+    assert stats.phases["build"]["cases"] == 3
+    assert stats.phases["write"]["bytes"] == len(f.getvalue())
+    assert stats.phases["spool"]["bytes"] == sum(suite["bytes"] for suite in stats.suites)
+    assert [suite["cases"] for suite in stats.suites] == [2, 1]
+
+
+def test_subclass_receives_phases():
+    class Recorder(ReportStats):
+        def __init__(self):
+            ReportStats.__init__(self)
+            self.calls = []
+
+        def add_phase(self, phase, seconds, bytes=0, cases=0):
+            self.calls.append(phase)
+            ReportStats.add_phase(self, phase, seconds, bytes, cases)
+
+    stats = Recorder()
+    to_xml_report_string(make_suites(), stats=stats)
+    assert stats.calls[0] == "totals" and stats.calls[-1] == "encode"
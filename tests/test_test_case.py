@@ -1,12 +1,14 @@
 # -*- coding: UTF-8 -*-
-from __future__ import with_statement
+import os
+import pickle
+from io import BytesIO, StringIO
 
-from six import u
+import pytest
 
 from .asserts import verify_test_case
 from junit_xml import TestCase as Case
 from junit_xml import TestSuite as Suite
-from junit_xml import decode
+from junit_xml import JUnitXMLWriter, decode, to_xml_report_string
 from .serializer import serialize_and_read
 
 
@@ -188,19 +190,19 @@ def test_init_skipped():
 
 def test_init_legal_unicode_char():
     tc = Case("Failure-Message")
-    tc.add_failure_info(u("failure message with legal unicode char: [\x22]"))
+    tc.add_failure_info("failure message with legal unicode char: [\x22]")
     ts, tcs = serialize_and_read(Suite("test", [tc]))[0]
     verify_test_case(
-        tcs[0], {"name": "Failure-Message"}, failure_message=u("failure message with legal unicode char: [\x22]")
+        tcs[0], {"name": "Failure-Message"}, failure_message="failure message with legal unicode char: [\x22]"
     )
 
 
 def test_init_illegal_unicode_char():
     tc = Case("Failure-Message")
-    tc.add_failure_info(u("failure message with illegal unicode char: [\x02]"))
+    tc.add_failure_info("failure message with illegal unicode char: [\x02]")
     ts, tcs = serialize_and_read(Suite("test", [tc]))[0]
     verify_test_case(
-        tcs[0], {"name": "Failure-Message"}, failure_message=u("failure message with illegal unicode char: []")
+        tcs[0], {"name": "Failure-Message"}, failure_message="failure message with illegal unicode char: []"
     )
 
 
@@ -322,3 +324,109 @@ def test_multiple_skipped():
             {"message": "Second skipped", "output": "Second skipped message"},
         ],
     )
+
+
+def test_init_illegal_unicode_char_in_attributes_and_output():
+    tc = Case("Illegal\x0b-Name", classname="some.class\x1f.name", stdout="I am \x00stdout!\n")
+    tc.add_error_info("error\x7f message", "I err\x84ored!")
+    ts, tcs = serialize_and_read(Suite("test", [tc]), prettyprint=True)[0]
+    verify_test_case(
+        tcs[0],
+        {"name": "Illegal-Name", "classname": "some.class.name"},
+        stdout="I am stdout!",
+        error_message="error message",
+        error_output="I errored!",
+    )
+
+
+def test_carriage_return_kept_in_attributes():
+    tc = Case("Test\r1", classname="some\r\nclass", stdout="I am\r stdout", stderr="\x01")
+    tc.add_failure_info("failure\r message")
+    compact = to_xml_report_string([Suite("test", [tc])], prettyprint=False)
+    assert '<testcase name="Test&#13;1" classname="some&#13;&#10;class">' in compact
+    assert '<failure type="failure" message="failure&#13; message" />' in compact
+    # carriage returns are removed from text, an element whose text was only illegal characters is not empty
+    assert "<system-out>I am stdout</system-out><system-err></system-err>" in compact
+
+    pretty = to_xml_report_string([Suite("test", [tc])])
+    assert '<testcase name="Test\r1" classname="some\r\nclass">' in pretty
+    assert "<system-err/>" in pretty
+    ts, tcs = serialize_and_read(Suite("test", [tc]), prettyprint=False)[0]
+    assert tcs[0].attributes["classname"].value == "some\r\nclass"
+
+
+def test_result_info_reads_like_dict():
+    tc = Case("Failure-Message")
+    tc.add_failure_info("failure message", "I failed!", "com.example.Error")
+    tc.add_skipped_info("skipped message")
+    assert tc.failures[0]["message"] == "failure message"
+    assert tc.failures == [{"message": "failure message", "output": "I failed!", "type": "com.example.Error"}]
+    assert dict(tc.skipped[0]) == {"message": "skipped message", "output": None}
+
+    tc.failures[0]["output"] = "I failed again!"
+    assert tc.failures[0].output == "I failed again!"
+    with pytest.raises(KeyError):
+        tc.skipped[0]["type"]
+
+
+def test_result_lists_allocated_lazily():
+    tc = Case("Test1")
+    assert tc._failures is None and tc._errors is None and tc._skipped is None
+    assert not tc.is_failure() and not tc.is_error() and not tc.is_skipped()
+    assert tc._failures is None
+
+    # appending to the lists directly keeps working
+    tc.errors.append({"message": "error message", "output": None, "type": None})
+    assert tc.is_error()
+
+
+def test_pickle():
+    tc = Case("Test1", classname="some.class.name", elapsed_sec=1.5)
+    tc.add_failure_info("failure message", "I failed!")
+    tc = pickle.loads(pickle.dumps(tc))
+    assert tc.classname == "some.class.name"
+    assert tc.elapsed_sec == 1.5
+    assert tc.failures == [{"message": "failure message", "output": "I failed!", "type": None}]
+
+
+LOG = decode("line 1\r\nline 2 äöü <&>\x07\r\nline 3\r", "utf-8")
+
+
+def make_case(stdout, stderr, output):
+    tc = Case("Test1", stdout=stdout, stderr=stderr)
+    tc.add_failure_info("failure message", output)
+    return Suite("test", [tc], stdout=stdout)
+
+
+@pytest.mark.skipif(not hasattr(os, "PathLike"), reason="paths are read from os.PathLike objects")
+@pytest.mark.parametrize("prettyprint", [True, False])
+@pytest.mark.parametrize("chunk_size", [1, 3, 64 * 1024])
+def test_lazy_sources(tmp_path, monkeypatch, prettyprint, chunk_size):
+    monkeypatch.setattr("junit_xml._SOURCE_CHUNK_SIZE", chunk_size)
+    path = tmp_path / "stdout.log"
+    path.write_bytes(LOG.encode("utf-8"))
+    expected = to_xml_report_string([make_case(LOG, LOG, LOG)], prettyprint=prettyprint)
+
+    def chunks():
+        for i in range(0, len(LOG), 4):
+            yield LOG[i:i + 4]
+
+    lazy_suite = make_case(path, BytesIO(LOG.encode("utf-8")), chunks)
+    assert to_xml_report_string([lazy_suite], prettyprint=prettyprint) == expected
+    # files are read from their start again
+    assert to_xml_report_string([lazy_suite], prettyprint=prettyprint) == expected
+
+    f = StringIO()
+    with JUnitXMLWriter(f, prettyprint=prettyprint) as writer:
+        writer.write_test_suite(make_case(lambda: LOG, StringIO(LOG), lambda: LOG.encode("utf-8")))
+    assert f.getvalue() == expected
+
+
+def test_lazy_source_materialized_by_build_xml_doc():
+    tc = Case("Test1", stdout=lambda: "I am stdout!")
+    assert tc.build_xml_doc().find("system-out").text == "I am stdout!"
+
+
+def test_lazy_source_empty():
+    xml_string = to_xml_report_string([Suite("test", [Case("Test1", stdout=BytesIO())])], prettyprint=False)
+    assert "<system-out />" in xml_string
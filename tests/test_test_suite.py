@@ -1,16 +1,16 @@
 # -*- coding: UTF-8 -*-
-from __future__ import with_statement
-
+import pickle
 import textwrap
 import warnings
+from io import BytesIO, StringIO
+from xml.dom import minidom
 
 import pytest
-from six import PY2, StringIO
 
 from .asserts import verify_test_case
 from junit_xml import TestCase as Case
 from junit_xml import TestSuite as Suite
-from junit_xml import decode, to_xml_report_string
+from junit_xml import decode, to_xml_report_file, to_xml_report_string
 from .serializer import serialize_and_read
 
 
@@ -197,8 +197,7 @@ def test_to_xml_string():
         Suite(name="suite2", test_cases=[Case(name="Test2")]),
     ]
     xml_string = to_xml_report_string(test_suites)
-    if PY2:
-        assert isinstance(xml_string, unicode)  # noqa: F821
+    assert isinstance(xml_string, str)
     expected_xml_string = textwrap.dedent(
         """
         <?xml version="1.0" ?>
@@ -239,3 +238,211 @@ def test_deprecated_to_file():
         assert len(w) == 1
         assert issubclass(w[0].category, DeprecationWarning)
         assert "Testsuite.to_file is deprecated" in str(w[0].message)
+
+
+def test_to_xml_string_prettyprint_same_as_minidom():
+    tc = Case(name="Test1", classname="some.class.name", elapsed_sec=1.5, stdout="I am\r\nstdout!", stderr='"<&>"')
+    tc.add_failure_info("failure\tmessage", "I failed!")
+    tc.add_skipped_info("skipped message")
+    test_suites = [
+        Suite(name="suite1", test_cases=[tc], properties={"foo": "bar"}, stdout="I am stdout!"),
+        Suite(name="suite2"),
+    ]
+    for encoding in [None, "utf-8"]:
+        compact = to_xml_report_string(test_suites, prettyprint=False, encoding=encoding)
+        expected = minidom.parseString(compact.encode(encoding or "utf-8")).toprettyxml(encoding=encoding)
+        if encoding:
+            expected = expected.decode(encoding)
+        assert to_xml_report_string(test_suites, prettyprint=True, encoding=encoding) == expected
+
+
+def test_totals():
+    failed = Case("Failed", elapsed_sec=1.25, assertions=2)
+    failed.add_failure_info("failure message")
+    errored = Case("Errored", elapsed_sec=0.5)
+    errored.add_error_info("error message")
+    skipped = Case("Skipped")
+    skipped.add_skipped_info("skipped message")
+    disabled = Case("Disabled")
+    disabled.is_enabled = False
+    suite = Suite("test", [failed, errored, skipped, disabled, Case("Passed")])
+
+    assert suite.tests == 5
+    assert suite.failures == 1
+    assert suite.errors == 1
+    assert suite.skipped == 1
+    assert suite.disabled == 1
+    assert suite.assertions == 2
+    assert suite.time == 1.75
+
+
+def test_totals_no_test_cases():
+    suite = Suite("test")
+    assert suite.tests == 0
+    assert suite.assertions is None
+    assert suite.time == 0
+
+
+def test_totals_follow_test_cases():
+    suite = Suite("test")
+    case = Case("Test1")
+    suite.test_cases.append(case)
+    assert (suite.tests, suite.failures, suite.time) == (1, 0, 0)
+
+    case.add_failure_info("failure message")
+    case.elapsed_sec = 2.5
+    case.assertions = 3
+    assert (suite.tests, suite.failures, suite.assertions, suite.time) == (1, 1, 3, 2.5)
+
+    suite.test_cases.extend([Case("Test2", elapsed_sec=1), Case("Test3")])
+    suite.test_cases.remove(case)
+    assert (suite.tests, suite.failures, suite.assertions, suite.time) == (2, 0, None, 1)
+
+    # changes of test cases which left the suite are not counted any more
+    case.add_error_info("error message")
+    assert suite.errors == 0
+
+    del suite.test_cases[:]
+    assert (suite.tests, suite.time) == (0, 0)
+
+    suite.test_cases.append(case)
+    case.errors.append({"message": None, "output": None, "type": None})
+    suite.recount()
+    assert suite.errors == 1
+    case.add_failure_info("failure message")
+    assert (suite.errors, suite.failures) == (1, 1)
+
+
+def test_totals_follow_changes_in_place():
+    cases = []
+    suite = Suite("test", cases)
+    cases.append(Case("Test1"))
+    assert suite.test_cases is cases
+    assert suite.tests == 1
+
+    case = cases[0]
+    # results edited in place are counted by recount()
+    case.failures.append({"message": "failure message", "output": None, "type": None})
+    suite.recount()
+    assert suite.failures == 1 and case.is_failure()
+    case.failures[0]["message"] = None
+    suite.recount()
+    assert suite.failures == 0 and not case.is_failure()
+    case.skipped = [{"message": "skipped message", "output": None}]
+    assert suite.skipped == 1
+    ts, tcs = serialize_and_read(suite)[0]
+    assert (ts.attributes["tests"].value, ts.attributes["skipped"].value) == ("1", "1")
+    assert len(tcs[0].getElementsByTagName("skipped")) == 1
+
+
+def test_totals_read_without_counting(monkeypatch):
+    cases = [Case("Test%d" % i, elapsed_sec=1) for i in range(100)]
+    suites = [Suite("list", cases), Suite("iterable", iter(cases)), Suite("appended")]
+    suites[2].test_cases.extend(cases)
+    assert [(suite.tests, suite.time) for suite in suites] == [(100, 100)] * 3
+
+    def counted(case):
+        raise AssertionError("counted again")
+
+    monkeypatch.setattr(Case, "_result", counted)
+    assert [(suite.tests, suite.failures, suite.time) for suite in suites] == [(100, 0, 100)] * 3
+
+
+def test_totals_of_plain_list():
+    cases = [Case("Test1", elapsed_sec=1)]
+    suite = Suite("test", cases)
+    assert (suite.tests, suite.time) == (1, 1)
+
+    # appended test cases are counted when the totals are read
+    cases.append(Case("Test2", elapsed_sec=2))
+    cases[1].add_error_info("error message")
+    assert (suite.tests, suite.errors, suite.time) == (2, 1, 3)
+
+    # a replaced last test case, or a shorter list, is counted again
+    removed = cases.pop()
+    cases.append(Case("Test3"))
+    assert (suite.tests, suite.errors, suite.time) == (2, 0, 1)
+    del cases[0]
+    assert (suite.tests, suite.time) == (1, 0)
+    removed.add_failure_info("failure message")
+    cases[0].add_failure_info("failure message")
+    assert (suite.tests, suite.failures) == (1, 1)
+
+    # other changes are counted by recount()
+    cases[0] = Case("Test4", elapsed_sec=4)
+    suite.recount()
+    assert (suite.tests, suite.failures, suite.time) == (1, 0, 4)
+
+    suite = pickle.loads(pickle.dumps(suite))
+    suite.test_cases[0].add_skipped_info("skipped message")
+    suite.test_cases.append(Case("Test5"))
+    assert (suite.tests, suite.skipped, suite.time) == (2, 1, 4)
+
+
+def test_totals_time_summed_in_order():
+    times = [0.1, 0.7, 1e16, 0.2, 3.3]
+    cases = [Case("Test%d" % i) for i in range(len(times))]
+    suite = Suite("test", cases)
+    for case, elapsed_sec in reversed(list(zip(cases, times))):
+        case.elapsed_sec = elapsed_sec
+    assert suite.time == sum(times)
+
+    suite.test_cases.insert(1, Case("Test", elapsed_sec=0.3))
+    assert suite.time == sum(times[:1] + [0.3] + times[1:])
+
+
+def test_totals_attributes():
+    case = Case("Test1", elapsed_sec=1.5)
+    suite = Suite("test", [case])
+    case.add_skipped_info("skipped message")
+    ts, tcs = serialize_and_read(suite)[0]
+    assert ts.attributes["skipped"].value == "1"
+    assert ts.attributes["time"].value == "1.5"
+
+
+def test_totals_pickle():
+    suite = Suite("test", [Case("Test1", elapsed_sec=1)])
+    suite = pickle.loads(pickle.dumps(suite))
+    suite.test_cases[0].add_failure_info("failure message")
+    assert (suite.tests, suite.failures, suite.time) == (1, 1, 1)
+
+
+@pytest.mark.parametrize("prettyprint", [True, False])
+def test_to_xml_string_workers(prettyprint):
+    test_suites = []
+    for i in range(10):
+        failed = Case(name="Failed", elapsed_sec=i)
+        failed.add_failure_info("failure message", "I failed!")
+        test_suites.append(Suite(name="suite%d" % i, test_cases=[Case(name="Test1"), failed], stdout="stdout"))
+    expected = to_xml_report_string(test_suites, prettyprint=prettyprint)
+    assert to_xml_report_string(test_suites, prettyprint=prettyprint, workers=3) == expected
+
+
+@pytest.mark.parametrize("prettyprint", [True, False])
+@pytest.mark.parametrize("encoding", [None, "utf-8", "latin-1", "us-ascii"])
+def test_to_binary_file(prettyprint, encoding):
+    failed = Case(name=decode("Failed äöü €", "utf-8"))
+    failed.add_failure_info("failure message", decode("I failed! äöü €", "utf-8"))
+    test_suites = [Suite(name=decode("suite äöü", "utf-8"), test_cases=[Case(name="Test1"), failed]), Suite("suite2")]
+
+    f = BytesIO()
+    to_xml_report_file(f, test_suites, prettyprint=prettyprint, encoding=encoding)
+    expected = to_xml_report_string(test_suites, prettyprint=prettyprint, encoding=encoding)
+    assert f.getvalue() == expected.encode(encoding or "utf-8")
+    if encoding in ("latin-1", "us-ascii"):
+        assert b"&#8364;" in f.getvalue()
+
+
+@pytest.mark.parametrize("prettyprint", [True, False])
+@pytest.mark.parametrize("encoding", ["utf-16", "utf-8-sig"])
+def test_to_binary_file_in_chunks(prettyprint, encoding):
+    test_suites = [Suite("suite", [Case(decode("Test%d äöü", "utf-8") % i, "some.class") for i in range(2000)])]
+    f = BytesIO()
+    to_xml_report_file(f, test_suites, prettyprint=prettyprint, encoding=encoding)
+    expected = to_xml_report_string(test_suites, prettyprint=prettyprint, encoding=encoding)
+    # the report is written in chunks of 64K characters, with one byte order mark at its start
+    assert len(expected) > 64 * 1024
+    assert f.getvalue() == expected.encode(encoding)
+    if encoding == "utf-16":
+        # expat does not read documents declared as utf-8-sig
+        assert len(minidom.parseString(f.getvalue()).getElementsByTagName("testcase")) == 2000
@@ -0,0 +1,156 @@
+# -*- coding: UTF-8 -*-
+from io import BytesIO, StringIO
+
+import pytest
+
+import junit_xml
+from junit_xml import JUnitXMLWriter
+from junit_xml import TestCase as Case
+from junit_xml import TestSuite as Suite
+from junit_xml import decode, to_xml_report_string
+
+
+def make_suites():
+    passed = Case("Passed", "some.class.name", 1.5, "I am stdout!", "I am stderr!", assertions=3)
+    failed = Case(decode("Failed äöü", "utf-8"), elapsed_sec=2.25)
+    failed.add_failure_info("failure message", "I failed!\r\n<&>")
+    failed.add_error_info(output="I errored!")
+    skipped = Case("Skipped")
+    skipped.add_skipped_info("skipped message")
+    skipped.is_enabled = False
+    return [
+        Suite("suite1", [passed, failed, skipped], hostname="localhost", properties={"foo": "bar"}, stdout="out"),
+        Suite("suite2"),
+        Suite("suite3", [Case("Test3")]),
+    ]
+
+
+def write_report(test_suites, **kwargs):
+    f = StringIO()
+    with JUnitXMLWriter(f, **kwargs) as writer:
+        for suite in test_suites:
+            writer.write_test_suite(suite)
+    return f.getvalue()
+
+
+@pytest.mark.parametrize("prettyprint", [True, False])
+@pytest.mark.parametrize("encoding", [None, "utf-8", "latin-1"])
+def test_same_markup_as_report_string(prettyprint, encoding):
+    expected = to_xml_report_string(make_suites(), prettyprint=prettyprint, encoding=encoding)
+    assert write_report(make_suites(), prettyprint=prettyprint, encoding=encoding) == expected
+
+
+@pytest.mark.parametrize("prettyprint", [True, False])
+def test_no_suites(prettyprint):
+    assert write_report([], prettyprint=prettyprint) == to_xml_report_string([], prettyprint=prettyprint)
+
+
+@pytest.mark.parametrize("prettyprint", [True, False])
+@pytest.mark.parametrize("encoding", [None, "utf-8", "latin-1", "utf-16", "utf-8-sig"])
+def test_binary_file(prettyprint, encoding):
+    f = BytesIO()
+    writer = JUnitXMLWriter(f, prettyprint=prettyprint, encoding=encoding)
+    # copied in chunks that split multi-byte characters
+    writer.chunk_size = 7
+    for suite in make_suites():
+        writer.write_test_suite(suite)
+    writer.close()
+    expected = to_xml_report_string(make_suites(), prettyprint=prettyprint, encoding=encoding)
+    assert f.getvalue() == expected.encode(encoding or "utf-8")
+
+
+def test_begin_write_end():
+    f = StringIO()
+    writer = JUnitXMLWriter(f)
+    suite = writer.begin_suite("suite1", hostname="localhost")
+    writer.write_test_case(Case("Test1"))
+    writer.write_test_case(Case("Test2", elapsed_sec=2))
+    # header fields may still change until the suite is ended
+    suite.stdout = "I am stdout!"
+    writer.end_suite()
+    assert f.getvalue() == ""
+    writer.close()
+
+    expected = Suite(
+        "suite1", [Case("Test1"), Case("Test2", elapsed_sec=2)], hostname="localhost", stdout="I am stdout!"
+    )
+    assert f.getvalue() == to_xml_report_string([expected])
+
+
+def test_close_ends_open_suite():
+    f = StringIO()
+    writer = JUnitXMLWriter(f, prettyprint=False)
+    writer.begin_suite("suite1")
+    writer.write_test_case(Case("Test1"))
+    writer.close()
+    assert f.getvalue() == to_xml_report_string([Suite("suite1", [Case("Test1")])], prettyprint=False)
+
+
+def test_write_test_case_without_suite():
+    writer = JUnitXMLWriter(StringIO())
+    with pytest.raises(ValueError) as excinfo:
+        writer.write_test_case(Case("Test1"))
+    assert str(excinfo.value) == "no test suite has been begun"
+
+
+def test_begin_test_suite():
+    f = StringIO()
+    suite = Suite("suite1", [Case("Not written")], hostname="localhost", properties={"foo": "bar"})
+    with JUnitXMLWriter(f) as writer:
+        assert writer.current_suite is None
+        writer.begin_test_suite(suite)
+        assert writer.current_suite is suite
+        writer.write_test_case(Case("Test1"))
+        writer.end_suite()
+        assert writer.current_suite is None
+    expected = Suite("suite1", [Case("Test1")], hostname="localhost", properties={"foo": "bar"})
+    assert f.getvalue() == to_xml_report_string([expected])
+
+
+def test_begin_suite_twice():
+    writer = JUnitXMLWriter(StringIO())
+    writer.begin_suite("suite1")
+    with pytest.raises(ValueError) as excinfo:
+        writer.begin_suite("suite2")
+    assert str(excinfo.value) == "test suite 'suite1' has not been ended"
+
+
+def repeated_value_suites():
+    cases = []
+    for c in range(50):
+        # equal values in distinct string objects, as a runner creating them per test case has them
+        classname = "".join(["pkg.Class", str(c % 3), "\x07<&>"])
+        cases.append(Case("Test%d" % c, classname, file=c % 2 and "tests/test_%d.py" % (c % 5) or 7, url=u"http://ü/"))
+    return [Suite("suite%d" % s, cases, hostname="host", package="pkg") for s in range(3)]
+
+
+@pytest.mark.parametrize("prettyprint", [True, False])
+@pytest.mark.parametrize("cache_size", [0, 2, 1024])
+def test_repeated_values_cached(monkeypatch, prettyprint, cache_size):
+    monkeypatch.setattr(junit_xml, "_VALUE_CACHE_SIZE", 0)
+    expected = to_xml_report_string(repeated_value_suites(), prettyprint=prettyprint)
+    assert "pkg.Class1&lt;&amp;&gt;" in expected
+
+    monkeypatch.setattr(junit_xml, "_VALUE_CACHE_SIZE", cache_size)
+    assert to_xml_report_string(repeated_value_suites(), prettyprint=prettyprint) == expected
+    assert write_report(repeated_value_suites(), prettyprint=prettyprint) == expected
+
+
+def test_repeated_values_shared():
+    cases = [Case("Test%d" % c, "".join(["pkg.", "Class"])) for c in range(3)]
+    assert cases[0].classname is not cases[1].classname
+    element = Suite("suite", cases).build_xml_doc()
+    classnames = [case_element.get("classname") for case_element in element]
+    assert classnames[0] is classnames[1] is classnames[2]
+
+
+def test_unrepeated_values_uncached(monkeypatch):
+    monkeypatch.setattr(junit_xml, "_VALUE_CACHE_SIZE", 8)
+    cases = [Case("Test%d" % c, "pkg.Class%d" % c, url="http://ci/%d" % c) for c in range(20)]
+    values = junit_xml._value_cache(prettyprint=True)
+    expected = to_xml_report_string([Suite("suite", cases)])
+    # the values do not repeat, the cache is given up on after as many lookups as it holds values
+    assert write_report([Suite("suite", cases)]) == expected
+    for case in cases[:8]:
+        case._build_xml_doc("utf-8", lazy=True, values=values)
+    assert values.xml_text is junit_xml._xml_text and values.attributes == {}